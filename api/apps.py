@@ -1,6 +1,20 @@
 from django.apps import AppConfig
+from django.conf import settings
 import logging
 
+logger = logging.getLogger(__name__)
+
+
 class ApiConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
-    name = "api"
\ No newline at end of file
+    name = "api"
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        if settings.WORKERS > 1 and "locmem" in settings.CACHES["default"]["BACKEND"]:
+            logger.warning(
+                "%d workers share no cache: each keeps its own menu version and "
+                "misses the others' menu edits. Use the file or redis cache "
+                "(DJANGO_CACHE_BACKEND).", settings.WORKERS,
+            )
@@ -0,0 +1,134 @@
+"""Async versions of the hot endpoints, for ASGI deployments.
+
+Nearly every MCP tool call lands on one of these. Under ASGI a sync DRF view
+holds a thread for the whole request; these await the async ORM instead. On
+SQLite that has not paid off (restaurant/asgi.py has the numbers), so they
+are off unless ``DJANGO_ASYNC_VIEWS=1``.
+
+Responses are the DRF ones: same serializers (given the request, so
+``fields``/``compact`` work), same JSON renderer. Writes need
+a transaction, which the async ORM cannot span, so each write runs as a single
+``sync_to_async`` call. ``api/urls.py`` mounts these ahead of the router when
+``settings.ASYNC_VIEWS`` is on; other methods on the same URL (OPTIONS, the
+bill list, ...) fall through to the DRF view.
+"""
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, HttpResponseNotModified
+from django.views.decorators.csrf import csrf_exempt
+
+from .idempotency import idempotent
+from .menu import aget_menu_snapshot
+from .models import Bill, Customer
+from .renderers import dumps, loads
+from .serializers import (
+    BillItemBulkSerializer,
+    BillItemSerializer,
+    BillSerializer,
+    CustomerSerializer,
+    MenuItemSerializer,
+    MenuItemSizeSerializer,
+)
+from .views import MenuItemSizeViewSet, MenuItemViewSet, filter_by_menu_params
+
+
+def with_fallback(fallback, **handlers):
+    """One URL: async ``handlers`` by HTTP method, ``fallback`` for the rest."""
+    fallback = sync_to_async(fallback)
+
+    @csrf_exempt
+    async def view(request, *args, **kwargs):
+        handler = handlers.get(request.method, fallback)
+        return await handler(request, *args, **kwargs)
+
+    return view
+
+
+def _json(data, status=200, headers=None):
+    return HttpResponse(
+        dumps(data), status=status, content_type="application/json", headers=headers
+    )
+
+
+def _payload(request):
+    if request.content_type == "application/json":
+        return loads(request.body or b"{}")
+    return request.POST
+
+
+def _save(serializer_class, data, context):
+    serializer = serializer_class(data=data, context=context)
+    if not serializer.is_valid():
+        return serializer.errors, 400
+    serializer.save()
+    return serializer.data, 201
+
+
+def _add_bill_items(pk, data, context):
+    bill = Bill.objects.filter(pk=pk).first()
+    if bill is None:
+        return {"detail": "No Bill matches the given query."}, 404
+    serializer = BillItemBulkSerializer(data=data)
+    if not serializer.is_valid():
+        return serializer.errors, 400
+    bill.add_items(serializer.validated_data["items"])
+    return BillSerializer(Bill.objects.with_details().get(pk=pk), context=context).data, 201
+
+
+async def _write(request, func, *args):
+    try:
+        data = _payload(request)
+    except ValueError as exc:
+        return _json({"detail": f"JSON parse error - {exc}"}, status=400)
+    body, status = await sync_to_async(func)(*args, data, {"request": request})
+    return _json(body, status=status)
+
+
+async def full_menu(request):
+    version, snapshot = await aget_menu_snapshot()
+    etag = f'"menu-{version}"'
+    if request.headers.get("If-None-Match") == etag:
+        return HttpResponseNotModified(headers={"ETag": etag})
+    return HttpResponse(snapshot, content_type="application/json", headers={"ETag": etag})
+
+
+async def _menu_list(request, queryset, serializer_class):
+    try:
+        qs = filter_by_menu_params(queryset.all(), request.GET)
+    except ValueError as exc:
+        return _json({"detail": str(exc)}, status=400)
+    objs = [obj async for obj in qs]
+    return _json(serializer_class(objs, many=True, context={"request": request}).data)
+
+
+async def item_list(request):
+    return await _menu_list(request, MenuItemViewSet.queryset, MenuItemSerializer)
+
+
+async def size_list(request):
+    return await _menu_list(request, MenuItemSizeViewSet.queryset, MenuItemSizeSerializer)
+
+
+async def customer_by_phone(request):
+    phone = request.GET.get("phone")
+    if not phone:
+        return _json({"detail": "phone query parameter is required"}, status=400)
+    customer = await Customer.objects.aby_phone(phone)
+    if customer is None:
+        return _json({"exists": False})
+    data = CustomerSerializer(customer, context={"request": request}).data
+    return _json({"exists": True, "customer": data})
+
+
+@idempotent
+async def create_bill(request):
+    return await _write(request, _save, BillSerializer)
+
+
+@idempotent
+async def add_bill_item(request):
+    return await _write(request, _save, BillItemSerializer)
+
+
+@idempotent
+async def add_bill_items(request, pk):
+    return await _write(request, _add_bill_items, pk)
@@ -0,0 +1,269 @@
+"""Draft carts: the order being put together in a conversation, per phone.
+
+Building an order used to mean creating a pending ``Bill`` up front and
+adding ``BillItem`` rows as the customer spoke, recomputing totals on every
+write; conversations that trailed off left those bills behind for good. A
+cart keeps the lines (``(item_id, size_id) -> quantity``) off the bill
+tables instead, keyed by the canonical WhatsApp phone (the key the n8n
+memory node uses):
+
+- Lines are checked and priced from the in-memory menu index, so editing or
+  previewing a cart runs no queries.
+- Checkout goes through ``PlaceOrderSerializer``: customer, bill and items
+  are written in one transaction, and the cart is dropped only if that
+  succeeds.
+- A cart expires ``settings.CART_TTL`` seconds after its last change.
+  Expired carts are never returned, and are deleted at most every
+  ``REAP_INTERVAL`` seconds as carts are written, or by
+  ``manage.py reap_carts`` when they are kept in SQLite.
+
+Carts live in this process unless ``settings.CART_SQLITE_PATH`` names a
+SQLite file; the file is then the only copy, so carts survive restarts and
+are shared by every worker on the host. Running several workers
+(``settings.WORKERS``) without it splits a conversation's cart between them,
+so a warning is logged at startup.
+"""
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from django.conf import settings
+
+from .models import Bill
+from .renderers import dumps, loads
+from .search import menu_index
+
+REAP_INTERVAL = 60
+
+logger = logging.getLogger(__name__)
+
+
+class Cart:
+    __slots__ = ("phone", "lines", "updated_at")
+
+    def __init__(self, phone, lines=None, updated_at=0.0):
+        self.phone = phone
+        # (item_id, size_id) -> quantity, in the order lines were first added.
+        self.lines = dict(lines or {})
+        self.updated_at = updated_at
+
+    def __bool__(self):
+        return bool(self.lines)
+
+    def items(self):
+        """The lines as ``{item_id, size_id, quantity}`` order lines."""
+        return [
+            {"item_id": item_id, "size_id": size_id, "quantity": quantity}
+            for (item_id, size_id), quantity in self.lines.items()
+        ]
+
+
+class CartStore:
+    def __init__(self, ttl, path=None, clock=time.time):
+        self.ttl = ttl
+        self.clock = clock
+        self._carts = {}
+        self._lock = threading.RLock()
+        self._reaped_at = 0.0
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(
+                path, timeout=settings.SQLITE_BUSY_TIMEOUT, check_same_thread=False,
+                isolation_level=None,
+            )
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS carts ("
+                "phone TEXT PRIMARY KEY, lines TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+
+    # ---------- Storage ----------
+
+    @contextmanager
+    def _transaction(self):
+        """Hold the cart store for a read-modify-write, across processes too."""
+        with self._lock:
+            if self._db is None:
+                yield
+                return
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    def _load(self, phone):
+        if self._db is None:
+            cart = self._carts.get(phone)
+            # A copy: callers read it outside the lock.
+            cart = cart and Cart(phone, cart.lines, cart.updated_at)
+        else:
+            row = self._db.execute(
+                "SELECT lines, updated_at FROM carts WHERE phone = ?", (phone,)
+            ).fetchone()
+            cart = row and Cart(phone, {(i, s): q for i, s, q in loads(row[0])}, row[1])
+        if cart is not None and cart.updated_at + self.ttl <= self.clock():
+            self._delete(phone)
+            return None
+        return cart
+
+    def _save(self, cart):
+        cart.updated_at = self.clock()
+        if not cart:
+            self._delete(cart.phone)
+        elif self._db is None:
+            self._carts[cart.phone] = cart
+        else:
+            lines = dumps([[i, s, q] for (i, s), q in cart.lines.items()]).decode()
+            self._db.execute(
+                "INSERT OR REPLACE INTO carts (phone, lines, updated_at) VALUES (?, ?, ?)",
+                (cart.phone, lines, cart.updated_at),
+            )
+
+    def _delete(self, phone):
+        if self._db is None:
+            self._carts.pop(phone, None)
+        else:
+            self._db.execute("DELETE FROM carts WHERE phone = ?", (phone,))
+
+    # ---------- Carts ----------
+
+    def get(self, phone):
+        """The phone's cart, or an empty one (not stored until it has lines)."""
+        with self._lock:
+            return self._load(phone) or Cart(phone)
+
+    def add(self, phone, lines):
+        """Add ``(item_id, size_id, quantity)`` lines, adding up repeats."""
+        with self._transaction():
+            cart = self._load(phone) or Cart(phone)
+            for item_id, size_id, quantity in lines:
+                key = (item_id, size_id)
+                cart.lines[key] = cart.lines.get(key, 0) + quantity
+            self._save(cart)
+        self.maybe_reap()
+        return cart
+
+    def set_quantities(self, phone, lines):
+        """Set the quantity of ``(item_id, size_id, quantity)`` lines; 0 removes one."""
+        with self._transaction():
+            cart = self._load(phone) or Cart(phone)
+            for item_id, size_id, quantity in lines:
+                if quantity:
+                    cart.lines[(item_id, size_id)] = quantity
+                else:
+                    cart.lines.pop((item_id, size_id), None)
+            self._save(cart)
+        self.maybe_reap()
+        return cart
+
+    def discard(self, phone):
+        with self._transaction():
+            self._delete(phone)
+
+    @contextmanager
+    def checkout(self, phone):
+        """Take the phone's cart out for the ``with`` block; it is put back on error.
+
+        Two checkouts of one cart can't both see its lines. The cart yielded
+        is empty if there was nothing to check out.
+        """
+        with self._transaction():
+            cart = self._load(phone) or Cart(phone)
+            self._delete(phone)
+        try:
+            yield cart
+        except BaseException:
+            if cart:
+                with self._transaction():
+                    # Unless the customer already started a new one.
+                    if self._load(phone) is None:
+                        self._save(cart)
+            raise
+
+    def expires_at(self, cart):
+        return datetime.fromtimestamp(cart.updated_at + self.ttl, tz=timezone.utc)
+
+    def preview(self, cart, payment_method=None):
+        """The cart priced as a bill would be, without touching the bill tables."""
+        data = price(cart, payment_method)
+        data["expires_at"] = self.expires_at(cart) if cart else None
+        return data
+
+    # ---------- Reaping ----------
+
+    def reap(self):
+        """Delete every expired cart; returns how many there were."""
+        cutoff = self.clock() - self.ttl
+        with self._transaction():
+            self._reaped_at = self.clock()
+            if self._db is None:
+                expired = [p for p, c in self._carts.items() if c.updated_at <= cutoff]
+                for phone in expired:
+                    del self._carts[phone]
+                return len(expired)
+            return self._db.execute("DELETE FROM carts WHERE updated_at <= ?", (cutoff,)).rowcount
+
+    def maybe_reap(self):
+        if self.clock() - self._reaped_at >= REAP_INTERVAL:
+            self.reap()
+
+    def __len__(self):
+        with self._lock:
+            if self._db is None:
+                return len(self._carts)
+            return self._db.execute("SELECT COUNT(*) FROM carts").fetchone()[0]
+
+
+def price(cart, payment_method=None):
+    """Lines and totals for ``cart``, from the menu index.
+
+    Lines whose item or size has since left the menu are listed with no
+    price and left out of the totals, as are unavailable items.
+    """
+    priced = menu_index.price_lines(cart.lines)
+    lines, subtotal = [], Decimal("0.00")
+    for (item_id, size_id), quantity in cart.lines.items():
+        line = {"item_id": item_id, "size_id": size_id, "quantity": quantity}
+        found = priced.get((item_id, size_id))
+        if found is None:
+            line.update(item=None, size=None, unit_price=None, total_price=None, is_available=False)
+        else:
+            unit_price = Decimal(found["price"])
+            total_price = Bill._quantize(unit_price * quantity)
+            line.update(item=found["item"], size=found["size"], unit_price=f"{unit_price:.2f}",
+                        total_price=f"{total_price:.2f}", is_available=found["is_available"])
+            if found["is_available"]:
+                subtotal += total_price
+        lines.append(line)
+    bill = Bill(payment_method=payment_method or "pending", subtotal=subtotal)
+    bill.set_initial_totals()
+    return {
+        "phone": cart.phone,
+        "items": lines,
+        "payment_method": bill.payment_method,
+        "subtotal": f"{bill.subtotal:.2f}",
+        "tax_rate": f"{bill.tax_rate:.2f}",
+        "tax_amount": f"{bill.tax_amount:.2f}",
+        "total_amount": f"{bill.total_amount:.2f}",
+    }
+
+
+carts = CartStore(settings.CART_TTL, settings.CART_SQLITE_PATH)
+
+
+def warn_if_unshared():
+    if settings.WORKERS > 1 and not settings.CART_SQLITE_PATH:
+        logger.warning(
+            "%d workers keep draft carts in their own memory: a cart built on one "
+            "is missing on the others. Set DJANGO_CART_SQLITE_PATH.", settings.WORKERS,
+        )
+
+
+warn_if_unshared()
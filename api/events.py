@@ -0,0 +1,182 @@
+"""In-process fan-out of bill events, streamed as server-sent events.
+
+Kitchen and delivery screens used to poll the bill list. Instead they keep
+``/api/kitchen/events/`` open and receive small deltas as bills change:
+
+    bill.created   a new bill (no items yet)
+    bill.items     lines added to or changed on a bill, with their quantities
+    bill.status    a status transition, e.g. confirmed -> preparing
+
+Events are published once the writing transaction commits (signals.py and
+``Bill.add_items``), encoded once, kept in a ring buffer and handed to every
+open stream, so a stream costs no queries at all.
+
+Event ids are ``<epoch>-<seq>``; the epoch changes with every process. A
+client reconnecting with ``Last-Event-ID`` (EventSource does this itself) is
+replayed what it missed. When that is no longer possible (the id is from
+another process, or older than the buffer) it gets a ``reset`` event and
+should reload ``/api/bills/?open=true``. To start without a gap, connect
+first and then load the list.
+
+The broker lives in one process: with several workers, either run the
+screens against one worker or have them accept ``reset`` after a failover.
+"""
+import asyncio
+import threading
+import uuid
+from collections import deque
+
+from django.conf import settings
+from django.db import transaction
+
+from .renderers import dumps
+
+# Events a stream may fall behind by before it is dropped. The client
+# reconnects and catches up from the buffer.
+SUBSCRIBER_QUEUE_SIZE = 1000
+
+
+class Event:
+    __slots__ = ("seq", "id", "frame")
+
+    def __init__(self, seq, id, frame):
+        self.seq, self.id, self.frame = seq, id, frame
+
+
+class Subscription:
+    """One open stream: the events it missed, then a queue of live ones."""
+
+    def __init__(self, broker, loop):
+        self.broker = broker
+        self.loop = loop
+        self.backlog = []
+        # Set when the client must reload: the id its reset event carries.
+        self.reset_id = None
+        self.overflowed = False
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def push(self, event):
+        """Runs on the subscriber's loop."""
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            self.close()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class EventBroker:
+    def __init__(self, buffer_size=1000):
+        self.epoch = uuid.uuid4().hex[:8]
+        self._seq = 0
+        self._buffer = deque(maxlen=buffer_size)
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    @property
+    def last_id(self):
+        return f"{self.epoch}-{self._seq}"
+
+    def publish(self, type, data):
+        """Send an event to every stream; safe to call from any thread."""
+        with self._lock:
+            self._seq += 1
+            event_id = f"{self.epoch}-{self._seq}"
+            frame = b"id: %s\nevent: %s\ndata: %s\n\n" % (
+                event_id.encode(), type.encode(), dumps(data)
+            )
+            event = Event(self._seq, event_id, frame)
+            self._buffer.append(event)
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.push, event)
+            except RuntimeError:
+                # Its event loop is gone (the request ended without cleanup).
+                self.unsubscribe(subscription)
+        return event
+
+    def subscribe(self, last_event_id=None, loop=None):
+        """Register a stream, with what it missed since ``last_event_id``."""
+        subscription = Subscription(self, loop or asyncio.get_running_loop())
+        with self._lock:
+            if last_event_id:
+                epoch, _, seq = last_event_id.partition("-")
+                oldest = self._buffer[0].seq if self._buffer else self._seq + 1
+                if epoch == self.epoch and seq.isdigit() and int(seq) + 1 >= oldest:
+                    subscription.backlog = [e for e in self._buffer if e.seq > int(seq)]
+                else:
+                    subscription.reset_id = self.last_id
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def __len__(self):
+        return len(self._subscribers)
+
+
+bill_events = EventBroker(settings.BILL_EVENTS_BUFFER)
+
+
+def publish_on_commit(type, data):
+    """Publish once the current transaction commits (at once outside one).
+
+    ``data`` is built by the caller right away, from the instance as saved.
+    """
+    transaction.on_commit(lambda: bill_events.publish(type, data))
+
+
+def bill_created(bill):
+    publish_on_commit("bill.created", {
+        "id": bill.pk,
+        "customer": bill.customer_id,
+        "status": bill.status,
+        "order_type": bill.order_type,
+        "payment_method": bill.payment_method,
+        "total_amount": str(bill.total_amount),
+        "created_at": bill.created_at,
+    })
+
+
+def bill_status_changed(bill, previous):
+    publish_on_commit("bill.status", {"id": bill.pk, "status": bill.status, "previous": previous})
+
+
+def bill_items_changed(bill_id, lines, removed=False):
+    """``lines`` are BillItems as saved; removed ones are sent with quantity 0."""
+    publish_on_commit("bill.items", {
+        "bill": bill_id,
+        "items": [
+            {"id": line.pk, "item": line.item_id, "size": line.size_id,
+             "quantity": 0 if removed else line.quantity}
+            for line in lines
+        ],
+    })
+
+
+async def stream(subscription, keepalive):
+    """The response body: SSE frames until the client goes away."""
+    try:
+        yield b"retry: 2000\n\n"
+        if subscription.reset_id:
+            yield b"id: %s\nevent: reset\ndata: {}\n\n" % subscription.reset_id.encode()
+        for event in subscription.backlog:
+            yield event.frame
+        subscription.backlog = []
+        while not subscription.overflowed:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), keepalive)
+            except asyncio.TimeoutError:
+                # Keeps proxies from closing an idle stream.
+                yield b": keepalive\n\n"
+                continue
+            yield event.frame
+    finally:
+        subscription.close()
@@ -0,0 +1,77 @@
+from datetime import datetime, time, timedelta
+
+import django_filters
+from django.utils import timezone
+
+from .models import CLOSED_BILL_STATUSES, OPEN_BILL_STATUSES, Bill, Customer
+from .phone import normalize_phone
+
+
+class CharInFilter(django_filters.BaseInFilter, django_filters.CharFilter):
+    pass
+
+
+def start_of_day(day):
+    """Aware midnight that starts ``day`` in the current time zone."""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+class CustomerFilter(django_filters.FilterSet):
+    """``phone`` matches any spelling of the number ("+92300...", "0300 ...")."""
+    phone = django_filters.CharFilter(method="filter_phone")
+
+    class Meta:
+        model = Customer
+        fields = ["phone"]
+
+    def filter_phone(self, queryset, name, value):
+        return queryset.filter(phone_canonical=normalize_phone(value))
+
+
+class BillFilter(django_filters.FilterSet):
+    """Filters for the bill listing.
+
+    ``status`` takes a comma separated list, ``open`` keeps bills that are
+    neither delivered nor cancelled, and ``today`` / ``date_from`` /
+    ``date_to`` bound ``created_at`` by (server-local) calendar date.
+
+    Dates are turned into ``created_at`` ranges rather than ``__date``
+    lookups, which wrap the column in a function and so can't use the
+    created_at indexes.
+    """
+    phone = django_filters.CharFilter(method="filter_phone")
+    status = CharInFilter(field_name="status", lookup_expr="in")
+    open = django_filters.BooleanFilter(method="filter_open")
+    today = django_filters.BooleanFilter(method="filter_today")
+    date_from = django_filters.DateFilter(method="filter_date_from")
+    date_to = django_filters.DateFilter(method="filter_date_to")
+
+    class Meta:
+        model = Bill
+        fields = ["customer", "phone", "status", "order_type", "is_paid"]
+
+    def filter_phone(self, queryset, name, value):
+        return queryset.filter(customer__phone_canonical=normalize_phone(value))
+
+    def filter_open(self, queryset, name, value):
+        if value is None:
+            return queryset
+        if value:
+            # An IN list rather than exclude(): it is a range on the status index.
+            return queryset.filter(status__in=OPEN_BILL_STATUSES)
+        return queryset.filter(status__in=CLOSED_BILL_STATUSES)
+
+    def filter_today(self, queryset, name, value):
+        if not value:
+            return queryset
+        today = timezone.localdate()
+        return queryset.filter(
+            created_at__gte=start_of_day(today),
+            created_at__lt=start_of_day(today + timedelta(days=1)),
+        )
+
+    def filter_date_from(self, queryset, name, value):
+        return queryset.filter(created_at__gte=start_of_day(value))
+
+    def filter_date_to(self, queryset, name, value):
+        return queryset.filter(created_at__lt=start_of_day(value + timedelta(days=1)))
@@ -0,0 +1,209 @@
+"""Idempotency keys for bill writes, so a retried request is not applied twice.
+
+An agent that times out and retries used to create a second bill, or hit
+the BillItem unique constraint. A write sent with an ``Idempotency-Key``
+header is now run once; repeating it with the same key returns the stored
+response (marked ``Idempotent-Replayed: true``) with one primary-key lookup,
+without touching the bill tables.
+
+- Keys are scoped to method and path, and kept for
+  ``settings.IDEMPOTENCY_KEY_TTL`` seconds.
+- A key reused with a different body is refused (422); one whose first
+  request is still running gets 409, and the client retries later.
+- 5xx responses and exceptions are not stored, so the retry runs again.
+
+Keys are rows in the database (``IdempotencyKey``), not in a cache: a retry
+often lands on another worker, or goes through an ORM-mode MCP server, and
+every one of them must see the key. The insert of the claim is what decides
+which request runs. Expired rows are purged as keys are claimed.
+"""
+import hashlib
+from datetime import timedelta
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+
+from .models import IdempotencyKey
+
+HEADER = "Idempotency-Key"
+REPLAY_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+UNSAFE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+# How long a claimed key blocks retries if its request never finishes.
+IN_PROGRESS_TTL = 60
+# Expired keys are deleted at most this often (seconds).
+PURGE_INTERVAL = 60
+
+_purged_at = None
+
+
+class IdempotencyError(Exception):
+    status = 400
+
+    def response(self):
+        return JsonResponse({"detail": str(self)}, status=self.status)
+
+
+class KeyInUse(IdempotencyError):
+    status = 409
+
+
+class KeyReused(IdempotencyError):
+    status = 422
+
+
+def _digest(scope, key):
+    return hashlib.blake2b(f"{scope}\n{key}".encode(), digest_size=16).hexdigest()
+
+
+def fingerprint(body: bytes) -> str:
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def _check(key):
+    if len(key) > MAX_KEY_LENGTH:
+        raise IdempotencyError(f"{HEADER} must be at most {MAX_KEY_LENGTH} characters.")
+
+
+def _stored(record, body_fingerprint):
+    """The stored ``(status, content_type, content)``; raises if unusable."""
+    if record.fingerprint != body_fingerprint:
+        raise KeyReused(f"{HEADER} was already used for a different request.")
+    if record.status is None:
+        raise KeyInUse(f"A request with this {HEADER} is still being processed.")
+    return record.status, record.content_type, bytes(record.content)
+
+
+def _purge(now):
+    global _purged_at
+    if _purged_at is None or now - _purged_at >= timedelta(seconds=PURGE_INTERVAL):
+        _purged_at = now
+        IdempotencyKey.objects.filter(expires_at__lte=now).delete()
+
+
+def claim(scope, key, body):
+    """Claim ``key`` for a request; returns the stored response if already done.
+
+    Returns None when the caller should run the request and then ``store``
+    (or ``release``) the key.
+    """
+    _check(key)
+    digest, body_fingerprint, now = _digest(scope, key), fingerprint(body), timezone.now()
+    _purge(now)
+    record = IdempotencyKey.objects.filter(pk=digest).first()
+    if record is not None and record.expires_at > now:
+        return _stored(record, body_fingerprint)
+    if record is not None:
+        record.delete()
+    try:
+        with transaction.atomic():
+            IdempotencyKey.objects.create(
+                key=digest, fingerprint=body_fingerprint,
+                expires_at=now + timedelta(seconds=IN_PROGRESS_TTL),
+            )
+    except IntegrityError:
+        # Another request claimed it in between.
+        record = IdempotencyKey.objects.filter(pk=digest).first()
+        if record is None:
+            raise KeyInUse(f"A request with this {HEADER} is still being processed.")
+        return _stored(record, body_fingerprint)
+    return None
+
+
+def store(scope, key, body, status, content_type, content):
+    if status >= 500:
+        release(scope, key)
+        return
+    IdempotencyKey.objects.filter(pk=_digest(scope, key)).update(
+        fingerprint=fingerprint(body), status=status, content_type=content_type,
+        content=content, expires_at=timezone.now() + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL),
+    )
+
+
+def release(scope, key):
+    IdempotencyKey.objects.filter(pk=_digest(scope, key)).delete()
+
+
+aclaim = sync_to_async(claim)
+astore = sync_to_async(store)
+arelease = sync_to_async(release)
+
+
+# ---------- Views ----------
+
+def _replay(stored):
+    status, content_type, content = stored
+    return HttpResponse(content, status=status, content_type=content_type,
+                        headers={REPLAY_HEADER: "true"})
+
+
+def _rendered(response):
+    # DRF responses are rendered lazily; the stored copy needs the bytes.
+    if not getattr(response, "is_rendered", True):
+        response.render()
+    return response
+
+
+def run(request, view, *args, **kwargs):
+    """Call ``view`` under the request's idempotency key, if it sent one."""
+    key = request.headers.get(HEADER)
+    if not key or request.method not in UNSAFE_METHODS:
+        return view(request, *args, **kwargs)
+    scope, body = f"{request.method} {request.path}", request.body
+    try:
+        stored = claim(scope, key, body)
+    except IdempotencyError as exc:
+        return exc.response()
+    if stored is not None:
+        return _replay(stored)
+    try:
+        response = _rendered(view(request, *args, **kwargs))
+    except BaseException:
+        release(scope, key)
+        raise
+    store(scope, key, body, response.status_code, response["Content-Type"], response.content)
+    return response
+
+
+async def arun(request, view, *args, **kwargs):
+    key = request.headers.get(HEADER)
+    if not key or request.method not in UNSAFE_METHODS:
+        return await view(request, *args, **kwargs)
+    scope, body = f"{request.method} {request.path}", request.body
+    try:
+        stored = await aclaim(scope, key, body)
+    except IdempotencyError as exc:
+        return exc.response()
+    if stored is not None:
+        return _replay(stored)
+    try:
+        response = _rendered(await view(request, *args, **kwargs))
+    except BaseException:
+        await arelease(scope, key)
+        raise
+    await astore(scope, key, body, response.status_code, response["Content-Type"], response.content)
+    return response
+
+
+def idempotent(view):
+    """Decorate a (sync or async) view to honour ``Idempotency-Key``."""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            return await arun(request, view, *args, **kwargs)
+    else:
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            return run(request, view, *args, **kwargs)
+    return wrapper
+
+
+class IdempotentMixin:
+    """For viewsets: run every write under its ``Idempotency-Key``."""
+
+    def dispatch(self, request, *args, **kwargs):
+        return run(request, super().dispatch, *args, **kwargs)
@@ -0,0 +1,297 @@
+"""Fill an empty database with a production-sized restaurant.
+
+    python manage.py generate_load_data                      # defaults below
+    python manage.py generate_load_data --bills 50000 --customers 5000 --seed 7
+
+Defaults: 12 categories x 8 subcategories, 10,000 items, 100,000 customers
+and 1,000,000 bills with ~2.6 items each, spread over the last 365 days.
+Everything is written with bulk_create in batches. The same --seed and
+--end-date give the same rows.
+
+Bill totals are computed here from the generated lines and written with the
+bill (Bill.objects.bulk_create fills in tax and total from the subtotal), so
+no per-row save() hooks run.
+
+Point it at a scratch database, e.g. DJANGO_SQLITE_PATH=/tmp/load.sqlite3
+after `migrate`, or the postgres profile.
+"""
+import datetime
+import itertools
+import random
+import time
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from api.menu import bump_menu_version
+from api.models import (
+    Bill, BillItem, Customer, MenuCategory, MenuItem, MenuItemSize, MenuSubCategory,
+)
+from api.phone import normalize_phone
+
+CATEGORIES = [
+    "Burgers", "Pizza", "Wraps", "Sandwiches", "Fried Chicken", "BBQ", "Karahi",
+    "Rice", "Pasta", "Sides", "Drinks", "Desserts", "Deals", "Breakfast", "Salads",
+    "Soups", "Shakes", "Chinese", "Seafood", "Kids",
+]
+SUBCATEGORY_STYLES = [
+    "Classic", "Signature", "Spicy", "Grilled", "Crispy", "Cheesy", "Family",
+    "Premium", "Veggie", "Smoky", "Loaded", "Mini",
+]
+SIZE_SETS = [
+    [("Regular", 1.0), ("Large", 1.45)],
+    [("Small", 0.75), ("Medium", 1.0), ("Large", 1.4), ("Family", 2.1)],
+    [("Single", 1.0), ("Double", 1.6)],
+    [("250ml", 0.5), ("500ml", 1.0), ("1.5L", 2.2)],
+    [("Half", 0.6), ("Full", 1.0)],
+    [("Regular", 1.0)],
+]
+ADJECTIVES = (
+    "zinger tikka malai fajita peri crispy smoky spicy double royal mighty supreme "
+    "tandoori garlic jalapeno bbq classic special crunchy loaded hot honey lemon"
+).split()
+NOUNS = (
+    "chicken beef mutton paneer fish prawn veggie cheese mushroom kabab boti "
+    "shawarma club melt stack bites strips wings tenders roll bowl platter"
+).split()
+INGREDIENTS = (
+    "lettuce mayo onion tomato pickles jalapenos olives capsicum sweetcorn "
+    "mozzarella cheddar mint chutney raita garlic sauce house sauce coleslaw "
+    "fries naan paratha sesame bun grilled onions chilli oil"
+).split()
+FIRST_NAMES = (
+    "Ali Ahmed Usman Hamza Bilal Omar Hassan Zain Fahad Saad Ayesha Fatima Zara "
+    "Hira Sana Maryam Amna Iqra Noor Mahnoor Imran Kamran Asad Danish Sara"
+).split()
+LAST_NAMES = (
+    "Khan Ahmed Malik Sheikh Butt Chaudhry Qureshi Siddiqui Raza Iqbal Hussain "
+    "Mirza Abbasi Javed Aslam Baig Rana Akhtar Anwar Farooq"
+).split()
+AREAS = (
+    "Gulberg DHA Johar Town Model Town Bahria Town Cantt Garden Town Faisal Town "
+    "Iqbal Town Wapda Town Township Samanabad"
+).split()
+
+ORDER_TYPES = (["delivery", "takeaway", "dine_in"], [60, 25, 15])
+PAYMENT_METHODS = (["cash", "card", "digital_wallet", "bank_transfer"], [55, 22, 18, 5])
+PAST_STATUSES = (["delivered", "cancelled"], [93, 7])
+TODAY_STATUSES = (
+    ["pending", "confirmed", "preparing", "ready", "out_for_delivery", "delivered", "cancelled"],
+    [12, 12, 18, 8, 10, 35, 5],
+)
+# Orders per hour of day: a lunch peak and a bigger dinner peak.
+HOUR_WEIGHTS = [1, 0, 0, 0, 0, 0, 0, 1, 2, 3, 4, 6, 10, 12, 8, 5, 4, 6, 9, 13, 15, 12, 7, 3]
+LINE_COUNTS = ([1, 2, 3, 4, 5, 6], [30, 30, 20, 10, 6, 4])
+QUANTITIES = ([1, 2, 3, 4], [70, 20, 7, 3])
+DELIVERY_FEES = [Decimal("100.00"), Decimal("150.00"), Decimal("200.00")]
+CENT = Decimal("0.01")
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Keep the created_at/updated_at we generate instead of auto_now(_add)."""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def skewed_cum_weights(count, skew=10):
+    """Cumulative weights where low indexes are picked far more often."""
+    return list(itertools.accumulate(1 / (rank + skew) for rank in range(count)))
+
+
+class Command(BaseCommand):
+    help = "Generate production-scale menu, customers and bills for load testing."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--categories", type=int, default=12)
+        parser.add_argument("--subcategories", type=int, default=8, help="per category")
+        parser.add_argument("--items", type=int, default=10_000)
+        parser.add_argument("--customers", type=int, default=100_000)
+        parser.add_argument("--bills", type=int, default=1_000_000)
+        parser.add_argument("--days", type=int, default=365, help="spread bills over this many days")
+        parser.add_argument("--end-date", type=datetime.date.fromisoformat, default=None,
+                            help="last day with bills, YYYY-MM-DD (default: today)")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--batch-size", type=int, default=5_000)
+
+    def handle(self, *args, **options):
+        if any(model.objects.exists() for model in (MenuCategory, Customer, Bill)):
+            raise CommandError(
+                "The database already has menu, customer or bill rows; "
+                "generate into an empty (freshly migrated) database."
+            )
+        if options["items"] < options["categories"] * options["subcategories"]:
+            raise CommandError("--items must be at least --categories x --subcategories.")
+
+        self.rng = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        self.verbose = options["verbosity"] > 0
+        end_date = options["end_date"] or timezone.now().date()
+        self.end = datetime.datetime.combine(end_date, datetime.time(), tzinfo=datetime.timezone.utc)
+        self.days = max(options["days"], 1)
+        self.started = time.perf_counter()
+
+        with explicit_timestamps(Customer, Bill):
+            items = self.create_menu(options["categories"], options["subcategories"], options["items"])
+            customer_ids = self.create_customers(options["customers"])
+            self.create_bills(options["bills"], items, customer_ids)
+        bump_menu_version()
+        self.log(f"done in {time.perf_counter() - self.started:.1f}s")
+
+    def log(self, message):
+        if self.verbose:
+            self.stdout.write(message)
+
+    def progress(self, label, done, total, started):
+        elapsed = time.perf_counter() - started
+        rate = done / elapsed if elapsed else 0
+        eta = (total - done) / rate if rate else 0
+        self.log(f"{label}: {done:,}/{total:,} ({done / total:.0%}) {rate:,.0f}/s, ETA {eta:.0f}s")
+
+    # ---------- Menu ----------
+
+    def create_menu(self, category_count, subcategory_count, item_count):
+        """Return ``[(item_id, [(size_id, price), ...]), ...]`` for the new menu."""
+        rng = self.rng
+        categories = MenuCategory.objects.bulk_create(
+            MenuCategory(name=CATEGORIES[n % len(CATEGORIES)] + (f" {n // len(CATEGORIES) + 1}" if n >= len(CATEGORIES) else ""))
+            for n in range(category_count)
+        )
+        subcategories = MenuSubCategory.objects.bulk_create(
+            MenuSubCategory(
+                name=f"{SUBCATEGORY_STYLES[s % len(SUBCATEGORY_STYLES)]} {category.name}"
+                + (f" {s // len(SUBCATEGORY_STYLES) + 1}" if s >= len(SUBCATEGORY_STYLES) else ""),
+                category=category,
+            )
+            for category in categories
+            for s in range(subcategory_count)
+        )
+
+        sizes = []
+        for sub in subcategories:
+            base = Decimal(rng.randrange(250, 1500, 10))
+            for name, factor in rng.choice(SIZE_SETS):
+                price = (base * Decimal(str(factor))).quantize(Decimal("10")).quantize(CENT)
+                sizes.append(MenuItemSize(name=name, price=price, subcategory=sub))
+        sizes_by_sub = {}
+        for size in MenuItemSize.objects.bulk_create(sizes, batch_size=self.batch_size):
+            sizes_by_sub.setdefault(size.subcategory_id, []).append((size.pk, size.price))
+
+        menu_items = []
+        for n in range(item_count):
+            sub = subcategories[n % len(subcategories)]
+            menu_items.append(MenuItem(
+                name=f"{rng.choice(ADJECTIVES).title()} {rng.choice(NOUNS).title()} {sub.name.split()[0]}",
+                description=", ".join(rng.sample(INGREDIENTS, 4)).capitalize(),
+                is_available=rng.random() > 0.03,
+                subcategory=sub,
+            ))
+        created = MenuItem.objects.bulk_create(menu_items, batch_size=self.batch_size)
+        self.log(f"menu: {len(categories)} categories, {len(subcategories)} subcategories, "
+                 f"{len(sizes):,} sizes, {len(created):,} items")
+        return [(item.pk, sizes_by_sub[item.subcategory_id]) for item in created]
+
+    # ---------- Customers ----------
+
+    def random_time(self):
+        day = self.end - datetime.timedelta(days=self.rng.randrange(self.days))
+        hour = self.rng.choices(range(24), HOUR_WEIGHTS)[0]
+        return day + datetime.timedelta(hours=hour, minutes=self.rng.randrange(60))
+
+    def create_customers(self, count):
+        rng, ids, started = self.rng, [], time.perf_counter()
+        for start in range(0, count, self.batch_size):
+            batch = []
+            for n in range(start, min(start + self.batch_size, count)):
+                phone = f"0{3000000000 + n}"
+                created = self.random_time()
+                batch.append(Customer(
+                    first_name=rng.choice(FIRST_NAMES),
+                    last_name=rng.choice(LAST_NAMES),
+                    phone=phone,
+                    phone_canonical=normalize_phone(phone),
+                    address=f"House {rng.randrange(1, 900)}, Street {rng.randrange(1, 60)}, "
+                            f"{rng.choice(AREAS)}, Lahore",
+                    created_at=created,
+                    updated_at=created,
+                ))
+            with transaction.atomic():
+                ids.extend(c.pk for c in Customer.objects.bulk_create(batch))
+            self.progress("customers", len(ids), count, started)
+        return ids
+
+    # ---------- Bills ----------
+
+    def build_bill(self, customer_id, items, item_weights):
+        rng = self.rng
+        created = self.random_time()
+        today = created >= self.end
+        status = rng.choices(*(TODAY_STATUSES if today else PAST_STATUSES))[0]
+        order_type = rng.choices(*ORDER_TYPES)[0]
+        if status == "out_for_delivery" and order_type != "delivery":
+            status = "ready"
+        paid = status == "delivered"
+        payment_method = rng.choices(*PAYMENT_METHODS)[0] if paid or rng.random() < 0.5 else "pending"
+
+        lines, seen = [], set()
+        for index in rng.choices(range(len(items)), cum_weights=item_weights, k=rng.choices(*LINE_COUNTS)[0]):
+            item_id, sizes = items[index]
+            size_id, price = rng.choice(sizes)
+            if (item_id, size_id) not in seen:
+                seen.add((item_id, size_id))
+                lines.append((item_id, size_id, rng.choices(*QUANTITIES)[0], price))
+        subtotal = sum((price * quantity for _, _, quantity, price in lines), Decimal("0.00"))
+
+        bill = Bill(
+            customer_id=customer_id,
+            status=status,
+            order_type=order_type,
+            payment_method=payment_method,
+            subtotal=subtotal,
+            delivery_fee=rng.choice(DELIVERY_FEES) if order_type == "delivery" else Decimal("0.00"),
+            is_paid=paid,
+            paid_at=created + datetime.timedelta(minutes=rng.randrange(20, 75)) if paid else None,
+            created_at=created,
+            updated_at=created,
+        )
+        if rng.random() < 0.1:
+            bill.discount_amount = (subtotal * Decimal(rng.choice((5, 10, 15))) / 100).quantize(CENT)
+        if payment_method in ("card", "digital_wallet") and rng.random() < 0.15:
+            bill.tip_amount = Decimal(rng.choice((50, 100, 150, 200, 300))).quantize(CENT)
+        return bill, lines
+
+    def create_bills(self, count, items, customer_ids):
+        item_weights = skewed_cum_weights(len(items))
+        customer_weights = skewed_cum_weights(len(customer_ids), skew=50)
+        done = item_rows = 0
+        started = time.perf_counter()
+        while done < count:
+            size = min(self.batch_size, count - done)
+            customers = self.rng.choices(customer_ids, cum_weights=customer_weights, k=size)
+            bills, lines = zip(*(self.build_bill(c, items, item_weights) for c in customers))
+            with transaction.atomic():
+                # BillQuerySet.bulk_create sets tax and total from the subtotal.
+                bills = Bill.objects.bulk_create(bills)
+                rows = [
+                    BillItem(bill_id=bill.pk, item_id=item_id, size_id=size_id,
+                             quantity=quantity, unit_price=price)
+                    for bill, bill_lines in zip(bills, lines)
+                    for item_id, size_id, quantity, price in bill_lines
+                ]
+                BillItem.objects.bulk_create(rows, batch_size=self.batch_size)
+            done += size
+            item_rows += len(rows)
+            self.progress(f"bills ({item_rows:,} items)", done, count, started)
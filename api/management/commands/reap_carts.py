@@ -0,0 +1,26 @@
+"""Delete expired draft carts (api/carts.py).
+
+    python manage.py reap_carts
+
+Expired carts are also reaped as carts are written; run this from cron to
+clear them out when nothing is being written. It needs the SQLite-backed
+store (DJANGO_CART_SQLITE_PATH): without it carts live in each server
+process's memory, out of this command's reach.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.carts import carts
+
+
+class Command(BaseCommand):
+    help = "Delete draft carts idle for longer than CART_TTL."
+
+    def handle(self, *args, **options):
+        if not settings.CART_SQLITE_PATH:
+            raise CommandError(
+                "Carts are kept in each server process's memory, so there is nothing "
+                "to reap from here; the servers reap their own. Set "
+                "DJANGO_CART_SQLITE_PATH to share them."
+            )
+        self.stdout.write(f"Reaped {carts.reap()} expired carts.")
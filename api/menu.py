@@ -0,0 +1,111 @@
+"""Versioned, precompiled full-menu snapshot.
+
+The menu changes a few times a day but is read on almost every agent turn, so
+it is compiled once into JSON bytes and keyed by a menu version. Signals in
+``api/signals.py`` bump the version whenever a category, subcategory, item or
+size is saved or deleted; the next read rebuilds the snapshot.
+
+The version and snapshot live in the default Django cache, with a
+per-process copy of the snapshot in memory on top so a hit costs a single
+cache lookup for the version. Every process serving the menu (the server's
+workers, an ORM-mode MCP server) must share that cache, or each keeps its own
+version and misses the others' edits; settings.CACHES uses files on this host
+or Redis, and per-process memory only for tests.
+"""
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from .models import MenuCategory
+from .renderers import dumps
+
+MENU_VERSION_KEY = "menu:version"
+MENU_SNAPSHOT_KEY = "menu:snapshot:{version}"
+
+_local = {"version": None, "snapshot": None}
+
+
+def build_full_menu():
+    """Build the nested category -> subcategory -> item -> sizes menu."""
+    categories = MenuCategory.objects.prefetch_related(
+        "subcategories__menu_items",
+        "subcategories__item_sizes",
+    )
+    menu = []
+    for cat in categories:
+        cat_dict = {
+            "id": cat.id,
+            "name": cat.name,
+            "subcategories": []
+        }
+        for sub in cat.subcategories.all():
+            # Sizes belong to the subcategory, so build the list once and
+            # share it between its items.
+            sizes = [
+                {
+                    "id": size.id,
+                    "name": size.name,
+                    "price": str(size.price)
+                }
+                for size in sub.item_sizes.all()
+            ]
+            sub_dict = {
+                "id": sub.id,
+                "name": sub.name,
+                "items": [
+                    {
+                        "id": item.id,
+                        "name": item.name,
+                        "description": item.description,
+                        "is_available": item.is_available,
+                        "sizes": sizes,
+                    }
+                    for item in sub.menu_items.all()
+                ]
+            }
+            cat_dict["subcategories"].append(sub_dict)
+        menu.append(cat_dict)
+    return menu
+
+
+def get_menu_version() -> int:
+    """Return the current menu version, initialising it on first use."""
+    version = cache.get(MENU_VERSION_KEY)
+    if version is None:
+        cache.add(MENU_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(MENU_VERSION_KEY)
+    return version
+
+
+def bump_menu_version() -> int:
+    """Invalidate the snapshot by moving the menu to a new version."""
+    previous = cache.get(MENU_VERSION_KEY)
+    version = time.time_ns()
+    cache.set(MENU_VERSION_KEY, version, None)
+    if previous is not None:
+        cache.delete(MENU_SNAPSHOT_KEY.format(version=previous))
+    return version
+
+
+def get_menu_snapshot():
+    """Return ``(version, json_bytes)`` for the full menu."""
+    version = get_menu_version()
+    if _local["version"] == version:
+        return version, _local["snapshot"]
+
+    key = MENU_SNAPSHOT_KEY.format(version=version)
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = dumps(build_full_menu())
+        cache.set(key, snapshot, None)
+
+    _local["version"], _local["snapshot"] = version, snapshot
+    return version, snapshot
+
+
+async def aget_menu_snapshot():
+    """Async ``get_menu_snapshot``: a current local copy costs one cache read."""
+    version = await cache.aget(MENU_VERSION_KEY)
+    if version is not None and _local["version"] == version:
+        return version, _local["snapshot"]
+    return await sync_to_async(get_menu_snapshot)()
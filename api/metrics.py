@@ -0,0 +1,135 @@
+"""In-process Prometheus metrics, served as text from ``/metrics``.
+
+A few counters and histograms are enough here, so this writes the text
+exposition format itself instead of pulling in prometheus_client. Numbers
+are per process: with several workers, scrape each one (or run one worker
+per target) and let Prometheus sum them.
+
+The endpoint has no authentication; keep it off the public interface (bind
+it behind the reverse proxy or restrict it there).
+"""
+import threading
+from bisect import bisect_left
+
+from django.http import HttpResponse
+
+# Seconds, from a cached menu read to a slow write.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    return repr(float(value)) if value != float("inf") else "+Inf"
+
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def collect(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram; ``observe`` is a bisect and two adds."""
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Per-bucket (not yet cumulative) counts, +Inf last, then the sum.
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def count(self, *labels):
+        series = self._series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def collect(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            items = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._series.items())
+        for labels, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = _labels(self.labelnames, labels, f'le="{_number(bound)}"')
+                yield f"{self.name}_bucket{le} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {total!r}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        return "\n".join(line for metric in self._metrics for line in metric.collect()) + "\n"
+
+
+registry = Registry()
+
+request_duration = registry.register(Histogram(
+    "django_http_request_duration_seconds", "Time spent handling a request, per view.",
+    ("view", "method"),
+))
+request_queries = registry.register(Histogram(
+    "django_http_request_db_queries", "SQL queries run while handling a request.",
+    ("view", "method"), buckets=QUERY_COUNT_BUCKETS,
+))
+request_db_duration = registry.register(Histogram(
+    "django_http_request_db_duration_seconds", "Time spent in SQL while handling a request.",
+    ("view", "method"),
+))
+responses = registry.register(Counter(
+    "django_http_responses_total", "Responses sent, per view and status code.",
+    ("view", "method", "status"),
+))
+slow_queries = registry.register(Counter(
+    "django_db_slow_queries_total", "Queries slower than SLOW_QUERY_MS, per view.",
+    ("view",),
+))
+
+
+def metrics_view(request):
+    return HttpResponse(registry.render(), content_type=CONTENT_TYPE)
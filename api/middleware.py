@@ -0,0 +1,126 @@
+"""Per-request timing and SQL accounting.
+
+``RequestMetricsMiddleware`` times every request, counts its queries and the
+time spent in them, adds a ``Server-Timing`` header (visible in the browser's
+network panel and to any client) and feeds the histograms in ``api.metrics``.
+
+Queries are counted by an execute wrapper installed on every database
+connection. It finds the current request through a context variable, which
+``sync_to_async`` carries into its worker threads, so queries made by the
+async views are attributed too. The cost per query is a context-variable
+lookup and two clock reads.
+
+With ``SLOW_QUERY_MS`` set, each query at least that slow is logged to
+``api.slow_queries`` with its view. Only the SQL is logged, not its
+parameters (they hold phone numbers and addresses).
+
+An ``X-Trace-Id`` request header (the MCP server sends one per tool call) is
+echoed on the response and included in those log lines.
+"""
+import logging
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from . import metrics
+
+logger = logging.getLogger("api.slow_queries")
+
+TRACE_HEADER = "X-Trace-Id"
+
+_current = ContextVar("request_metrics", default=None)
+
+
+class RequestStats:
+    __slots__ = ("request", "trace_id", "queries", "db_seconds", "slow_ms")
+
+    def __init__(self, request, slow_ms):
+        self.request = request
+        self.trace_id = request.headers.get(TRACE_HEADER, "")[:64]
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.slow_ms = slow_ms
+
+
+def view_label(request):
+    match = getattr(request, "resolver_match", None)
+    return match.view_name or match.route if match else "<unmatched>"
+
+
+def record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - start
+        stats.queries += 1
+        stats.db_seconds += elapsed
+        if stats.slow_ms and elapsed * 1000 >= stats.slow_ms:
+            view = view_label(stats.request)
+            metrics.slow_queries.inc(view)
+            logger.warning("slow query (%.1f ms) in %s %s trace=%s: %s",
+                           elapsed * 1000, stats.request.method, view, stats.trace_id or "-", sql)
+
+
+def install(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        connection_created.connect(install, dispatch_uid="api.middleware.install")
+        # Connections opened before this middleware existed.
+        for connection in connections.all(initialized_only=True):
+            install(connection)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        stats = RequestStats(request, settings.SLOW_QUERY_MS)
+        token = _current.set(stats)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.record(request, response, stats, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        stats = RequestStats(request, settings.SLOW_QUERY_MS)
+        token = _current.set(stats)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.record(request, response, stats, time.perf_counter() - start)
+        return response
+
+    def record(self, request, response, stats, seconds):
+        view, method = view_label(request), request.method
+        metrics.request_duration.observe(seconds, view, method)
+        metrics.request_queries.observe(stats.queries, view, method)
+        metrics.request_db_duration.observe(stats.db_seconds, view, method)
+        metrics.responses.inc(view, method, str(response.status_code))
+        response["Server-Timing"] = (
+            f"app;dur={seconds * 1000:.1f}, "
+            f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries"'
+        )
+        if stats.trace_id:
+            response[TRACE_HEADER] = stats.trace_id
@@ -0,0 +1,85 @@
+# Generated by Django 5.0.14 on 2026-10-17 04:04
+
+import re
+
+from django.db import migrations, models
+
+# normalize_phone as it stood when this migration was written; the live one in
+# api.phone may change (another default country code, say) without changing
+# what this migration does.
+_NON_DIGITS = re.compile(r"\D")
+COUNTRY_CODE = "92"
+NATIONAL_NUMBER_LENGTH = 10
+
+
+def normalize_phone(raw):
+    raw = str(raw or "").strip()
+    digits = _NON_DIGITS.sub("", raw)
+    if not digits:
+        return ""
+    if raw.startswith("+"):
+        return f"+{digits}"
+    if digits.startswith("00"):
+        return f"+{digits[2:]}"
+    if digits.startswith("0") and len(digits) == NATIONAL_NUMBER_LENGTH + 1:
+        return f"+{COUNTRY_CODE}{digits[1:]}"
+    if len(digits) == NATIONAL_NUMBER_LENGTH:
+        return f"+{COUNTRY_CODE}{digits}"
+    return f"+{digits}"
+
+
+def fill_phone_canonical(apps, schema_editor):
+    """Fill the canonical phone, which must be unique.
+
+    "0300 1234567" and "+923001234567" could be stored as separate customers.
+    Which name and address are right is for an operator to decide, so the
+    migration stops and lists such customers, as it does those whose phone
+    has no digits at all.
+    """
+    Customer = apps.get_model("api", "Customer")
+    by_canonical = {}
+    for customer in Customer.objects.only("pk", "phone").order_by("pk"):
+        customer.phone_canonical = normalize_phone(customer.phone)
+        by_canonical.setdefault(customer.phone_canonical, []).append(customer)
+
+    def listed(customers):
+        return ", ".join(f"#{c.pk} {c.phone!r}" for c in customers)
+
+    invalid = by_canonical.pop("", [])
+    if invalid:
+        raise RuntimeError(
+            f"Customers with no digits in their phone number: {listed(invalid)}. "
+            "Correct or delete them, then migrate again."
+        )
+    duplicates = [customers for customers in by_canonical.values() if len(customers) > 1]
+    if duplicates:
+        raise RuntimeError(
+            "Customers sharing a phone number: "
+            + "; ".join(f"{c[0].phone_canonical} ({listed(c)})" for c in duplicates)
+            + ". Merge them (moving their bills) or correct their phones, then migrate again."
+        )
+    Customer.objects.bulk_update(
+        [c for customers in by_canonical.values() for c in customers],
+        ["phone_canonical"], batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0002_rename_parent_menusubcategory_category_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="customer",
+            name="phone_canonical",
+            field=models.CharField(editable=False, max_length=16, null=True),
+        ),
+        migrations.RunPython(fill_phone_canonical, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="customer",
+            name="phone_canonical",
+            field=models.CharField(editable=False, max_length=16, unique=True),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.0.14 on 2026-10-17 04:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0003_customer_phone_canonical"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="bill",
+            name="customer",
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name="bills", to="api.customer"),
+        ),
+        migrations.AlterField(
+            model_name="billitem",
+            name="bill",
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name="items", to="api.bill"),
+        ),
+        migrations.AlterField(
+            model_name="menuitem",
+            name="subcategory",
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name="menu_items", to="api.menusubcategory"),
+        ),
+        migrations.AddIndex(
+            model_name="bill",
+            index=models.Index(fields=["-created_at", "-id"], name="bill_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="bill",
+            index=models.Index(fields=["customer", "-created_at", "-id"], name="bill_customer_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="bill",
+            index=models.Index(fields=["status", "-created_at", "-id"], name="bill_status_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="bill",
+            index=models.Index(condition=models.Q(("is_paid", False)), fields=["-created_at", "-id"], name="bill_unpaid_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="menuitem",
+            index=models.Index(fields=["subcategory", "is_available"], name="menuitem_subcategory_idx"),
+        ),
+    ]
@@ -1,8 +1,14 @@
 from decimal import Decimal, ROUND_HALF_UP
 from django.db import models, transaction
+from django.db.models import F, Sum
+from django.db.models.functions import Coalesce
+from django.core import exceptions
 from django.core.validators import MinValueValidator
 from django.utils import timezone
 
+from . import events
+from .phone import normalize_phone, phone_cache
+
 # -------------------------------
 # Menu & Categories
 # -------------------------------
@@ -33,12 +39,21 @@ class MenuSubCategory(models.Model):
 
 class MenuItem(models.Model):
     name = models.CharField(max_length=100)
+    # Indexed by menuitem_subcategory_idx below, which leads with it.
     subcategory = models.ForeignKey(
-        MenuSubCategory, related_name="menu_items", on_delete=models.CASCADE
+        MenuSubCategory, related_name="menu_items", on_delete=models.CASCADE,
+        db_index=False,
     )
     description = models.TextField(blank=True, null=True)
     is_available = models.BooleanField(default=True)
 
+    class Meta:
+        indexes = [
+            # Item listings and the search index load items per subcategory,
+            # the ordering tools only want the available ones.
+            models.Index(fields=["subcategory", "is_available"], name="menuitem_subcategory_idx"),
+        ]
+
     def __str__(self):
         return f"{self.name}"
 
@@ -61,14 +76,64 @@ class MenuItemSize(models.Model):
 # Customers
 # -------------------------------
 
+class CustomerQuerySet(models.QuerySet):
+    def by_phone(self, raw):
+        """Return the customer for any spelling of a phone number, or None.
+
+        One query: a cached phone -> id hit becomes a primary key lookup,
+        otherwise the indexed canonical column is searched.
+        """
+        canonical = normalize_phone(raw)
+        if not canonical:
+            return None
+        customer_id = phone_cache.get(canonical)
+        if customer_id is not None:
+            customer = self.filter(pk=customer_id, phone_canonical=canonical).first()
+            if customer is not None:
+                return customer
+        customer = self.filter(phone_canonical=canonical).first()
+        if customer is not None:
+            phone_cache.set(canonical, customer.pk)
+        return customer
+
+    async def aby_phone(self, raw):
+        """Async ``by_phone`` for the async views, same single query."""
+        canonical = normalize_phone(raw)
+        if not canonical:
+            return None
+        customer_id = phone_cache.get(canonical)
+        if customer_id is not None:
+            customer = await self.filter(pk=customer_id, phone_canonical=canonical).afirst()
+            if customer is not None:
+                return customer
+        customer = await self.filter(phone_canonical=canonical).afirst()
+        if customer is not None:
+            phone_cache.set(canonical, customer.pk)
+        return customer
+
+
 class Customer(models.Model):
     first_name = models.CharField(max_length=100)
     last_name = models.CharField(max_length=100)
     phone = models.CharField(max_length=15, unique=True)
+    # E.164 form of `phone` ("+923001234567"), used for every lookup.
+    phone_canonical = models.CharField(max_length=16, unique=True, editable=False)
     address = models.CharField(max_length=255)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CustomerQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        self.phone_canonical = normalize_phone(self.phone)
+        if not self.phone_canonical:
+            # Every phone without digits would be the same customer.
+            raise exceptions.ValidationError({"phone": "Enter a valid phone number."})
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "phone" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "phone_canonical"}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
 
@@ -77,6 +142,28 @@ class Customer(models.Model):
 # Billing
 # -------------------------------
 
+class BillQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        """bulk_create skips save(), so compute each new bill's totals here."""
+        objs = list(objs)
+        for bill in objs:
+            if bill.pk is None:
+                bill.set_initial_totals()
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def with_details(self):
+        """Prefetch everything BillSerializer touches, in a constant number of queries."""
+        return self.select_related("customer").prefetch_related(
+            models.Prefetch(
+                "items", queryset=BillItem.objects.select_related("item", "size__subcategory")
+            )
+        )
+
+
+# Bills in these states are done with; everything else is still open.
+CLOSED_BILL_STATUSES = ("delivered", "cancelled")
+
+
 class Bill(models.Model):
     BILL_STATUS_CHOICES = [
         ("pending", "Pending"),
@@ -102,8 +189,9 @@ class Bill(models.Model):
         ("delivery", "Delivery"),
     ]
 
+    # Indexed by bill_customer_created_idx below, which leads with it.
     customer = models.ForeignKey(
-        Customer, related_name="bills", on_delete=models.CASCADE
+        Customer, related_name="bills", on_delete=models.CASCADE, db_index=False
     )
     status = models.CharField(
         max_length=20, choices=BILL_STATUS_CHOICES, default="pending"
@@ -131,6 +219,30 @@ class Bill(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = BillQuerySet.as_manager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        bill = super().from_db(db, field_names, values)
+        # The status as loaded, so saving can tell a transition (signals.py).
+        bill._loaded_status = bill.__dict__.get("status")
+        return bill
+
+    class Meta:
+        # Bill listings are paged newest first (BillCursorPagination), so each
+        # index ends in (created_at, id) descending: the filter is an index
+        # range and the page comes off it in order, without a sort.
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="bill_created_idx"),
+            models.Index(fields=["customer", "-created_at", "-id"], name="bill_customer_created_idx"),
+            models.Index(fields=["status", "-created_at", "-id"], name="bill_status_created_idx"),
+            # The kitchen's is_paid=false view; only unpaid bills are in it.
+            models.Index(
+                fields=["-created_at", "-id"], name="bill_unpaid_created_idx",
+                condition=models.Q(is_paid=False),
+            ),
+        ]
+
     # ---------- Helpers ----------
     @staticmethod
     def _quantize(v: Decimal) -> Decimal:
@@ -144,13 +256,20 @@ class Bill(models.Model):
         return Decimal("5.00") if self.payment_method == "cash" else Decimal("16.00")
 
     def calculate_subtotal(self) -> Decimal:
-        """Sum all related BillItems."""
+        """Sum all related BillItems in a single aggregate query."""
         # If the bill isn't saved yet it has no PK and reverse relations
         # cannot be used. In that case treat subtotal as zero; the caller
         # (save/create flow) will recalculate after related items exist.
         if not self.pk:
             return Decimal("0.00")
-        return self._quantize(sum((item.get_total_price() for item in self.items.all()), Decimal("0.00")))
+        # Items saved before unit_price existed fall back to the size price.
+        subtotal = self.items.aggregate(
+            subtotal=Sum(
+                Coalesce("unit_price", "size__price") * F("quantity"),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2),
+            )
+        )["subtotal"]
+        return self._quantize(subtotal or Decimal("0.00"))
 
     def calculate_tax(self) -> Decimal:
         return self._quantize((self.subtotal * self.tax_rate) / Decimal("100"))
@@ -159,15 +278,20 @@ class Bill(models.Model):
         total = self.subtotal + self.tax_amount + self.delivery_fee + self.tip_amount - self.discount_amount
         return self._quantize(total)
 
-    def update_totals(self, save: bool = True):
-        """Recalculate subtotal, tax, and total."""
-        self.subtotal = self.calculate_subtotal()
+    def update_totals(self, save: bool = True, subtotal: Decimal = None):
+        """Recalculate subtotal, tax, and total.
+
+        Pass ``subtotal`` when it is already known to skip the aggregate
+        query. With ``save=True`` the totals are written in one UPDATE.
+        """
+        self.subtotal = self.calculate_subtotal() if subtotal is None else subtotal
         self.tax_rate = self.get_tax_rate_by_payment_method()
         self.tax_amount = self.calculate_tax()
         self.total_amount = self.calculate_total()
 
         if save:
-            self.save(update_fields=[
+            # Model.save directly: our save() would recalculate everything again.
+            super().save(update_fields=[
                 "subtotal", "tax_rate", "tax_amount",
                 "delivery_fee", "tip_amount", "discount_amount",
                 "total_amount", "updated_at"
@@ -175,16 +299,50 @@ class Bill(models.Model):
 
     def add_tip_percentage(self, percentage: float):
         with transaction.atomic():
-            self.update_totals(save=False)
-            self.tip_amount = self._quantize((self.subtotal * Decimal(str(percentage))) / Decimal("100"))
-            self.update_totals(save=True)
+            subtotal = self.calculate_subtotal()
+            self.tip_amount = self._quantize((subtotal * Decimal(str(percentage))) / Decimal("100"))
+            self.update_totals(save=True, subtotal=subtotal)
 
     def add_tip_amount(self, amount: float):
         with transaction.atomic():
-            self.update_totals(save=False)
             self.tip_amount = self._quantize(Decimal(str(amount)))
             self.update_totals(save=True)
 
+    def add_items(self, lines):
+        """Add ``(item, size, quantity)`` lines in one transaction.
+
+        New lines are inserted with a single bulk_create, lines for an
+        item/size already on the bill increase its quantity, and totals are
+        recalculated once at the end instead of once per item. Returns the
+        refreshed bill.
+        """
+        merged = {}
+        for item, size, quantity in lines:
+            key = (item.pk, size.pk)
+            if key in merged:
+                merged[key].quantity += quantity
+            else:
+                merged[key] = BillItem(
+                    bill=self, item=item, size=size,
+                    quantity=quantity, unit_price=size.price,
+                )
+
+        with transaction.atomic():
+            bill = Bill.objects.select_for_update().get(pk=self.pk)
+            existing = []
+            for row in bill.items.filter(item__in={k[0] for k in merged}):
+                new = merged.pop((row.item_id, row.size_id), None)
+                if new is not None:
+                    row.quantity += new.quantity
+                    existing.append(row)
+            created = BillItem.objects.bulk_create(merged.values())
+            if existing:
+                BillItem.objects.bulk_update(existing, ["quantity"])
+            bill.update_totals(save=True)
+            # Bulk writes send no signals; publish the lines here.
+            events.bill_items_changed(bill.pk, [*created, *existing])
+        return bill
+
     def mark_paid(self, payment_method: str = None, notes: str = None):
         with transaction.atomic():
             if payment_method:
@@ -194,26 +352,29 @@ class Bill(models.Model):
             self.is_paid = True
             self.paid_at = timezone.now()
             self.update_totals(save=False)
-            self.save(update_fields=[
+            super().save(update_fields=[
                 "payment_method", "notes", "is_paid", "paid_at",
                 "subtotal", "tax_rate", "tax_amount", "total_amount", "updated_at"
             ])
 
+    def set_initial_totals(self):
+        """Fill in tax rate and totals for a bill that isn't saved yet.
+
+        A new bill has no items, so its subtotal is whatever it was built
+        with (zero by default) and everything else follows from the payment
+        method and fees. No queries are needed.
+        """
+        self.update_totals(save=False, subtotal=self._quantize(self.subtotal))
+
     def save(self, *args, **kwargs):
         """Ensure totals are always correct.
 
-        Important: when creating a new Bill the related reverse relation
-        `self.items` is not available until the Bill has a primary key.
-        Accessing `self.items.all()` before the Bill is saved raises
-        ValueError. To avoid that, when the instance has no pk yet we
-        perform an initial save to obtain the pk, then update totals and
-        save again.
+        A new bill gets its totals computed up front and is written with a
+        single INSERT; existing bills are recalculated from their items.
         """
         if self.pk is None:
-            # First save to obtain a primary key so reverse relations work.
+            self.set_initial_totals()
             super().save(*args, **kwargs)
-            # Recalculate totals now that self.items can be queried.
-            self.update_totals(save=True)
         else:
             # Existing instance: recalc totals without saving inside update
             self.update_totals(save=False)
@@ -223,9 +384,15 @@ class Bill(models.Model):
         return f"Bill #{self.pk} for {self.customer} - {self.total_amount}"
 
 
+OPEN_BILL_STATUSES = tuple(
+    status for status, _ in Bill.BILL_STATUS_CHOICES if status not in CLOSED_BILL_STATUSES
+)
+
+
 class BillItem(models.Model):
+    # Indexed by the (bill, item, size) unique constraint, which leads with it.
     bill = models.ForeignKey(
-        Bill, related_name="items", on_delete=models.CASCADE
+        Bill, related_name="items", on_delete=models.CASCADE, db_index=False
     )
     item = models.ForeignKey(
         MenuItem, related_name="bill_items", on_delete=models.CASCADE
@@ -253,28 +420,43 @@ class BillItem(models.Model):
     def get_total_price(self) -> Decimal:
         return self.total_price
 
+    @staticmethod
+    def refresh_bill_totals(bill_id):
+        """Lock the bill and rewrite its totals: one aggregate plus one UPDATE."""
+        with transaction.atomic(savepoint=False):
+            bill = Bill.objects.select_for_update().get(pk=bill_id)
+            bill.update_totals(save=True)
+        return bill
+
     def save(self, *args, **kwargs):
         if self.unit_price is None:
             self.unit_price = Decimal(self.size.price)
-        super().save(*args, **kwargs)
-
-        # Refresh bill totals
-        try:
-            with transaction.atomic():
-                bill = Bill.objects.select_for_update().get(pk=self.bill.pk)
-                bill.update_totals(save=True)
-        except Exception:
-            self.bill.update_totals(save=True)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self.refresh_bill_totals(self.bill_id)
 
     def delete(self, *args, **kwargs):
-        bill = self.bill
-        super().delete(*args, **kwargs)
-        try:
-            with transaction.atomic():
-                bill = Bill.objects.select_for_update().get(pk=bill.pk)
-                bill.update_totals(save=True)
-        except Exception:
-            bill.update_totals(save=True)
+        bill_id = self.bill_id
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            self.refresh_bill_totals(bill_id)
+        return result
 
     def __str__(self):
         return f"{self.quantity} x {self.size.name} - {self.total_price}"
+
+
+# -------------------------------
+# Idempotency keys
+# -------------------------------
+
+class IdempotencyKey(models.Model):
+    """A write run under an Idempotency-Key, and its response (api/idempotency.py)."""
+    # Digest of the request's method, path and key.
+    key = models.CharField(max_length=32, primary_key=True)
+    fingerprint = models.CharField(max_length=32)
+    # Null while the first request is still running.
+    status = models.PositiveSmallIntegerField(null=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    content = models.BinaryField(blank=True)
+    expires_at = models.DateTimeField(db_index=True)
@@ -0,0 +1,9 @@
+from rest_framework.pagination import CursorPagination
+
+
+class BillCursorPagination(CursorPagination):
+    """Newest bills first; cursor paging keeps deep pages as cheap as the first."""
+    ordering = ("-created_at", "-id")
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
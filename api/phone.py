@@ -0,0 +1,79 @@
+"""Phone number normalisation and a per-process phone -> customer id cache.
+
+WhatsApp sends "+923001234567", customers type "0300 1234567" and older
+records may hold "923001234567". Everything is reduced to one E.164 form so
+lookups hit a single indexed column.
+"""
+import re
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+_NON_DIGITS = re.compile(r"\D")
+
+
+def normalize_phone(raw) -> str:
+    """Return ``raw`` in E.164 form ("+923001234567").
+
+    Numbers without a country code are assumed to be local to
+    ``settings.PHONE_DEFAULT_COUNTRY_CODE``.
+    """
+    raw = str(raw or "").strip()
+    digits = _NON_DIGITS.sub("", raw)
+    if not digits:
+        return ""
+    country = str(getattr(settings, "PHONE_DEFAULT_COUNTRY_CODE", "92"))
+    national_length = getattr(settings, "PHONE_NATIONAL_NUMBER_LENGTH", 10)
+
+    if raw.startswith("+"):
+        return f"+{digits}"
+    if digits.startswith("00"):
+        return f"+{digits[2:]}"
+    if digits.startswith("0") and len(digits) == national_length + 1:
+        return f"+{country}{digits[1:]}"
+    if len(digits) == national_length:
+        return f"+{country}{digits}"
+    if digits.startswith(country) and len(digits) == len(country) + national_length:
+        return f"+{digits}"
+    return f"+{digits}"
+
+
+class PhoneCache:
+    """Small LRU map of canonical phone -> customer id.
+
+    Only hits are cached: a miss always goes to the database, so a customer
+    created by another process is never reported as missing.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, phone):
+        with self._lock:
+            customer_id = self._data.get(phone)
+            if customer_id is not None:
+                self._data.move_to_end(phone)
+            return customer_id
+
+    def set(self, phone, customer_id):
+        with self._lock:
+            self._data[phone] = customer_id
+            self._data.move_to_end(phone)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def discard_customer(self, customer_id):
+        """Forget every phone mapped to ``customer_id`` (its phone may have changed)."""
+        with self._lock:
+            for phone in [p for p, cid in self._data.items() if cid == customer_id]:
+                del self._data[phone]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+phone_cache = PhoneCache()
@@ -0,0 +1,69 @@
+"""orjson-backed JSON renderer and parser, installed in ``REST_FRAMEWORK``.
+
+orjson encodes dicts, lists, strings and numbers in C. Everything else
+(Decimal, datetimes, lazy strings...) goes through DRF's own encoder, so the
+bytes are exactly what DRF's JSONRenderer would produce: prices stay strings
+because the serializers emit them as strings, and a bare Decimal such as
+``get_total_price`` stays a number. Bytes are taken to be JSON that was
+already rendered (the menu snapshot) and are passed through as-is.
+
+orjson is optional. Without it both classes behave exactly like DRF's.
+"""
+import json
+
+from rest_framework import renderers
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+_default = JSONEncoder().default
+
+
+def dumps(data) -> bytes:
+    """Compact JSON bytes, as DRF would render them."""
+    if orjson is None:
+        return renderers.JSONRenderer().render(data)
+    ret = orjson.dumps(
+        data,
+        default=_default,
+        # Datetimes too: DRF writes UTC as "Z" where orjson writes "+00:00".
+        option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+    )
+    # Same as DRF: keep the output safe to embed in JavaScript.
+    if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+        ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+    return ret
+
+
+def loads(data):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if isinstance(data, (bytes, bytearray)):
+            return bytes(data)
+        # An indented response was asked for; orjson only knows two spaces.
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        try:
+            # orjson takes UTF-8 only, which is what JSON bodies are.
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
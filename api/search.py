@@ -0,0 +1,333 @@
+"""In-memory fuzzy search over the menu.
+
+Resolves free text such as "large zingr burger" to ranked
+``(item_id, size_id, price)`` candidates in one call, instead of the agent
+walking categories -> items -> sizes and matching names itself.
+
+Item names, descriptions and subcategory/category names go into a token
+index; a trigram index over the token vocabulary handles typos and partial
+words. Sizes belong to subcategories, so each candidate item is paired with
+the size the query names (or every size of the item when none is named).
+
+The index is built lazily from the database and then kept up to date
+incrementally by ``api/signals.py``. It remembers the menu version it
+reflects, so a change made by another process (which bumps the shared
+version) triggers a full rebuild on the next query.
+"""
+import heapq
+import re
+import threading
+from collections import Counter, defaultdict
+
+from .menu import get_menu_version
+from .models import MenuCategory, MenuItem, MenuItemSize, MenuSubCategory
+
+FIELD_WEIGHTS = {
+    "name": 3.0,
+    "subcategory": 2.0,
+    "category": 1.5,
+    "description": 0.5,
+}
+SIZE_WEIGHT = 2.0
+MIN_SIMILARITY = 0.5
+MAX_FUZZY_MATCHES = 5
+NO_SIZE = {"size_id": None, "size": None, "price": None}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    """Lowercase alphanumeric tokens with a light plural strip ("cokes" -> "coke")."""
+    tokens = []
+    for token in _TOKEN_RE.findall((text or "").lower()):
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def trigrams(token):
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class MenuIndex:
+    def __init__(self):
+        self.version = None
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self.items = {}                        # item_id -> document
+        self.sizes = defaultdict(list)         # subcategory_id -> [size document]
+        self._postings = defaultdict(dict)     # token -> {item_id: weight}
+        self._size_tokens = defaultdict(set)   # token -> {size_id}
+        self._trigrams = defaultdict(set)      # trigram -> {token}
+        self._gram_counts = {}                 # token -> number of trigrams
+        self._match_cache = {}                 # query token -> [(token, similarity)]
+        self._resolved = {}                    # query token -> (weights, sizes)
+        self._size_subcategory = {}            # size_id -> subcategory_id
+        self._unavailable = set()              # item ids not currently orderable
+
+    # ---------- Building ----------
+
+    def _add_token(self, token):
+        if token not in self._gram_counts:
+            grams = trigrams(token)
+            for gram in grams:
+                self._trigrams[gram].add(token)
+            self._gram_counts[token] = len(grams)
+            self._match_cache.clear()
+
+    def add_item(self, item_id, name, description, is_available,
+                 subcategory_id, subcategory, category_id, category):
+        doc = {
+            "item_id": item_id,
+            "item": name,
+            "is_available": is_available,
+            "subcategory_id": subcategory_id,
+            "subcategory": subcategory,
+            "category_id": category_id,
+            "category": category,
+            "tokens": set(),
+        }
+        self._resolved.clear()
+        for field, text in (("name", name), ("subcategory", subcategory),
+                            ("category", category), ("description", description)):
+            weight = FIELD_WEIGHTS[field]
+            for token in tokenize(text):
+                self._add_token(token)
+                posting = self._postings[token]
+                if posting.get(item_id, 0) < weight:
+                    posting[item_id] = weight
+                doc["tokens"].add(token)
+        self.items[item_id] = doc
+        if not is_available:
+            self._unavailable.add(item_id)
+
+    def remove_item(self, item_id):
+        doc = self.items.pop(item_id, None)
+        if doc is None:
+            return
+        self._unavailable.discard(item_id)
+        self._resolved.clear()
+        for token in doc["tokens"]:
+            posting = self._postings.get(token)
+            if posting is not None:
+                posting.pop(item_id, None)
+                if not posting:
+                    del self._postings[token]
+        # Trigram entries for vanished tokens are left behind; they only
+        # cost a lookup and are dropped on the next full rebuild.
+
+    def set_sizes(self, subcategory_id, sizes):
+        """Replace the ``(size_id, name, price)`` list of a subcategory."""
+        self._resolved.clear()
+        for size in self.sizes.pop(subcategory_id, []):
+            for token in size["tokens"]:
+                self._size_tokens[token].discard(size["size_id"])
+            self._size_subcategory.pop(size["size_id"], None)
+        for size_id, name, price in sizes:
+            tokens = set(tokenize(name))
+            for token in tokens:
+                self._add_token(token)
+                self._size_tokens[token].add(size_id)
+            self._size_subcategory[size_id] = subcategory_id
+            self.sizes[subcategory_id].append({
+                "size_id": size_id, "size": name, "price": str(price), "tokens": tokens,
+            })
+
+    def _load_items(self, queryset):
+        for item in queryset.select_related("subcategory__category"):
+            sub = item.subcategory
+            self.add_item(item.pk, item.name, item.description, item.is_available,
+                          sub.pk, sub.name, sub.category_id, sub.category.name)
+
+    def _load_sizes(self, subcategory_ids=None):
+        qs = MenuItemSize.objects.order_by("subcategory_id", "price", "pk")
+        if subcategory_ids is not None:
+            qs = qs.filter(subcategory_id__in=subcategory_ids)
+        grouped = defaultdict(list)
+        for size in qs:
+            grouped[size.subcategory_id].append((size.pk, size.name, size.price))
+        for subcategory_id in subcategory_ids or grouped:
+            self.set_sizes(subcategory_id, grouped.get(subcategory_id, []))
+
+    def rebuild(self, version=None):
+        with self._lock:
+            self._reset()
+            self._load_items(MenuItem.objects.all())
+            self._load_sizes()
+            self.version = get_menu_version() if version is None else version
+
+    def apply_change(self, instance, deleted, version):
+        """Update the index for one saved/deleted menu row."""
+        with self._lock:
+            if self.version is None:
+                return  # not built yet; the first query builds it
+            if isinstance(instance, MenuItem):
+                self.remove_item(instance.pk)
+                if not deleted:
+                    self._load_items(MenuItem.objects.filter(pk=instance.pk))
+            elif isinstance(instance, MenuItemSize):
+                self._load_sizes([instance.subcategory_id])
+            elif isinstance(instance, MenuSubCategory):
+                for item_id in [i for i, d in self.items.items() if d["subcategory_id"] == instance.pk]:
+                    self.remove_item(item_id)
+                self._load_items(MenuItem.objects.filter(subcategory_id=instance.pk))
+                self._load_sizes([instance.pk])
+            elif isinstance(instance, MenuCategory):
+                for item_id in [i for i, d in self.items.items() if d["category_id"] == instance.pk]:
+                    self.remove_item(item_id)
+                self._load_items(MenuItem.objects.filter(subcategory__category_id=instance.pk))
+            self.version = version
+
+    # ---------- Querying ----------
+
+    def _matches(self, token):
+        """Vocabulary tokens similar to ``token`` as ``(token, similarity)``."""
+        cached = self._match_cache.get(token)
+        if cached is not None:
+            return cached
+        if token in self._postings or token in self._size_tokens:
+            matches = [(token, 1.0)]
+        else:
+            grams = trigrams(token)
+            overlap = Counter()
+            for gram in grams:
+                overlap.update(self._trigrams.get(gram, ()))
+            matches = []
+            for candidate, shared in overlap.items():
+                # Dice coefficient over padded trigrams.
+                similarity = 2 * shared / (len(grams) + self._gram_counts[candidate])
+                if len(token) >= 3 and candidate.startswith(token):
+                    similarity = max(similarity, 0.8)
+                if similarity >= MIN_SIMILARITY:
+                    matches.append((candidate, similarity))
+            # A handful of close spellings is plenty; more only slows scoring.
+            matches = heapq.nlargest(MAX_FUZZY_MATCHES, matches, key=lambda m: m[1])
+        if len(self._match_cache) > 10000:
+            self._match_cache.clear()
+        self._match_cache[token] = matches
+        return matches
+
+    def _resolve(self, token):
+        """``({item_id: weight}, {size_id: similarity})`` for one query token.
+
+        Fuzzy matches are merged into a single weight map (best match per
+        item, scaled by similarity) and cached until the index changes.
+        """
+        cached = self._resolved.get(token)
+        if cached is not None:
+            return cached
+        matches = self._matches(token)
+        if len(matches) == 1 and matches[0][1] == 1.0:
+            weights = self._postings.get(token, {})
+        else:
+            weights = {}
+            for match, similarity in matches:
+                for item_id, weight in self._postings.get(match, {}).items():
+                    if weight * similarity > weights.get(item_id, 0):
+                        weights[item_id] = weight * similarity
+        sizes = {}
+        for match, similarity in matches:
+            for size_id in self._size_tokens.get(match, ()):
+                sizes[size_id] = max(sizes.get(size_id, 0), similarity)
+        if len(self._resolved) > 10000:
+            self._resolved.clear()
+        self._resolved[token] = (weights, sizes)
+        return weights, sizes
+
+    def _ensure_current(self):
+        if self.version is None or self.version != get_menu_version():
+            self.rebuild()
+
+    def price_lines(self, pairs):
+        """Look up ``(item_id, size_id)`` pairs in memory.
+
+        Returns ``{(item_id, size_id): {"item", "size", "price", "is_available"}}``;
+        pairs naming a missing item, or a size the item doesn't come in, are
+        left out.
+        """
+        with self._lock:
+            self._ensure_current()
+            found = {}
+            for item_id, size_id in pairs:
+                doc = self.items.get(item_id)
+                if doc is None or self._size_subcategory.get(size_id) != doc["subcategory_id"]:
+                    continue
+                size = next(s for s in self.sizes[doc["subcategory_id"]] if s["size_id"] == size_id)
+                found[(item_id, size_id)] = {
+                    "item": doc["item"], "size": size["size"], "price": size["price"],
+                    "is_available": doc["is_available"],
+                }
+            return found
+
+    def has_item(self, item_id):
+        with self._lock:
+            self._ensure_current()
+            return item_id in self.items
+
+    def has_size(self, size_id):
+        with self._lock:
+            self._ensure_current()
+            return size_id in self._size_subcategory
+
+    def search(self, query, limit=10, available_only=True):
+        with self._lock:
+            self._ensure_current()
+
+            # Per query token: item weights and the size ids it names.
+            token_weights, size_hits = [], {}
+            for token in tokenize(query):
+                weights, sizes = self._resolve(token)
+                if weights:
+                    token_weights.append(weights)
+                for size_id, similarity in sizes.items():
+                    size_hits[size_id] = max(size_hits.get(size_id, 0), similarity)
+            if not token_weights:
+                return []
+
+            # Prefer items matching every token; fall back to any token. The
+            # set algebra runs in C, so only the survivors are scored in Python.
+            matched = [set(weights) for weights in token_weights]
+            candidates = set.intersection(*matched) or set.union(*matched)
+            if available_only:
+                candidates -= self._unavailable
+
+            sub_bonus = {}
+            for size_id, similarity in size_hits.items():
+                sub_id = self._size_subcategory.get(size_id)
+                if sub_id is not None:
+                    sub_bonus[sub_id] = max(sub_bonus.get(sub_id, 0), SIZE_WEIGHT * similarity)
+
+            totals = dict.fromkeys(candidates, 0.0)
+            for weights in token_weights:
+                for item_id in candidates:
+                    totals[item_id] += weights.get(item_id, 0)
+            if sub_bonus:
+                for item_id in candidates:
+                    totals[item_id] += sub_bonus.get(self.items[item_id]["subcategory_id"], 0)
+
+            results = []
+            for item_id in heapq.nlargest(limit, totals, key=totals.__getitem__):
+                item_score = totals[item_id]
+                doc = self.items[item_id]
+                sizes = self.sizes.get(doc["subcategory_id"]) or [NO_SIZE]
+                named = [size for size in sizes if size["size_id"] in size_hits]
+                for size in named or sizes:
+                    results.append({
+                        "item_id": item_id,
+                        "item": doc["item"],
+                        "size_id": size["size_id"],
+                        "size": size["size"],
+                        "price": size["price"],
+                        "subcategory": doc["subcategory"],
+                        "category": doc["category"],
+                        "is_available": doc["is_available"],
+                        "score": round(item_score, 3),
+                    })
+            return results[:limit]
+
+
+menu_index = MenuIndex()
@@ -1,12 +1,119 @@
+from decimal import Decimal
+
+from django.db import IntegrityError, models, transaction
 from rest_framework import serializers
+from rest_framework.settings import api_settings
 from .models import *
+from .phone import normalize_phone
+from .search import menu_index
+
+
+def field_options(params):
+    """Parse the ``fields``, ``expand`` and ``compact`` query params (see DynamicFieldsMixin)."""
+    def names(key):
+        value = params.get(key)
+        if not value:
+            return None
+        return {name.strip() for name in str(value).split(',') if name.strip()}
+
+    return {
+        'fields': names('fields'),
+        'expand': names('expand'),
+        'compact': str(params.get('compact', '')).lower() in ('1', 'true', 'yes'),
+    }
+
+
+class DynamicFieldsMixin:
+    """Let callers trim the output, mostly to keep LLM context small.
+
+    - ``fields``: only these fields are rendered.
+    - ``compact``: the parent objects listed in ``Meta.compact_fields`` are
+      rendered as a flat ``<name>_id`` instead of a nested object...
+    - ``expand``: ...except these.
+
+    Only the top-level serializer of a response applies them (nested ones
+    keep their shape), taking them from ``context['field_options']`` or else
+    the request's query params.
+    """
+
+    def _field_options(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        if parent is not None:
+            return None
+        if 'field_options' in self.context:
+            return self.context['field_options']
+        request = self.context.get('request')
+        if request is None:
+            return None
+        return field_options(getattr(request, 'query_params', request.GET))
+
+    def get_fields(self):
+        fields = super().get_fields()
+        options = self._field_options()
+        if not options:
+            return fields
+        if options['compact']:
+            expand = options['expand'] or ()
+            for name, source in getattr(self.Meta, 'compact_fields', {}).items():
+                if name in expand or name not in fields:
+                    continue
+                del fields[name]
+                flat = f'{name}_id'
+                if flat in fields:
+                    fields[flat].write_only = False
+                else:
+                    fields[flat] = serializers.ReadOnlyField(
+                        **({'source': source} if source != flat else {})
+                    )
+        if options['fields']:
+            for name in [n for n in fields if n not in options['fields']]:
+                # Hide, but keep accepting, fields a write payload may carry.
+                if fields[name].read_only:
+                    del fields[name]
+                else:
+                    fields[name].write_only = True
+        return fields
+
+
+class MoneyField(serializers.DecimalField):
+    """DecimalField that skips re-quantizing values already at its scale.
+
+    Model decimals come back from the database with exactly
+    ``decimal_places`` digits, so their string form is the answer; anything
+    else goes through DRF.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        coerce = getattr(self, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+        self._plain_text = (
+            coerce and not self.localize and not self.normalize_output and bool(self.decimal_places)
+        )
+
+    def to_representation(self, value):
+        if self._plain_text and isinstance(value, Decimal):
+            text = f"{value:f}"
+            places = self.decimal_places
+            if text[-places - 1:-places] == ".":
+                return text
+        return super().to_representation(value)
+
+
+class APIModelSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    serializer_field_mapping = {
+        **serializers.ModelSerializer.serializer_field_mapping,
+        models.DecimalField: MoneyField,
+    }
+
 
 class MenuSubCategorySimpleSerializer(serializers.ModelSerializer):
     class Meta:
         model = MenuSubCategory
         fields = ['id', 'name']
 
-class MenuCategorySerializer(serializers.ModelSerializer):
+class MenuCategorySerializer(APIModelSerializer):
     subcategories = MenuSubCategorySimpleSerializer(many=True, read_only=True)
 
     class Meta:
@@ -18,49 +125,195 @@ class MenuCategorySimpleSerializer(serializers.ModelSerializer):
         model = MenuCategory
         fields = ['id', 'name']
 
-class MenuItemSerializer(serializers.ModelSerializer):
+class MenuItemSerializer(APIModelSerializer):
     category = serializers.SerializerMethodField()
     subcategory = MenuSubCategorySimpleSerializer(read_only=True)
 
     class Meta:
         model = MenuItem
         fields = ['id', 'name', 'description', 'is_available', 'category', 'subcategory']
+        compact_fields = {'category': 'subcategory.category_id', 'subcategory': 'subcategory_id'}
 
     def get_category(self, obj):
         if obj.subcategory and hasattr(obj.subcategory, 'category'):
             return MenuCategorySimpleSerializer(obj.subcategory.category).data
         return None
 
-class MenuItemSizeSerializer(serializers.ModelSerializer):
+class MenuItemSizeSerializer(APIModelSerializer):
     category = serializers.SerializerMethodField()
     subcategory = MenuSubCategorySimpleSerializer(read_only=True)
 
     class Meta:
         model = MenuItemSize
         fields = ['id', 'name', 'price', 'category', 'subcategory']
+        compact_fields = {'category': 'subcategory.category_id', 'subcategory': 'subcategory_id'}
 
     def get_category(self, obj):
-        if obj.subcategory and hasattr(obj.subcategory, 'parent'):
-            return MenuCategorySimpleSerializer(obj.subcategory.parent).data
+        if obj.subcategory and hasattr(obj.subcategory, 'category'):
+            return MenuCategorySimpleSerializer(obj.subcategory.category).data
         return None
     
-class CustomerSerializer(serializers.ModelSerializer):
+class CustomerSerializer(APIModelSerializer):
     class Meta:
         model = Customer
         fields = ['id', 'first_name', 'last_name', 'phone', 'address', 'created_at']
     # you can adjust fields based on your model
 
+    def validate_phone(self, value):
+        # "0300..." and "+92300..." are the same customer
+        canonical = normalize_phone(value)
+        if not canonical:
+            raise serializers.ValidationError('Enter a valid phone number.')
+        qs = Customer.objects.filter(phone_canonical=canonical)
+        if self.instance is not None:
+            qs = qs.exclude(pk=self.instance.pk)
+        if qs.exists():
+            raise serializers.ValidationError('A customer with this phone number already exists.')
+        return value
+
 
-class BillItemSerializer(serializers.ModelSerializer):
+class BillItemSerializer(APIModelSerializer):
     item = serializers.StringRelatedField()
     size = serializers.StringRelatedField()
+    # writable ids for create payloads; `bill`, `item` and `size` are
+    # accepted as aliases (see to_internal_value)
+    bill_id = serializers.PrimaryKeyRelatedField(
+        source='bill', queryset=Bill.objects.all(), write_only=True
+    )
+    item_id = serializers.PrimaryKeyRelatedField(
+        source='item', queryset=MenuItem.objects.all(), write_only=True
+    )
+    size_id = serializers.PrimaryKeyRelatedField(
+        source='size', queryset=MenuItemSize.objects.all(), write_only=True
+    )
 
     class Meta:
         model = BillItem
-        fields = ['id', 'item', 'size', 'quantity', 'unit_price', 'get_total_price']
+        fields = [
+            'id', 'item', 'size', 'bill_id', 'item_id', 'size_id',
+            'quantity', 'unit_price', 'get_total_price'
+        ]
+        read_only_fields = ['unit_price']
+
+    def to_internal_value(self, data):
+        if hasattr(data, 'get'):
+            data = {**data}
+            for alias in ('bill', 'item', 'size'):
+                if f'{alias}_id' not in data and alias in data:
+                    data[f'{alias}_id'] = data[alias]
+        return super().to_internal_value(data)
+
+    def validate(self, attrs):
+        item, size = attrs.get('item'), attrs.get('size')
+        if item is not None and size is not None:
+            error = validate_bill_line(item, size)
+            if error:
+                raise serializers.ValidationError(error)
+        return attrs
+
+
+def validate_bill_line(item, size):
+    """Return an error dict if `size` can't be ordered for `item`, else None."""
+    if not item.is_available:
+        return {'item_id': 'Menu item is not available.'}
+    if size.subcategory_id != item.subcategory_id:
+        return {'size_id': 'Size does not belong to this item.'}
+    return None
 
 
-class BillSerializer(serializers.ModelSerializer):
+class BillItemLineSerializer(serializers.Serializer):
+    item_id = serializers.IntegerField()
+    size_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1, default=1)
+
+
+class BillItemBulkSerializer(serializers.Serializer):
+    """Validate a list of order lines with two lookups, whatever its length.
+
+    validated_data['items'] is a list of (item, size, quantity) tuples ready
+    for Bill.add_items.
+    """
+    items = BillItemLineSerializer(many=True, allow_empty=False)
+
+    def validate_items(self, lines):
+        return resolve_bill_lines(lines)
+
+
+def resolve_bill_lines(lines):
+    """Turn validated line dicts into (item, size, quantity) tuples.
+
+    Uses two lookups however many lines there are and raises a per-line
+    ValidationError if any item or size is missing or mismatched.
+    """
+    items = MenuItem.objects.in_bulk({line['item_id'] for line in lines})
+    sizes = MenuItemSize.objects.in_bulk({line['size_id'] for line in lines})
+    errors, resolved = [], []
+    for line in lines:
+        item, size = items.get(line['item_id']), sizes.get(line['size_id'])
+        if item is None:
+            error = {'item_id': 'Menu item not found.'}
+        elif size is None:
+            error = {'size_id': 'Size not found.'}
+        else:
+            error = validate_bill_line(item, size) or {}
+        errors.append(error)
+        resolved.append((item, size, line['quantity']))
+    if any(errors):
+        raise serializers.ValidationError(errors)
+    return resolved
+
+
+class CartLineSerializer(BillItemLineSerializer):
+    # A quantity of 0 takes the line out of the cart.
+    quantity = serializers.IntegerField(min_value=0, default=1)
+
+
+class CartLinesSerializer(serializers.Serializer):
+    """Order lines for a draft cart, checked against the in-memory menu.
+
+    validated_data['items'] is a list of (item_id, size_id, quantity) tuples
+    for the cart store; no queries are run.
+    """
+    items = BillItemLineSerializer(many=True, allow_empty=False)
+
+    def validate_items(self, lines):
+        return resolve_cart_lines(lines)
+
+
+class CartQuantitiesSerializer(CartLinesSerializer):
+    items = CartLineSerializer(many=True, allow_empty=False)
+
+
+def resolve_cart_lines(lines):
+    """Like resolve_bill_lines, from the menu index and without the rows.
+
+    Lines that only remove something (quantity 0) are not checked, so a
+    line can be taken out after its item has left the menu.
+    """
+    pairs = [(line['item_id'], line['size_id']) for line in lines]
+    priced = menu_index.price_lines(pairs)
+    errors, resolved = [], []
+    for line, pair in zip(lines, pairs):
+        error = {}
+        if line['quantity']:
+            found = priced.get(pair)
+            if found is not None:
+                if not found['is_available']:
+                    error = {'item_id': 'Menu item is not available.'}
+            elif not menu_index.has_item(pair[0]):
+                error = {'item_id': 'Menu item not found.'}
+            elif not menu_index.has_size(pair[1]):
+                error = {'size_id': 'Size not found.'}
+            else:
+                error = {'size_id': 'Size does not belong to this item.'}
+        errors.append(error)
+        resolved.append((*pair, line['quantity']))
+    if any(errors):
+        raise serializers.ValidationError(errors)
+    return resolved
+
+
+class BillSerializer(APIModelSerializer):
     # nested read-only customer for responses
     customer = CustomerSerializer(read_only=True)
     # writable customer id for create/update payloads (maps to `customer`)
@@ -91,17 +344,75 @@ class BillSerializer(serializers.ModelSerializer):
             'items',
             'created_at'
         ]
+        compact_fields = {'customer': 'customer_id'}
 
-    def create(self, validated_data):
+    def to_internal_value(self, data):
         # Support clients that send `customer` as an integer id instead of
-        # `customer_id`. Ensure validated_data contains a Customer instance
-        # before creating the Bill to avoid DB NOT NULL errors.
-        if 'customer' not in validated_data:
-            raw = self.initial_data.get('customer') or self.initial_data.get('customer_id')
-            if raw is not None:
+        # `customer_id` (the MCP create_bill tool does).
+        if hasattr(data, 'get') and 'customer_id' not in data and 'customer' in data:
+            data = {**data, 'customer_id': data['customer']}
+        return super().to_internal_value(data)
+
+
+class PlaceOrderSerializer(serializers.Serializer):
+    """Upsert the customer by phone, then create a bill with its items.
+
+    Everything happens in one transaction; the response is the created
+    bill in BillSerializer form.
+    """
+    phone = serializers.CharField(max_length=15)
+    first_name = serializers.CharField(max_length=100, required=False, allow_blank=True)
+    last_name = serializers.CharField(max_length=100, required=False, allow_blank=True)
+    address = serializers.CharField(max_length=255, required=False, allow_blank=True)
+    order_type = serializers.ChoiceField(choices=Bill.ORDER_TYPE_CHOICES, default="delivery")
+    payment_method = serializers.ChoiceField(choices=Bill.PAYMENT_METHOD_CHOICES, default="pending")
+    notes = serializers.CharField(required=False, allow_blank=True)
+    items = BillItemLineSerializer(many=True, allow_empty=False)
+
+    CUSTOMER_FIELDS = ('first_name', 'last_name', 'address')
+
+    def validate_phone(self, value):
+        if not normalize_phone(value):
+            raise serializers.ValidationError('Enter a valid phone number.')
+        return value
+
+    def validate_items(self, lines):
+        return resolve_bill_lines(lines)
+
+    def create(self, validated_data):
+        details = {
+            field: validated_data[field]
+            for field in self.CUSTOMER_FIELDS if validated_data.get(field)
+        }
+        phone = validated_data['phone']
+        with transaction.atomic():
+            customer = Customer.objects.by_phone(phone)
+            if customer is None:
+                missing = [field for field in self.CUSTOMER_FIELDS if field not in details]
+                if missing:
+                    raise serializers.ValidationError(
+                        {field: 'Required for a new customer.' for field in missing}
+                    )
                 try:
-                    validated_data['customer'] = Customer.objects.get(pk=raw)
-                except Customer.DoesNotExist:
-                    raise serializers.ValidationError({'customer': 'Customer not found'})
+                    with transaction.atomic():
+                        customer = Customer.objects.create(phone=phone, **details)
+                except IntegrityError:
+                    # Created by a concurrent order for the same phone.
+                    customer = Customer.objects.by_phone(phone)
+            changed = [f for f, v in details.items() if getattr(customer, f) != v]
+            if changed:
+                for field in changed:
+                    setattr(customer, field, details[field])
+                customer.save(update_fields=changed + ['updated_at'])
+
+            bill = Bill.objects.create(
+                customer=customer,
+                order_type=validated_data['order_type'],
+                payment_method=validated_data['payment_method'],
+                notes=validated_data.get('notes') or None,
+            )
+            bill.add_items(validated_data['items'])
+        return Bill.objects.with_details().get(pk=bill.pk)
 
-        return super().create(validated_data)
+    def to_representation(self, instance):
+        return BillSerializer(instance, context=self.context).data
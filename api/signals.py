@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import events
+from .menu import bump_menu_version
+from .models import Bill, BillItem, Customer, MenuCategory, MenuItem, MenuItemSize, MenuSubCategory
+from .phone import phone_cache
+from .search import menu_index
+
+MENU_MODELS = (MenuCategory, MenuSubCategory, MenuItem, MenuItemSize)
+
+
+def commit_menu_change(instance, deleted):
+    """Move the menu to a new version and patch the search index in place."""
+    version = bump_menu_version()
+    menu_index.apply_change(instance, deleted, version)
+
+
+@receiver([post_save, post_delete])
+def menu_changed(sender, instance, signal, **kwargs):
+    """Bump the menu version once the change is committed."""
+    if sender in MENU_MODELS:
+        deleted = signal is post_delete
+        transaction.on_commit(lambda: commit_menu_change(instance, deleted))
+
+
+
+@receiver([post_save, post_delete], sender=Customer)
+def customer_changed(sender, instance, **kwargs):
+    """Drop cached phone -> id entries; the phone may have changed."""
+    phone_cache.discard_customer(instance.pk)
+
+
+@receiver(post_save, sender=Bill)
+def bill_saved(sender, instance, created, update_fields, **kwargs):
+    """Publish new bills and status transitions to the kitchen stream."""
+    if update_fields is not None and "status" not in update_fields:
+        return
+    previous = getattr(instance, "_loaded_status", None)
+    instance._loaded_status = instance.status
+    if created:
+        events.bill_created(instance)
+    elif previous is not None and previous != instance.status:
+        events.bill_status_changed(instance, previous)
+
+
+@receiver(post_save, sender=BillItem)
+def bill_item_saved(sender, instance, **kwargs):
+    events.bill_items_changed(instance.bill_id, [instance])
+
+
+@receiver(post_delete, sender=BillItem)
+def bill_item_deleted(sender, instance, **kwargs):
+    events.bill_items_changed(instance.bill_id, [instance], removed=True)
+
+
+@receiver(connection_created)
+def tune_sqlite(sender, connection, **kwargs):
+    """Apply settings.SQLITE_PRAGMAS to each new SQLite connection."""
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for pragma in getattr(settings, "SQLITE_PRAGMAS", []):
+            cursor.execute(f"PRAGMA {pragma}")
@@ -1,3 +1,1183 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import date
+from decimal import Decimal
+from inspect import iscoroutinefunction
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.http import QueryDict
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path, resolve
+import fastmcp
+from mcp_types import ResourceListChangedNotification
+from rest_framework.test import APITestCase
+
+from . import idempotency, metrics
+from .carts import CartStore, carts, warn_if_unshared
+from .events import bill_events
+from .filters import BillFilter
+from .menu import get_menu_version
+from .models import *
+from .pagination import BillCursorPagination
+from .phone import normalize_phone, phone_cache
+from .urls import async_urlpatterns
+from restaurant import urls as project_urls
+
+
+def seed_menu(categories=2, subcategories=2, items=3, sizes=2, prefix=""):
+    """Create a small menu tree and return its items and sizes."""
+    menu_items, menu_sizes = [], []
+    for c in range(categories):
+        category = MenuCategory.objects.create(name=f"{prefix}cat-{c}")
+        for s in range(subcategories):
+            sub = MenuSubCategory.objects.create(name=f"sub-{s}", category=category)
+            sub_sizes = [
+                MenuItemSize.objects.create(
+                    name=f"size-{z}", price=Decimal("100.00") * (z + 1), subcategory=sub
+                )
+                for z in range(sizes)
+            ]
+            menu_sizes.extend(sub_sizes)
+            for i in range(items):
+                menu_items.append(
+                    MenuItem.objects.create(name=f"{prefix}item-{c}-{s}-{i}", subcategory=sub)
+                )
+    return menu_items, menu_sizes
+
+
+def seed_bills(count, menu_items, menu_sizes, lines=3, prefix=""):
+    """Create customers with one bill each, every bill holding a few items."""
+    bills = []
+    for n in range(count):
+        customer = Customer.objects.create(
+            first_name="Test", last_name=f"{n}", phone=f"{prefix}0300{n:07d}", address="Lahore"
+        )
+        bill = Bill.objects.create(customer=customer, payment_method="cash")
+        for line in range(lines):
+            item = menu_items[(n + line) % len(menu_items)]
+            size = item.subcategory.item_sizes.first()
+            BillItem.objects.create(bill=bill, item=item, size=size, quantity=line + 1)
+        bills.append(bill)
+    return bills
+
+
+class QueryCountTests(APITestCase):
+    """Every list endpoint must use a constant number of queries.
+
+    Each case requests the endpoint, doubles the data behind it, and requests
+    it again; the query count must not move.
+    """
+
+    def setUp(self):
+        self.items, self.sizes = seed_menu()
+        seed_bills(3, self.items, self.sizes)
+
+    def grow(self):
+        items, sizes = seed_menu(prefix="more-")
+        seed_bills(3, items, sizes, prefix="9")
+
+    def count_queries(self, url):
+        # Start cold so cached endpoints (the menu snapshot) are measured too.
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return len(ctx.captured_queries)
+
+    def assertConstantQueries(self, url, expected):
+        self.assertEqual(self.count_queries(url), expected)
+        self.grow()
+        self.assertEqual(self.count_queries(url), expected)
+
+    def test_categories(self):
+        self.assertConstantQueries("/api/categories/", 2)
+
+    def test_items(self):
+        self.assertConstantQueries("/api/items/", 1)
+
+    def test_items_filtered_by_category(self):
+        category = MenuCategory.objects.first()
+        self.assertConstantQueries(f"/api/items/?category_id={category.pk}", 1)
+
+    def test_sizes(self):
+        self.assertConstantQueries("/api/sizes/", 1)
+
+    def test_customers(self):
+        self.assertConstantQueries("/api/customers/", 1)
+
+    def test_bills(self):
+        self.assertConstantQueries("/api/bills/", 2)
+
+    def test_bill_items(self):
+        self.assertConstantQueries("/api/bill-items/", 1)
+
+    def test_full_menu(self):
+        self.assertConstantQueries("/api/menu/", 4)
+
+    def test_full_menu_snapshot_hit_is_free(self):
+        self.client.get("/api/menu/")
+        with self.assertNumQueries(0):
+            self.client.get("/api/menu/")
+
+
+class MenuVersionTests(APITestCase):
+    def test_version_is_shared_between_processes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            shared = {
+                "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                "LOCATION": tmp,
+                "KEY_PREFIX": settings.CACHES["default"]["KEY_PREFIX"],
+            }
+            with override_settings(CACHES={"default": shared}):
+                before = get_menu_version()
+                # A menu edit handled by another worker.
+                bumped = subprocess.run(
+                    [sys.executable, "-c", "import django; django.setup(); "
+                     "from api.menu import bump_menu_version; print(bump_menu_version())"],
+                    env={**os.environ, "DJANGO_SETTINGS_MODULE": "restaurant.settings",
+                         "DJANGO_CACHE_BACKEND": "file", "DJANGO_CACHE_DIR": tmp},
+                    cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+                )
+                self.assertNotEqual(get_menu_version(), before)
+                self.assertEqual(get_menu_version(), int(bumped.stdout))
+
+
+def mcp_server(test):
+    """mcp/main.py, answering from this database (the ORM backend).
+
+    The environment and import path are restored when ``test`` ends.
+    """
+    test.enterContext(mock.patch.dict(os.environ, MCP_BACKEND="orm"))
+    test.enterContext(mock.patch.object(sys, "path", [str(settings.BASE_DIR / "mcp"), *sys.path]))
+    import main
+    return main
+
+
+class MCPToolTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.main = main = mcp_server(self)
+        main.menu_cache.clear()
+        main.menu_cache.version = None
+        main._menu_version_checked_at = 0.0
+        self.items, self.sizes = seed_menu(categories=1, subcategories=1, items=1, sizes=1)
+        self.customer = Customer.objects.create(
+            first_name="Ali", last_name="Khan", phone="03001234567", address="Lahore"
+        )
+
+    def call(self, tool, **arguments):
+        async def call():
+            async with fastmcp.Client(self.main.mcp) as client:
+                return json.loads((await client.call_tool(tool, arguments)).content[0].text)
+        return async_to_sync(call)()
+
+    def test_identical_adds_apply_unless_retried_with_their_key(self):
+        bill = Bill.objects.create(customer=self.customer)
+        line = {"item_id": self.items[0].pk, "size_id": self.sizes[0].pk, "quantity": 1}
+        # "One more zinger", twice.
+        self.call("add_bill_items", bill_id=bill.pk, items=[line])
+        self.call("add_bill_items", bill_id=bill.pk, items=[line])
+        self.assertEqual(bill.items.get().quantity, 2)
+        # A retry of one call.
+        for _ in range(2):
+            self.call("add_bill_items", bill_id=bill.pk, items=[line], idempotency_key="turn-3-add")
+        self.assertEqual(bill.items.get().quantity, 3)
+
+    def test_menu_fetch_overtaken_by_a_menu_change_is_not_cached(self):
+        main, api_get = self.main, self.main.api_get
+
+        async def fetch_then_change(path, params=None):
+            value = await api_get(path, params)
+            if path == "/menu/":
+                # The menu changes, and another call notices, mid-fetch.
+                await sync_to_async(MenuItem.objects.create)(name="new-item", subcategory=self.items[0].subcategory)
+                main._menu_version_checked_at = 0.0
+                await main.refresh_menu_version()
+            return value
+
+        def items(menu):
+            return [item["name"] for item in menu[0]["subcategories"][0]["items"]]
+
+        with mock.patch.object(main, "api_get", fetch_then_change):
+            self.assertEqual(len(items(self.call("get_full_menu"))), 1)
+        self.assertEqual(items(self.call("get_full_menu"))[1:], ["new-item"])
+
+
+    def test_failed_version_check_keeps_serving_the_menu(self):
+        main, api_get = self.main, self.main.api_get
+        menu = self.call("get_full_menu")
+
+        async def version_unavailable(path, params=None):
+            if path == "/menu/version/":
+                raise OperationalError("database is locked")
+            return await api_get(path, params)
+
+        main._menu_version_checked_at = 0.0
+        with mock.patch.object(main, "api_get", version_unavailable):
+            self.assertEqual(self.call("get_full_menu"), menu)
+
+
+class MenuResourceTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.main = main = mcp_server(self)
+        main.menu_cache.clear()
+        main.menu_cache.version = None
+        main.menu_snapshot.clear()
+        main.menu_snapshot.watchers.clear()
+        main._menu_version_checked_at = 0.0
+        self.items, self.sizes = seed_menu(categories=1, subcategories=1, items=1, sizes=2)
+        self.subcategory = self.items[0].subcategory
+        self.notified = asyncio.Event()
+
+    async def on_message(self, message):
+        if isinstance(message, ResourceListChangedNotification):
+            self.notified.set()
+
+    async def list_changed(self):
+        await asyncio.wait_for(self.notified.wait(), timeout=5)
+
+    def read(self, *steps):
+        """Read each URI in one client session; a callable step runs in between."""
+        async def read():
+            texts = []
+            async with fastmcp.Client(self.main.mcp, message_handler=self.on_message) as client:
+                for step in steps:
+                    if iscoroutinefunction(step):
+                        await step()
+                    elif callable(step):
+                        await sync_to_async(step)()
+                    else:
+                        contents = await client.read_resource(step)
+                        texts.append(json.loads(contents[0].text))
+            return texts
+        return async_to_sync(read)()
+
+    def add_item(self):
+        """Change the menu, and let the server notice on its next request."""
+        MenuItem.objects.create(name="new-item", subcategory=self.subcategory)
+        self.main._menu_version_checked_at = 0.0
+
+    def test_resources_are_cut_from_the_menu(self):
+        sub = self.subcategory
+        full, categories, subcategory = self.read(
+            "menu://full", "menu://categories", f"menu://subcategories/{sub.pk}"
+        )
+        self.assertEqual(full, self.client.get("/api/menu/").json())
+        self.assertEqual(categories[0]["subcategories"], [
+            {"id": sub.pk, "name": sub.name, "uri": f"menu://subcategories/{sub.pk}"}
+        ])
+        self.assertEqual([item["id"] for item in subcategory["items"]], [self.items[0].pk])
+        self.assertEqual([size["id"] for size in subcategory["sizes"]], [s.pk for s in self.sizes])
+
+    def test_menu_change_rebuilds_and_notifies(self):
+        uri = f"menu://subcategories/{self.subcategory.pk}"
+        before, after = self.read(uri, self.add_item, uri, self.list_changed)
+        self.assertEqual(len(before["items"]), 1)
+        self.assertEqual([item["name"] for item in after["items"]][1:], ["new-item"])
+        self.assertTrue(self.notified.is_set())
+
+    def test_fetch_overtaken_by_a_menu_change_is_not_kept(self):
+        main, api_get = self.main, self.main.api_get
+
+        async def fetch_then_change(path, params=None):
+            value = await api_get(path, params)
+            if path == "/menu/":
+                # The menu changes, and another request notices, mid-fetch.
+                await sync_to_async(self.add_item)()
+                await main.refresh_menu_version()
+            return value
+
+        uri = f"menu://subcategories/{self.subcategory.pk}"
+        with mock.patch.object(main, "api_get", fetch_then_change):
+            (stale,) = self.read(uri)
+        self.assertEqual(len(stale["items"]), 1)
+        self.assertFalse(main.menu_snapshot)
+        (fresh,) = self.read(uri)
+        self.assertEqual(len(fresh["items"]), 2)
+
+
+class SerializerOutputTests(APITestCase):
+    def setUp(self):
+        self.items, self.sizes = seed_menu(categories=1, subcategories=1)
+
+    def test_size_reports_its_category(self):
+        size = self.sizes[0]
+        response = self.client.get(f"/api/sizes/{size.pk}/")
+        self.assertEqual(
+            response.json()["category"],
+            {"id": size.subcategory.category_id, "name": size.subcategory.category.name},
+        )
+
+
+class BillListTests(APITestCase):
+    def setUp(self):
+        self.items, self.sizes = seed_menu(categories=1, subcategories=1)
+        self.bills = seed_bills(5, self.items, self.sizes, lines=1)
+
+    def ids(self, response):
+        self.assertEqual(response.status_code, 200, response.content)
+        return [bill["id"] for bill in response.json()["results"]]
+
+    def test_cursor_pagination_newest_first(self):
+        response = self.client.get("/api/bills/?page_size=2")
+        body = response.json()
+        self.assertEqual(self.ids(response), [self.bills[4].pk, self.bills[3].pk])
+        self.assertIsNotNone(body["next"])
+        self.assertEqual(self.ids(self.client.get(body["next"])), [self.bills[2].pk, self.bills[1].pk])
+
+    def test_filter_by_phone_and_customer(self):
+        bill = self.bills[2]
+        self.assertEqual(self.ids(self.client.get(f"/api/bills/?phone={bill.customer.phone}")), [bill.pk])
+        self.assertEqual(self.ids(self.client.get(f"/api/bills/?customer={bill.customer_id}")), [bill.pk])
+
+    def test_filter_by_status_list_and_open(self):
+        Bill.objects.filter(pk=self.bills[0].pk).update(status="delivered")
+        Bill.objects.filter(pk=self.bills[1].pk).update(status="cancelled")
+        closed = self.ids(self.client.get("/api/bills/?status=delivered,cancelled"))
+        self.assertEqual(sorted(closed), [self.bills[0].pk, self.bills[1].pk])
+        self.assertEqual(len(self.ids(self.client.get("/api/bills/?open=true"))), 3)
+
+    def test_filter_by_date(self):
+        Bill.objects.filter(pk=self.bills[0].pk).update(created_at="2020-01-01T12:00:00Z")
+        self.assertEqual(
+            self.ids(self.client.get("/api/bills/?date_from=2020-01-01&date_to=2020-01-01")),
+            [self.bills[0].pk],
+        )
+        self.assertEqual(len(self.ids(self.client.get("/api/bills/?today=true"))), 4)
+
+
+class BillTotalsTests(APITestCase):
+    def setUp(self):
+        self.items, self.sizes = seed_menu(categories=1, subcategories=1, items=5, sizes=1)
+        self.bill = seed_bills(1, self.items, self.sizes, lines=0)[0]
+
+    def add(self, item, quantity=1):
+        return BillItem.objects.create(bill=self.bill, item=item, size=self.sizes[0], quantity=quantity)
+
+    def test_totals_follow_items(self):
+        first = self.add(self.items[0], quantity=2)
+        self.add(self.items[1])
+        self.bill.refresh_from_db()
+        self.assertEqual(self.bill.subtotal, Decimal("300.00"))
+        self.assertEqual(self.bill.tax_amount, Decimal("15.00"))
+        self.assertEqual(self.bill.total_amount, Decimal("315.00"))
+
+        first.delete()
+        self.bill.refresh_from_db()
+        self.assertEqual(self.bill.subtotal, Decimal("100.00"))
+
+    def test_item_write_cost_does_not_grow_with_bill(self):
+        with CaptureQueriesContext(connection) as first:
+            self.add(self.items[0])
+        for item in self.items[1:4]:
+            self.add(item)
+        with CaptureQueriesContext(connection) as last:
+            self.add(self.items[4])
+        self.assertEqual(len(first.captured_queries), len(last.captured_queries))
+
+    def test_tip_is_a_single_write(self):
+        self.add(self.items[0], quantity=2)
+        self.bill.refresh_from_db()
+        with CaptureQueriesContext(connection) as ctx:
+            self.bill.add_tip_percentage(10)
+        writes = [q for q in ctx.captured_queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(writes), 1)
+        self.assertEqual(self.bill.tip_amount, Decimal("20.00"))
+        self.assertEqual(self.bill.total_amount, Decimal("230.00"))
+
+
+class BillItemWriteTests(APITestCase):
+    def setUp(self):
+        self.items, self.sizes = seed_menu(categories=1, subcategories=2, items=4, sizes=2)
+        self.bill = seed_bills(1, self.items, self.sizes, lines=0)[0]
+        self.url = f"/api/bills/{self.bill.pk}/items/"
+
+    def lines(self, count):
+        return [
+            {"item_id": item.pk, "size_id": item.subcategory.item_sizes.first().pk, "quantity": 2}
+            for item in self.items[:count]
+        ]
+
+    def test_add_single_item(self):
+        item = self.items[0]
+        size = item.subcategory.item_sizes.first()
+        response = self.client.post("/api/bill-items/", {
+            "bill": self.bill.pk, "item": item.pk, "size": size.pk, "quantity": 3,
+        }, format="json")
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json()["unit_price"], "100.00")
+        self.bill.refresh_from_db()
+        self.assertEqual(self.bill.subtotal, Decimal("300.00"))
+
+        duplicate = self.client.post("/api/bill-items/", {
+            "bill_id": self.bill.pk, "item_id": item.pk, "size_id": size.pk,
+        }, format="json")
+        self.assertEqual(duplicate.status_code, 400)
+
+    def test_bulk_add_computes_totals_once(self):
+        response = self.client.post(self.url, {"items": self.lines(4)}, format="json")
+        self.assertEqual(response.status_code, 201, response.content)
+        body = response.json()
+        self.assertEqual(len(body["items"]), 4)
+        self.assertEqual(body["subtotal"], "800.00")
+        self.assertEqual(body["total_amount"], "840.00")
+
+    def test_bulk_add_query_count_is_flat(self):
+        bill = seed_bills(1, self.items, self.sizes, lines=0, prefix="9")[0]
+        one, eight = self.lines(1), self.lines(8)
+        with CaptureQueriesContext(connection) as few:
+            self.client.post(self.url, {"items": one}, format="json")
+        with CaptureQueriesContext(connection) as many:
+            self.client.post(f"/api/bills/{bill.pk}/items/", {"items": eight}, format="json")
+        self.assertEqual(len(few.captured_queries), len(many.captured_queries))
+
+    def test_bulk_add_merges_repeated_lines(self):
+        self.client.post(self.url, {"items": self.lines(1)}, format="json")
+        response = self.client.post(self.url, {"items": self.lines(1) * 2}, format="json")
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual([row["quantity"] for row in response.json()["items"]], [6])
+
+    def test_bulk_add_rejects_bad_lines_atomically(self):
+        lines = self.lines(2)
+        other_sub_size = self.items[-1].subcategory.item_sizes.first()
+        lines[1]["size_id"] = other_sub_size.pk
+        response = self.client.post(self.url, {"items": lines}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("size_id", response.json()["items"][1])
+        self.assertFalse(self.bill.items.exists())
+
+
+class PlaceOrderTests(APITestCase):
+    url = "/api/orders/"
+
+    def setUp(self):
+        self.items, self.sizes = seed_menu(categories=1, subcategories=1, items=3, sizes=2)
+
+    def payload(self, **extra):
+        lines = [
+            {"item_id": self.items[0].pk, "size_id": self.sizes[0].pk, "quantity": 2},
+            {"item_id": self.items[1].pk, "size_id": self.sizes[1].pk},
+        ]
+        return {"phone": "03001234567", "order_type": "delivery",
+                "payment_method": "cash", "items": lines, **extra}
+
+    def test_new_customer(self):
+        response = self.client.post(self.url, self.payload(
+            first_name="Ali", last_name="Khan", address="Gulberg",
+        ), format="json")
+        self.assertEqual(response.status_code, 201, response.content)
+        body = response.json()
+        self.assertEqual(body["customer"]["phone"], "03001234567")
+        self.assertEqual(len(body["items"]), 2)
+        self.assertEqual(body["subtotal"], "400.00")
+        self.assertEqual(body["total_amount"], "420.00")
+
+    def test_existing_customer_is_reused_and_updated(self):
+        customer = Customer.objects.create(
+            first_name="Ali", last_name="Khan", phone="03001234567", address="Old"
+        )
+        response = self.client.post(self.url, self.payload(address="New"), format="json")
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(Customer.objects.count(), 1)
+        customer.refresh_from_db()
+        self.assertEqual(customer.address, "New")
+        self.assertEqual(response.json()["customer"]["id"], customer.pk)
+
+    def test_new_customer_needs_details(self):
+        response = self.client.post(self.url, self.payload(first_name="Ali"), format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Customer.objects.exists())
+        self.assertFalse(Bill.objects.exists())
+
+    def test_phone_without_digits_is_refused(self):
+        details = {"first_name": "Ali", "last_name": "Khan", "address": "Gulberg"}
+        for phone in ("abc", "xyz"):
+            response = self.client.post(self.url, self.payload(phone=phone, **details), format="json")
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("phone", response.json())
+        self.assertFalse(Customer.objects.exists())
+        with self.assertRaises(ValidationError):
+            Customer.objects.create(phone="n/a", **details)
+
+    def test_invalid_line_creates_nothing(self):
+        payload = self.payload(first_name="Ali", last_name="Khan", address="Gulberg")
+        payload["items"][1]["item_id"] = 0
+        response = self.client.post(self.url, payload, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Customer.objects.exists())
+        self.assertFalse(Bill.objects.exists())
+
+
+class BillCreateTests(APITestCase):
+    def setUp(self):
+        self.customer = Customer.objects.create(
+            first_name="Ali", last_name="Khan", phone="03001234567", address="Gulberg"
+        )
+
+    def writes(self, ctx):
+        return [q for q in ctx.captured_queries if q["sql"].startswith(("INSERT", "UPDATE"))]
+
+    def test_create_is_one_insert(self):
+        with CaptureQueriesContext(connection) as ctx:
+            bill = Bill.objects.create(
+                customer=self.customer, payment_method="card", delivery_fee=Decimal("150.00")
+            )
+        self.assertEqual(len(self.writes(ctx)), 1)
+        bill.refresh_from_db()
+        self.assertEqual(bill.tax_rate, Decimal("16.00"))
+        self.assertEqual(bill.total_amount, Decimal("150.00"))
+
+    def test_api_create_is_one_insert(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post("/api/bills/", {
+                "customer": self.customer.pk, "order_type": "takeaway", "payment_method": "cash",
+            }, format="json")
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(len(self.writes(ctx)), 1)
+        self.assertEqual(response.json()["tax_rate"], "5.00")
+
+    def test_bulk_create_sets_totals(self):
+        bills = Bill.objects.bulk_create([
+            Bill(customer=self.customer, payment_method="cash", delivery_fee=Decimal("100.00")),
+            Bill(customer=self.customer, payment_method="card", subtotal=Decimal("1000.00")),
+        ])
+        cash, card = Bill.objects.filter(pk__in=[b.pk for b in bills]).order_by("pk")
+        self.assertEqual((cash.tax_rate, cash.total_amount), (Decimal("5.00"), Decimal("100.00")))
+        self.assertEqual((card.tax_amount, card.total_amount), (Decimal("160.00"), Decimal("1160.00")))
+
+
+class MenuSearchTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        burger = MenuCategory.objects.create(name="Burger")
+        zinger = MenuSubCategory.objects.create(name="Zinger", category=burger)
+        self.regular = MenuItemSize.objects.create(name="Regular", price=Decimal("450.00"), subcategory=zinger)
+        self.large = MenuItemSize.objects.create(name="Large", price=Decimal("650.00"), subcategory=zinger)
+        self.zinger = MenuItem.objects.create(name="Zinger Burger", subcategory=zinger)
+        pizza = MenuCategory.objects.create(name="Pizza")
+        special = MenuSubCategory.objects.create(name="Special", category=pizza)
+        MenuItemSize.objects.create(name="Large", price=Decimal("1800.00"), subcategory=special)
+        self.fajita = MenuItem.objects.create(
+            name="Fajita", description="Chicken fajita with onions", subcategory=special
+        )
+
+    def search(self, q, **params):
+        response = self.client.get("/api/menu/search/", {"q": q, **params})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_resolves_item_and_named_size(self):
+        top = self.search("large zinger burger")[0]
+        self.assertEqual((top["item_id"], top["size_id"], top["price"]),
+                         (self.zinger.pk, self.large.pk, "650.00"))
+
+    def test_tolerates_typos_and_plurals(self):
+        self.assertEqual(self.search("zingr")[0]["item_id"], self.zinger.pk)
+        self.assertEqual(self.search("fajitas pizza")[0]["item_id"], self.fajita.pk)
+
+    def test_without_size_lists_every_size(self):
+        results = self.search("zinger")
+        self.assertEqual({r["size_id"] for r in results}, {self.regular.pk, self.large.pk})
+
+    def test_index_follows_menu_changes(self):
+        self.search("zinger")
+        with self.captureOnCommitCallbacks(execute=True):
+            MenuItem.objects.create(name="Tower Burger", subcategory=self.zinger.subcategory)
+            self.fajita.is_available = False
+            self.fajita.save()
+        self.assertEqual(self.search("tower")[0]["item"], "Tower Burger")
+        self.assertEqual(self.search("fajita"), [])
+        self.assertEqual(self.search("fajita", available_only="false")[0]["item_id"], self.fajita.pk)
+
+    def test_requires_query(self):
+        self.assertEqual(self.client.get("/api/menu/search/").status_code, 400)
+
+
+class PhoneLookupTests(APITestCase):
+    def setUp(self):
+        phone_cache.clear()
+        self.customer = Customer.objects.create(
+            first_name="Ali", last_name="Khan", phone="0300 1234567", address="Gulberg"
+        )
+
+    def test_normalize(self):
+        for raw in ("+923001234567", "03001234567", "0300-1234567", "923001234567",
+                    "00923001234567", "3001234567"):
+            self.assertEqual(normalize_phone(raw), "+923001234567", raw)
+        self.assertEqual(normalize_phone("+44 20 7946 0958"), "+442079460958")
+
+    def test_by_phone_matches_any_format_in_one_query(self):
+        for raw in ("+923001234567", "03001234567"):
+            with self.assertNumQueries(1):
+                response = self.client.get("/api/customers/by-phone/", {"phone": raw})
+            self.assertEqual(response.json()["customer"]["id"], self.customer.pk)
+
+    def test_customer_list_filters_by_any_format(self):
+        for raw in ("+923001234567", "03001234567"):
+            response = self.client.get("/api/customers/", {"phone": raw})
+            self.assertEqual([c["id"] for c in response.json()], [self.customer.pk], raw)
+        self.assertEqual(self.client.get("/api/customers/", {"phone": "03339876543"}).json(), [])
+
+    def test_cache_follows_phone_changes(self):
+        self.assertEqual(Customer.objects.by_phone("03001234567"), self.customer)
+        self.customer.phone = "03339876543"
+        self.customer.save()
+        self.assertIsNone(Customer.objects.by_phone("03001234567"))
+        self.assertEqual(Customer.objects.by_phone("+923339876543"), self.customer)
+
+    def test_duplicate_in_other_format_is_rejected(self):
+        response = self.client.post("/api/customers/", {
+            "first_name": "Ali", "last_name": "Khan", "phone": "+923001234567", "address": "Gulberg",
+        }, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("phone", response.json())
+
+    def test_place_order_reuses_customer_across_formats(self):
+        items, sizes = seed_menu(categories=1, subcategories=1, items=1, sizes=1)
+        response = self.client.post("/api/orders/", {
+            "phone": "+923001234567",
+            "items": [{"item_id": items[0].pk, "size_id": sizes[0].pk}],
+        }, format="json")
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json()["customer"]["id"], self.customer.pk)
+        self.assertEqual(Customer.objects.count(), 1)
+
+
+class PhoneMigrationTests(TransactionTestCase):
+    before = [("api", "0002_rename_parent_menusubcategory_category_and_more")]
+    after = [("api", "0003_customer_phone_canonical")]
+
+    def setUp(self):
+        self.executor = MigrationExecutor(connection)
+        self.executor.migrate(self.before)
+        self.executor.loader.build_graph()
+        apps = self.executor.loader.project_state(self.before).apps
+        self.Customer, self.Bill = apps.get_model("api", "Customer"), apps.get_model("api", "Bill")
+
+    def tearDown(self):
+        self.Customer.objects.all().delete()
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def customer(self, phone):
+        return self.Customer.objects.create(first_name="Ali", last_name="Khan", phone=phone, address="Lahore")
+
+    def migrate(self):
+        self.executor.loader.build_graph()
+        self.executor.migrate(self.after)
+
+    def test_canonical_phones_are_filled(self):
+        first, other = self.customer("0300 1234567"), self.customer("923339876543")
+        self.migrate()
+        self.assertEqual(list(Customer.objects.order_by("pk").values_list("pk", "phone_canonical")),
+                         [(first.pk, "+923001234567"), (other.pk, "+923339876543")])
+
+    def test_spellings_of_one_phone_are_reported(self):
+        first, second = self.customer("03001234567"), self.customer("+923001234567")
+        self.customer("03339876543")
+        with self.assertRaisesMessage(
+            RuntimeError, f"+923001234567 (#{first.pk} '03001234567', #{second.pk} '+923001234567')"
+        ):
+            self.migrate()
+        self.assertEqual(self.Customer.objects.count(), 3)
+
+    def test_phone_without_digits_is_reported(self):
+        self.customer("03001234567")
+        self.customer("n/a")
+        with self.assertRaisesMessage(RuntimeError, "'n/a'"):
+            self.migrate()
+
+
+# The project's URLs with the async views mounted, whatever ASYNC_VIEWS says.
+urlpatterns = [path("api/", include(async_urlpatterns))] + project_urls.urlpatterns
+
+
+@override_settings(ASYNC_VIEWS=True, ROOT_URLCONF=__name__)
+class AsyncViewTests(APITestCase):
+    def setUp(self):
+        self.items, self.sizes = seed_menu(categories=1, subcategories=1, items=2, sizes=1)
+        self.customer = Customer.objects.create(
+            first_name="Ali", last_name="Khan", phone="03001234567", address="Gulberg"
+        )
+
+    def test_hot_endpoints_are_async(self):
+        for url in ("/api/menu/", "/api/items/", "/api/sizes/", "/api/customers/by-phone/",
+                    "/api/bills/", "/api/bills/1/items/", "/api/bill-items/"):
+            self.assertTrue(iscoroutinefunction(resolve(url).func), url)
+
+    async def test_conversation(self):
+        menu = await self.async_client.get("/api/menu/")
+        self.assertEqual(menu.status_code, 200)
+        cached = await self.async_client.get("/api/menu/", headers={"If-None-Match": menu["ETag"]})
+        self.assertEqual(cached.status_code, 304)
+
+        found = await self.async_client.get("/api/customers/by-phone/", {"phone": "+923001234567"})
+        self.assertEqual(found.json()["customer"]["id"], self.customer.pk)
+
+        bill = await self.async_client.post(
+            "/api/bills/", {"customer_id": self.customer.pk}, content_type="application/json"
+        )
+        self.assertEqual(bill.status_code, 201, bill.content)
+        bill_id = bill.json()["id"]
+        first, second = ({"item_id": item.pk, "size_id": self.sizes[0].pk, "quantity": 2} for item in self.items)
+        response = await self.async_client.post(
+            "/api/bill-items/", {"bill_id": bill_id, **first}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        for _ in range(2):
+            # The second post is a retry, answered from the first.
+            response = await self.async_client.post(
+                f"/api/bills/{bill_id}/items/", {"items": [second]},
+                content_type="application/json", headers={"Idempotency-Key": "add-1"},
+            )
+            self.assertEqual(response.status_code, 201, response.content)
+            self.assertEqual(response.json()["subtotal"], "400.00")
+
+    def test_errors_and_other_methods(self):
+        self.assertEqual(self.client.post("/api/bills/", {}, format="json").status_code, 400)
+        self.assertEqual(self.client.post("/api/bills/999/items/", {"items": []}, format="json").status_code, 404)
+        self.assertEqual(self.client.get("/api/items/?category=abc").status_code, 400)
+        self.assertEqual(self.client.options("/api/items/").status_code, 200)
+        self.assertEqual(self.client.get("/api/bills/").status_code, 200)
+
+
+class FieldSelectionTests(APITestCase):
+    def setUp(self):
+        self.items, self.sizes = seed_menu(categories=1, subcategories=1, items=2, sizes=2)
+        self.bill = seed_bills(1, self.items, self.sizes, lines=2)[0]
+
+    def test_compact_items_use_flat_parent_ids(self):
+        item = self.client.get("/api/items/?compact=1").json()[0]
+        self.assertEqual(
+            set(item), {"id", "name", "description", "is_available", "category_id", "subcategory_id"}
+        )
+        self.assertEqual(item["subcategory_id"], self.items[0].subcategory_id)
+        self.assertEqual(item["category_id"], self.items[0].subcategory.category_id)
+
+    def test_expand_keeps_named_parent(self):
+        size = self.client.get(f"/api/sizes/{self.sizes[0].pk}/?compact=1&expand=subcategory").json()
+        self.assertEqual(size["subcategory"], {"id": self.sizes[0].subcategory_id, "name": "sub-0"})
+        self.assertIn("category_id", size)
+        self.assertNotIn("category", size)
+
+    def test_compact_bill(self):
+        bill = self.client.get("/api/bills/?compact=1").json()["results"][0]
+        self.assertEqual(bill["customer_id"], self.bill.customer_id)
+        self.assertNotIn("customer", bill)
+        self.assertEqual(len(bill["items"]), 2)
+        self.assertIn("customer", self.client.get("/api/bills/").json()["results"][0])
+
+    def test_fields(self):
+        bill = self.client.get("/api/bills/?fields=id,total_amount").json()["results"][0]
+        self.assertEqual(set(bill), {"id", "total_amount"})
+
+        # Trimming the response doesn't stop the payload from being read.
+        response = self.client.post(
+            "/api/bills/?fields=id", {"customer_id": self.bill.customer_id, "notes": "x"}, format="json"
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(set(response.json()), {"id"})
+        self.assertEqual(Bill.objects.get(pk=response.json()["id"]).notes, "x")
+
+
+class RendererTests(APITestCase):
+    def setUp(self):
+        self.items, self.sizes = seed_menu(categories=1, subcategories=1, items=2, sizes=2)
+        seed_bills(3, self.items, self.sizes, lines=2)
+
+    def test_output_matches_drf(self):
+        from rest_framework.renderers import JSONRenderer
+
+        for url in ("/api/bills/", f"/api/bills/{Bill.objects.first().pk}/", "/api/categories/"):
+            response = self.client.get(url)
+            self.assertEqual(response.content, JSONRenderer().render(response.data), url)
+        bill = self.client.get("/api/bills/").json()["results"][0]
+        self.assertIsInstance(bill["total_amount"], str)
+        self.assertIsInstance(bill["items"][0]["unit_price"], str)
+        self.assertIsInstance(bill["items"][0]["get_total_price"], float)
+
+    def test_money_field_matches_decimal_field(self):
+        from rest_framework.serializers import DecimalField
+        from .serializers import MoneyField
+
+        fast, drf = MoneyField(max_digits=10, decimal_places=2), DecimalField(max_digits=10, decimal_places=2)
+        for value in (Decimal("450.00"), Decimal("5"), Decimal("1.005"), Decimal("-3.10"), Decimal("1E+2"), 2.5):
+            self.assertEqual(fast.to_representation(value), drf.to_representation(value), value)
+
+    def test_parser(self):
+        response = self.client.post(
+            "/api/customers/", b'{"first_name": "Zo\xc3\xab", "last_name": "K", "phone": "03111111111", "address": "-"}',
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json()["first_name"], "Zoë")
+        response = self.client.post("/api/customers/", b'{"broken": ', content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+
+class LoadDataCommandTests(APITestCase):
+    options = dict(categories=2, subcategories=2, items=12, customers=20, bills=60,
+                   days=10, end_date=date(2026, 1, 31), batch_size=25, verbosity=0)
+
+    def generate(self, **overrides):
+        call_command("generate_load_data", **{**self.options, **overrides}, stdout=StringIO())
+
+    def test_generates_consistent_rows(self):
+        self.generate()
+        self.assertEqual(MenuItem.objects.count(), 12)
+        self.assertEqual(Customer.objects.count(), 20)
+        self.assertEqual(Bill.objects.count(), 60)
+        self.assertGreater(BillItem.objects.count(), 60)
+        self.assertTrue(Customer.objects.by_phone("+923000000007"))
+        for bill in Bill.objects.all():
+            self.assertEqual(bill.subtotal, bill.calculate_subtotal())
+            self.assertEqual(
+                bill.total_amount,
+                bill.subtotal + bill.tax_amount + bill.delivery_fee + bill.tip_amount - bill.discount_amount,
+            )
+        self.assertGreater(Bill.objects.values("status").distinct().count(), 1)
+        self.assertFalse(Bill.objects.filter(created_at__date__gt=date(2026, 1, 31)).exists())
+
+    def test_same_seed_same_data(self):
+        self.generate()
+        first = list(Bill.objects.order_by("pk").values_list("total_amount", "status", "created_at"))
+        for model in (BillItem, Bill, Customer, MenuItem, MenuItemSize, MenuSubCategory, MenuCategory):
+            model.objects.all().delete()
+        self.generate()
+        self.assertEqual(
+            list(Bill.objects.order_by("pk").values_list("total_amount", "status", "created_at")), first
+        )
+
+    def test_refuses_non_empty_database(self):
+        seed_menu(categories=1, subcategories=1, items=1, sizes=1)
+        with self.assertRaises(CommandError):
+            self.generate()
+
+
+class IdempotencyTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.items, self.sizes = seed_menu(categories=1, subcategories=1, items=2, sizes=1)
+        self.customer = Customer.objects.create(
+            first_name="Ali", last_name="Khan", phone="03001234567", address="Lahore"
+        )
+
+    def post(self, url, data, key):
+        return self.client.post(url, data, format="json", headers={"Idempotency-Key": key})
+
+    def test_retried_bill_create_is_replayed_with_one_lookup(self):
+        first = self.post("/api/bills/", {"customer_id": self.customer.pk}, "turn-1-create")
+        self.assertEqual(first.status_code, 201)
+        # Keys don't live in a per-process cache, so any worker replays them.
+        cache.clear()
+        with self.assertNumQueries(1):
+            retry = self.post("/api/bills/", {"customer_id": self.customer.pk}, "turn-1-create")
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.content, first.content)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(Bill.objects.count(), 1)
+
+        self.post("/api/bills/", {"customer_id": self.customer.pk}, "turn-2-create")
+        self.client.post("/api/bills/", {"customer_id": self.customer.pk}, format="json")
+        self.assertEqual(Bill.objects.count(), 3)
+
+    def test_retried_item_writes_are_applied_once(self):
+        bill = Bill.objects.create(customer=self.customer)
+        line = {"item_id": self.items[0].pk, "size_id": self.sizes[0].pk, "quantity": 2}
+        for _ in range(2):
+            single = self.post("/api/bill-items/", {"bill_id": bill.pk, **line}, "add-one")
+            self.assertEqual(single.status_code, 201, single.content)
+            bulk = self.post(f"/api/bills/{bill.pk}/items/", {"items": [line]}, "add-many")
+            self.assertEqual(bulk.status_code, 201, bulk.content)
+        self.assertEqual(bill.items.get().quantity, 4)
+        self.assertEqual(self.post(f"/api/bills/{bill.pk}/cancel/", {}, "cancel").status_code, 200)
+
+    def test_key_reused_for_another_request(self):
+        self.post("/api/bills/", {"customer_id": self.customer.pk}, "same-key")
+        response = self.post("/api/bills/", {"customer_id": self.customer.pk, "notes": "x"}, "same-key")
+        self.assertEqual(response.status_code, 422)
+
+    def test_key_still_in_flight(self):
+        body = b'{"customer_id":%d}' % self.customer.pk
+        self.assertIsNone(idempotency.claim("POST /api/bills/", "in-flight", body))
+        response = self.post("/api/bills/", {"customer_id": self.customer.pk}, "in-flight")
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Bill.objects.count(), 0)
+
+
+class KitchenEventsTests(APITestCase):
+    def setUp(self):
+        self.items, self.sizes = seed_menu(categories=1, subcategories=1, items=2, sizes=1)
+        self.customer = Customer.objects.create(
+            first_name="Ali", last_name="Khan", phone="03001234567", address="Lahore"
+        )
+
+    def events_since(self, event_id):
+        seq = int(event_id.rpartition("-")[2])
+        return [
+            (line.split(": ", 1)[1], json.loads(frame.split(b"\ndata: ", 1)[1]))
+            for event in bill_events._buffer if event.seq > seq
+            for frame in [event.frame]
+            for line in frame.decode().splitlines() if line.startswith("event: ")
+        ]
+
+    def test_bill_lifecycle_is_published_on_commit(self):
+        start = bill_events.last_id
+        with self.captureOnCommitCallbacks(execute=True):
+            bill = self.client.post("/api/bills/", {"customer_id": self.customer.pk}, format="json").json()
+        with self.captureOnCommitCallbacks(execute=True):
+            lines = [{"item_id": item.pk, "size_id": self.sizes[0].pk, "quantity": 2} for item in self.items]
+            self.client.post(f"/api/bills/{bill['id']}/items/", {"items": lines}, format="json")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f"/api/bills/{bill['id']}/", {"status": "preparing"}, format="json")
+            self.client.patch(f"/api/bills/{bill['id']}/", {"notes": "no onions"}, format="json")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f"/api/bills/{bill['id']}/cancel/")
+
+        events = self.events_since(start)
+        self.assertEqual([name for name, _ in events],
+                         ["bill.created", "bill.items", "bill.status", "bill.status"])
+        self.assertEqual(events[0][1]["id"], bill["id"])
+        self.assertEqual([line["quantity"] for line in events[1][1]["items"]], [2, 2])
+        self.assertEqual(events[2][1], {"id": bill["id"], "status": "preparing", "previous": "pending"})
+        self.assertEqual(events[3][1]["status"], "cancelled")
+
+    def test_rolled_back_writes_are_not_published(self):
+        start = bill_events.last_id
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                Bill.objects.create(customer=self.customer)
+                raise RuntimeError
+        self.assertEqual(self.events_since(start), [])
+
+    async def test_stream_resumes_after_last_event_id(self):
+        bill_events.publish("bill.status", {"id": 1, "status": "confirmed", "previous": "pending"})
+        seen = bill_events.last_id
+        missed = bill_events.publish("bill.status", {"id": 1, "status": "preparing", "previous": "confirmed"})
+
+        response = await self.async_client.get("/api/kitchen/events/", headers={"Last-Event-ID": seen})
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        body = response.streaming_content
+        self.assertEqual(await anext(body), b"retry: 2000\n\n")
+        self.assertEqual(await anext(body), missed.frame)
+        live = bill_events.publish("bill.status", {"id": 1, "status": "ready", "previous": "preparing"})
+        self.assertEqual(await anext(body), live.frame)
+        await body.aclose()
+
+    async def test_unknown_event_id_asks_for_a_reload(self):
+        response = await self.async_client.get("/api/kitchen/events/?last_event_id=0123abcd-5")
+        body = response.streaming_content
+        await anext(body)
+        self.assertIn(b"event: reset", await anext(body))
+        await body.aclose()
+
+    def test_needs_asgi(self):
+        self.assertEqual(self.client.get("/api/kitchen/events/").status_code, 501)
+
+
+@skipUnless(connection.vendor == "sqlite", "reads SQLite query plans")
+class IndexUsageTests(APITestCase):
+    """EXPLAIN the hot queries against seeded data: none may scan a whole table."""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command("generate_load_data", categories=3, subcategories=3, items=45, customers=200,
+                     bills=2000, end_date=date(2026, 1, 31), verbosity=0, stdout=StringIO())
+        cls.customer = Customer.objects.first()
+        cls.bill = Bill.objects.filter(items__isnull=False).first()
+
+    def bills(self, query):
+        """The bill listing's first page, as the viewset builds it."""
+        qs = BillFilter(QueryDict(query), queryset=Bill.objects.all()).qs
+        return qs.order_by(*BillCursorPagination.ordering)[:21]
+
+    def assertIndexed(self, qs, ordered=False):
+        plan = qs.explain()
+        for line in plan.splitlines():
+            if "SCAN" in line and "USING" not in line:
+                self.fail(f"full table scan:\n{plan}\n{qs.query}")
+        if ordered:
+            self.assertNotIn("TEMP B-TREE", plan, f"sorted outside the index:\n{plan}")
+
+    def test_bill_listings(self):
+        ordered = ["", f"customer={self.customer.pk}", f"phone={self.customer.phone}",
+                   "status=preparing", "is_paid=false", "today=true",
+                   "date_from=2026-01-01&date_to=2026-01-07"]
+        for query in ordered:
+            with self.subTest(query=query):
+                self.assertIndexed(self.bills(query), ordered=True)
+        # IN lists sort the matching rows; paid bills walk the created_at index.
+        for query in ["open=true", "status=pending,confirmed", "is_paid=true"]:
+            with self.subTest(query=query):
+                self.assertIndexed(self.bills(query))
+
+    def test_menu_items(self):
+        subcategory = MenuSubCategory.objects.first()
+        self.assertIndexed(MenuItem.objects.filter(subcategory=subcategory, is_available=True))
+        self.assertIndexed(MenuItem.objects.filter(subcategory__category=subcategory.category_id))
+
+    def test_bill_items(self):
+        items = self.bill.items
+        self.assertIndexed(items.all())
+        self.assertIndexed(items.filter(item__in=[1, 2]))
+        self.assertIndexed(items.values("quantity", "unit_price", "size__price"))
+
+
+class RequestMetricsTests(APITestCase):
+    def setUp(self):
+        seed_menu(categories=1, subcategories=1, items=2, sizes=1)
+
+    def test_server_timing_header_counts_queries(self):
+        response = self.client.get("/api/categories/")
+        timing = response["Server-Timing"]
+        self.assertRegex(timing, r'^app;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries"$')
+        self.assertNotIn('desc="0 queries"', timing)
+
+    def test_metrics_endpoint_exposes_histograms(self):
+        before = metrics.request_duration.count("category-list", "GET")
+        self.client.get("/api/categories/")
+        self.assertEqual(metrics.request_duration.count("category-list", "GET"), before + 1)
+
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        body = response.content.decode()
+        self.assertIn("# TYPE django_http_request_duration_seconds histogram", body)
+        self.assertIn('django_http_request_db_queries_bucket{view="category-list",method="GET",le="+Inf"}', body)
+        self.assertIn('django_http_responses_total{view="category-list",method="GET",status="200"}', body)
+
+    def test_slow_query_log(self):
+        with self.settings(SLOW_QUERY_MS=0.000001), self.assertLogs("api.slow_queries") as logs:
+            self.client.get("/api/categories/")
+        self.assertIn("category-list", logs.output[0])
+        self.assertIn("SELECT", logs.output[0])
+
+    def test_slow_query_log_is_off_by_default(self):
+        with self.assertNoLogs("api.slow_queries"):
+            self.client.get("/api/categories/")
+
+    def test_trace_id_is_echoed_and_logged(self):
+        with self.settings(SLOW_QUERY_MS=0.000001), self.assertLogs("api.slow_queries") as logs:
+            response = self.client.get("/api/categories/", HTTP_X_TRACE_ID="turn-42")
+        self.assertEqual(response["X-Trace-Id"], "turn-42")
+        self.assertIn("trace=turn-42", logs.output[0])
+        self.assertNotIn("X-Trace-Id", self.client.get("/api/categories/"))
+
+
+class CartTests(APITestCase):
+    phone = "+923001234567"
+    url = f"/api/carts/{phone}/"
+
+    def setUp(self):
+        cache.clear()
+        carts.discard(self.phone)
+        self.items, self.sizes = seed_menu(categories=1, subcategories=1, items=3, sizes=2)
+
+    def line(self, n, size=0, quantity=1):
+        return {"item_id": self.items[n].pk, "size_id": self.sizes[size].pk, "quantity": quantity}
+
+    def test_editing_and_previewing_writes_nothing(self):
+        response = self.client.post(self.url + "items/", {"items": [self.line(0)]}, format="json")
+        self.assertEqual(response.status_code, 200, response.content)
+        with self.assertNumQueries(0):
+            self.client.post("/api/carts/0300-1234567/items/",
+                             {"items": [self.line(0, quantity=2), self.line(1, size=1)]}, format="json")
+            self.client.post(self.url + "quantities/",
+                             {"items": [self.line(1, size=1, quantity=0), self.line(2, quantity=4)]},
+                             format="json")
+            response = self.client.get(self.url, {"payment_method": "cash"})
+        body = response.json()
+        self.assertEqual(
+            [(line["item_id"], line["quantity"], line["total_price"]) for line in body["items"]],
+            [(self.items[0].pk, 3, "300.00"), (self.items[2].pk, 4, "400.00")],
+        )
+        self.assertEqual((body["subtotal"], body["tax_amount"], body["total_amount"]),
+                         ("700.00", "35.00", "735.00"))
+        self.assertFalse(Bill.objects.exists())
+
+    def test_invalid_lines(self):
+        self.items[1].is_available = False
+        self.items[1].save()
+        response = self.client.post(self.url + "items/", {"items": [
+            self.line(0), self.line(1), {"item_id": 0, "size_id": self.sizes[0].pk},
+        ]}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["items"][1:], [
+            {"item_id": "Menu item is not available."}, {"item_id": "Menu item not found."},
+        ])
+        self.assertFalse(carts.get(self.phone))
+
+    def test_checkout_places_the_order_and_empties_the_cart(self):
+        self.client.post(self.url + "items/", {"items": [self.line(0, quantity=2)]}, format="json")
+        details = {"first_name": "Ali", "last_name": "Khan", "address": "Gulberg", "payment_method": "cash"}
+        response = self.client.post(self.url + "checkout/", {"first_name": "Ali"}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Bill.objects.exists())
+        self.assertTrue(carts.get(self.phone))
+
+        response = self.client.post(self.url + "checkout/", details, format="json")
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json()["total_amount"], "210.00")
+        self.assertEqual(BillItem.objects.get().quantity, 2)
+        self.assertFalse(carts.get(self.phone))
+        response = self.client.post(self.url + "checkout/", details, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Bill.objects.count(), 1)
+
+    def test_several_workers_need_the_sqlite_store(self):
+        with self.settings(WORKERS=4), self.assertLogs("api.carts", "WARNING"):
+            warn_if_unshared()
+        with self.settings(WORKERS=4, CART_SQLITE_PATH="/tmp/carts.sqlite3"), \
+                self.assertNoLogs("api.carts"):
+            warn_if_unshared()
+
+    def test_expired_carts_are_dropped_and_reaped(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for path in (None, os.path.join(tmp, "carts.sqlite3")):
+                now = [1000.0]
+                store = CartStore(ttl=60, path=path, clock=lambda: now[0])
+                store.add("+1", [(1, 1, 1)])
+                store.add("+2", [(1, 1, 1)])
+                now[0] += 30
+                store.set_quantities("+2", [(2, 1, 3)])
+                if path:
+                    # Another worker on the same file sees the carts.
+                    self.assertEqual(CartStore(60, path, clock=lambda: now[0]).get("+2").lines,
+                                     {(1, 1): 1, (2, 1): 3})
+                now[0] += 40
+                self.assertEqual(store.reap(), 1)
+                self.assertFalse(store.get("+1"))
+                self.assertEqual(len(store), 1)
+                now[0] += 60
+                self.assertEqual(store.reap(), 1)
+                self.assertEqual(len(store), 0)
+
+    def test_reap_command_needs_the_sqlite_store(self):
+        with self.settings(CART_SQLITE_PATH=None), \
+                self.assertRaisesMessage(CommandError, "DJANGO_CART_SQLITE_PATH"):
+            call_command("reap_carts", stdout=StringIO())
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "carts.sqlite3")
+            now = [1000.0]
+            store = CartStore(ttl=60, path=path, clock=lambda: now[0])
+            store.add("+1", [(1, 1, 1)])
+            now[0] += 60
+            out = StringIO()
+            with self.settings(CART_SQLITE_PATH=path), \
+                    mock.patch("api.management.commands.reap_carts.carts", store):
+                call_command("reap_carts", stdout=out)
+            self.assertIn("Reaped 1 expired carts.", out.getvalue())
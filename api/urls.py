@@ -1,5 +1,7 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from . import async_views
 from .views import *
 
 # Create router and register viewsets
@@ -12,8 +14,37 @@ router.register(r'sizes', MenuItemSizeViewSet, basename='size')
 router.register(r'customers', CustomerViewSet, basename='customer')
 router.register(r'bills', BillViewSet, basename='bill')
 router.register(r'bill-items', BillItemViewSet, basename='billitem')
+router.register(r'carts', CartViewSet, basename='cart')
 # Include all router URLs
 urlpatterns = [
     path('', include(router.urls)),
     path('menu/', full_menu_view, name='menu'),
-]
\ No newline at end of file
+    path('menu/version/', menu_version_view, name='menu-version'),
+    path('menu/search/', menu_search_view, name='menu-search'),
+    path('orders/', place_order_view, name='place-order'),
+    path('kitchen/events/', kitchen_events_view, name='kitchen-events'),
+]
+
+# Hot endpoints answered by the async views (api/async_views.py), mounted
+# ahead of the router when settings.ASYNC_VIEWS is on; any other method on
+# these URLs still reaches the DRF view. Names match the router's so reverse()
+# and the per-view metrics see one endpoint.
+fallback = async_views.with_fallback
+async_urlpatterns = [
+    path('menu/', fallback(full_menu_view, GET=async_views.full_menu), name='menu'),
+    path('items/', fallback(
+        MenuItemViewSet.as_view({'get': 'list'}), GET=async_views.item_list), name='item-list'),
+    path('sizes/', fallback(
+        MenuItemSizeViewSet.as_view({'get': 'list'}), GET=async_views.size_list), name='size-list'),
+    path('customers/by-phone/', fallback(
+        CustomerViewSet.as_view({'get': 'by_phone'}), GET=async_views.customer_by_phone), name='customer-by-phone'),
+    path('bills/', fallback(
+        BillViewSet.as_view({'get': 'list', 'post': 'create'}), POST=async_views.create_bill), name='bill-list'),
+    path('bills/<int:pk>/items/', fallback(
+        BillViewSet.as_view({'post': 'add_items'}), POST=async_views.add_bill_items), name='bill-add-items'),
+    path('bill-items/', fallback(
+        BillItemViewSet.as_view({'get': 'list', 'post': 'create'}), POST=async_views.add_bill_item), name='billitem-list'),
+]
+
+if settings.ASYNC_VIEWS:
+    urlpatterns = async_urlpatterns + urlpatterns
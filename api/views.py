@@ -1,141 +1,169 @@
 from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action, api_view
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
 from .models import *
 from .serializers import *
+from .carts import carts
+from .events import bill_events, stream
+from .filters import BillFilter, CustomerFilter
+from .idempotency import IdempotentMixin, idempotent
+from .menu import get_menu_snapshot, get_menu_version
+from .phone import normalize_phone
+from .pagination import BillCursorPagination
+from .search import menu_index
 from django_filters.rest_framework import DjangoFilterBackend
 
+def filter_by_menu_params(qs, params):
+    """Filter an item or size queryset by category/subcategory query params.
+
+    Shared by the item and size viewsets and the MCP server's in-process
+    backend, so both accept the same friendly param names.
+    """
+    def norm(v):
+        if v is None:
+            return None
+        v = str(v).strip()
+        # treat empty, null, -1 and 0 as 'no value' (some callers use 0 as sentinel)
+        if v == '0':
+            return None
+        return v
+
+    category = norm(params.get('category') or params.get('category_id'))
+    subcategory = norm(params.get('subcategory') or params.get('subcategory_id'))
+    # Support direct subcategory__category filter too
+    subcat_cat = norm(params.get('subcategory__category'))
+
+    if subcat_cat:
+        qs = qs.filter(subcategory__category=subcat_cat)
+    elif category:
+        qs = qs.filter(subcategory__category=category)
+
+    if subcategory:
+        qs = qs.filter(subcategory=subcategory)
+
+    return qs
+
 class MenuCategoryViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = MenuCategory.objects.all()
+    queryset = MenuCategory.objects.prefetch_related('subcategories')
     serializer_class = MenuCategorySerializer
 
 class MenuItemViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = MenuItem.objects.all()
+    queryset = MenuItem.objects.select_related('subcategory__category')
     serializer_class = MenuItemSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
     filterset_fields = ['subcategory', 'subcategory__category']
 
     def get_queryset(self):
-        qs = super().get_queryset()
-        # Accept friendly param names from MCP tools or external callers
-        def norm(v):
-            if v is None:
-                return None
-            v = str(v).strip()
-            # treat empty, null, -1 and 0 as 'no value' (some callers use 0 as sentinel)
-            if v == '0':
-                return None
-            return v
-
-        category = norm(self.request.query_params.get('category') or self.request.query_params.get('category_id'))
-        subcategory = norm(self.request.query_params.get('subcategory') or self.request.query_params.get('subcategory_id'))
-        # Support direct subcategory__category filter too
-        subcat_cat = norm(self.request.query_params.get('subcategory__category'))
-
-        if subcat_cat:
-            qs = qs.filter(subcategory__category=subcat_cat)
-        elif category:
-            qs = qs.filter(subcategory__category=category)
-
-        if subcategory:
-            qs = qs.filter(subcategory=subcategory)
-
-        return qs
+        return filter_by_menu_params(super().get_queryset(), self.request.query_params)
 
 class MenuItemSizeViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = MenuItemSize.objects.all()
+    queryset = MenuItemSize.objects.select_related('subcategory__category')
     serializer_class = MenuItemSizeSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
     filterset_fields = ['subcategory', 'subcategory__category']
 
     def get_queryset(self):
-        qs = super().get_queryset()
-        def norm(v):
-            if v is None:
-                return None
-            v = str(v).strip()
-            # treat empty, null, -1 and 0 as 'no value' (some callers use 0 as sentinel)
-            if v == '0':
-                return None
-            return v
-
-        category = norm(self.request.query_params.get('category') or self.request.query_params.get('category_id'))
-        subcategory = norm(self.request.query_params.get('subcategory') or self.request.query_params.get('subcategory_id'))
-        subcat_cat = norm(self.request.query_params.get('subcategory__category'))
-
-        if subcat_cat:
-            qs = qs.filter(subcategory__category=subcat_cat)
-        elif category:
-            qs = qs.filter(subcategory__category=category)
-
-        if subcategory:
-            qs = qs.filter(subcategory=subcategory)
-
-        return qs
+        return filter_by_menu_params(super().get_queryset(), self.request.query_params)
 
 @api_view(["GET"])
 def full_menu_view(request):
-    categories = MenuCategory.objects.prefetch_related(
-        "subcategories__menu_items",
-        "subcategories__item_sizes",
+    """Serve the precompiled menu snapshot; rebuilt only when the menu changes."""
+    version, snapshot = get_menu_snapshot()
+    etag = f'"menu-{version}"'
+    if request.headers.get("If-None-Match") == etag:
+        return HttpResponseNotModified(headers={"ETag": etag})
+    return HttpResponse(snapshot, content_type="application/json", headers={"ETag": etag})
+
+@api_view(["GET"])
+def menu_version_view(request):
+    """Cheap probe so clients can tell whether their cached menu is stale."""
+    return Response({"version": get_menu_version()})
+
+@api_view(["GET"])
+def menu_search_view(request):
+    """Rank (item, size, price) candidates for free text like "large zinger"."""
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response({'detail': 'q query parameter is required'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        limit = min(max(int(request.query_params.get('limit', 10)), 1), 50)
+    except ValueError:
+        limit = 10
+    available_only = request.query_params.get('available_only', 'true').lower() != 'false'
+    return Response(menu_index.search(query, limit=limit, available_only=available_only))
+
+@idempotent
+@api_view(["POST"])
+def place_order_view(request):
+    """Upsert the customer, create the bill and add its items in one transaction."""
+    serializer = PlaceOrderSerializer(data=request.data, context={'request': request})
+    serializer.is_valid(raise_exception=True)
+    serializer.save()
+    return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+async def kitchen_events_view(request):
+    """Bill events as server-sent events, for kitchen screens (see api/events.py).
+
+    Resumes after ``Last-Event-ID`` (or ``?last_event_id=`` for the first
+    connection). Needs an ASGI server: WSGI would buffer the endless body.
+    """
+    if request.method != "GET":
+        return JsonResponse({"detail": f'Method "{request.method}" not allowed.'}, status=405)
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({"detail": "The event stream needs an ASGI server."}, status=501)
+    last_event_id = request.headers.get("Last-Event-ID") or request.GET.get("last_event_id")
+    subscription = bill_events.subscribe(last_event_id)
+    response = StreamingHttpResponse(
+        stream(subscription, settings.BILL_EVENTS_KEEPALIVE), content_type="text/event-stream"
     )
-    menu = []
-    for cat in categories:
-        cat_dict = {
-            "id": cat.id,
-            "name": cat.name,
-            "subcategories": []
-        }
-        for sub in cat.subcategories.all():
-            sub_dict = {
-                "id": sub.id,
-                "name": sub.name,
-                "items": []
-            }
-            for item in sub.menu_items.all():
-                item_dict = {
-                    "id": item.id,
-                    "name": item.name,
-                    "description": item.description,
-                    "is_available": item.is_available,
-                    "sizes": [
-                        {
-                            "id": size.id,
-                            "name": size.name,
-                            "price": str(size.price)
-                        }
-                        for size in sub.item_sizes.all()
-                    ]
-                }
-                sub_dict["items"].append(item_dict)
-            cat_dict["subcategories"].append(sub_dict)
-        menu.append(cat_dict)
-    return Response(menu)
+    response["Cache-Control"] = "no-cache"
+    # Stop nginx from buffering the stream.
+    response["X-Accel-Buffering"] = "no"
+    return response
 
 class CustomerViewSet(viewsets.ModelViewSet):
     queryset = Customer.objects.all()
     serializer_class = CustomerSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
-    filterset_fields = ['phone']
+    filterset_class = CustomerFilter
 
     @action(detail=False, methods=["get"], url_path="by-phone")
     def by_phone(self, request):
-        """Lookup a customer by phone number. Returns {exists: bool, customer: {...}} when found."""
+        """Lookup a customer by phone number in any format ("+92300...", "0300...").
+
+        Returns {exists: bool, customer: {...}} when found.
+        """
         phone = request.query_params.get('phone') or request.data.get('phone')
         if not phone:
             return Response({'detail': 'phone query parameter is required'}, status=status.HTTP_400_BAD_REQUEST)
 
-        qs = self.get_queryset().filter(phone=phone)
-        if not qs.exists():
+        customer = Customer.objects.by_phone(phone)
+        if customer is None:
             return Response({'exists': False}, status=status.HTTP_200_OK)
 
-        customer = qs.first()
-        return Response({'exists': True, 'customer': CustomerSerializer(customer).data}, status=status.HTTP_200_OK)
+        return Response({'exists': True, 'customer': self.get_serializer(customer).data}, status=status.HTTP_200_OK)
 
-class BillViewSet(viewsets.ModelViewSet):
-    queryset = Bill.objects.all()
+class BillViewSet(IdempotentMixin, viewsets.ModelViewSet):
+    queryset = Bill.objects.with_details()
+    pagination_class = BillCursorPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = BillFilter
     serializer_class = BillSerializer
 
+    @action(detail=True, methods=["post"], url_path="items")
+    def add_items(self, request, pk=None):
+        """Add several item/size/quantity lines in one call; returns the updated bill."""
+        bill = self.get_object()
+        serializer = BillItemBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        bill.add_items(serializer.validated_data["items"])
+        bill = self.get_queryset().get(pk=bill.pk)
+        return Response(self.get_serializer(bill).data, status=status.HTTP_201_CREATED)
+
     @action(detail=True, methods=["post"])
     def cancel(self, request, pk=None):
         bill = self.get_object()
@@ -143,6 +171,61 @@ class BillViewSet(viewsets.ModelViewSet):
         bill.save()
         return Response({"status": "Bill cancelled"}, status=status.HTTP_200_OK)
     
-class BillItemViewSet(viewsets.ModelViewSet):
-    queryset = BillItem.objects.all()
+class BillItemViewSet(IdempotentMixin, viewsets.ModelViewSet):
+    queryset = BillItem.objects.select_related('item', 'size__subcategory')
     serializer_class = BillItemSerializer
+
+class CartViewSet(IdempotentMixin, viewsets.ViewSet):
+    """Draft carts by phone (see api/carts.py); nothing reaches the bill tables
+    until checkout.
+
+    Every call but checkout answers with the cart priced as a bill would be;
+    ``?payment_method=`` picks the tax rate used.
+    """
+    lookup_field = "phone"
+    lookup_value_regex = "[^/]+"
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.phone = normalize_phone(kwargs.get("phone"))
+        if not self.phone:
+            raise ValidationError({"phone": "Enter a phone number."})
+
+    def _preview(self, request, cart):
+        payment_method = request.query_params.get("payment_method")
+        if payment_method and payment_method not in dict(Bill.PAYMENT_METHOD_CHOICES):
+            raise ValidationError({"payment_method": f'"{payment_method}" is not a valid choice.'})
+        return Response(carts.preview(cart, payment_method))
+
+    def retrieve(self, request, phone=None):
+        return self._preview(request, carts.get(self.phone))
+
+    def destroy(self, request, phone=None):
+        carts.discard(self.phone)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=True, methods=["post"])
+    def items(self, request, phone=None):
+        """Add lines; an item/size already in the cart has its quantity increased."""
+        serializer = CartLinesSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return self._preview(request, carts.add(self.phone, serializer.validated_data["items"]))
+
+    @action(detail=True, methods=["post"])
+    def quantities(self, request, phone=None):
+        """Set the quantity of lines; a quantity of 0 removes the line."""
+        serializer = CartQuantitiesSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return self._preview(request, carts.set_quantities(self.phone, serializer.validated_data["items"]))
+
+    @action(detail=True, methods=["post"])
+    def checkout(self, request, phone=None):
+        """Place the cart as an order (same body as /orders/, less phone and items)."""
+        with carts.checkout(self.phone) as cart:
+            if not cart:
+                return Response({"detail": "The cart is empty."}, status=status.HTTP_400_BAD_REQUEST)
+            data = {**request.data, "phone": self.phone, "items": cart.items()}
+            serializer = PlaceOrderSerializer(data=data, context={"request": request})
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -0,0 +1,51 @@
+"""Cost of adding items to one bill as the bill grows.
+
+Each BillItem save refreshes the bill totals. With an aggregate subtotal the
+per-item cost (time and queries) should stay flat; re-summing items in
+Python made it grow with the bill, so 50 items cost O(n^2) overall.
+
+    python benchmarks/bill_totals.py --items 50
+"""
+import argparse
+import time
+from decimal import Decimal
+
+import django_env
+
+django_env.create_test_database()
+
+from django.db import connection  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+
+from api.models import (  # noqa: E402
+    Bill, BillItem, Customer, MenuCategory, MenuItem, MenuItemSize, MenuSubCategory,
+)
+
+
+def run(count):
+    category = MenuCategory.objects.create(name="Bench")
+    sub = MenuSubCategory.objects.create(name="Bench", category=category)
+    size = MenuItemSize.objects.create(name="Regular", price=Decimal("450.00"), subcategory=sub)
+    items = [MenuItem.objects.create(name=f"Item {n}", subcategory=sub) for n in range(count)]
+    customer = Customer.objects.create(first_name="Bench", last_name="User", phone="03000000000", address="-")
+    bill = Bill.objects.create(customer=customer, payment_method="cash")
+
+    print(f"{'item #':>7} {'ms':>8} {'queries':>8}")
+    total = 0.0
+    for n, item in enumerate(items, start=1):
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            BillItem.objects.create(bill=bill, item=item, size=size, quantity=2, unit_price=size.price)
+            elapsed = (time.perf_counter() - start) * 1000
+        total += elapsed
+        if n in (1, 2, 5, 10) or n % 10 == 0:
+            print(f"{n:>7} {elapsed:>8.2f} {len(ctx.captured_queries):>8}")
+
+    bill.refresh_from_db()
+    print(f"total {total:.1f}ms for {count} items; subtotal={bill.subtotal} total={bill.total_amount}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=50)
+    run(parser.parse_args().items)
@@ -0,0 +1,92 @@
+"""Throughput of many simulated sessions adding items to their own bills.
+
+Each thread plays one WhatsApp conversation: create a bill, then add items one
+at a time (every add locks the bill and rewrites its totals). Run it once per
+database profile:
+
+    python benchmarks/concurrent_writers.py --sessions 16 --items 10
+    python benchmarks/concurrent_writers.py --untuned        # SQLite without PRAGMAs
+    DJANGO_DB_PROFILE=postgres python benchmarks/concurrent_writers.py
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from decimal import Decimal
+
+import django_env
+from django.conf import settings
+from django.db import OperationalError, connection, connections
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+parser.add_argument("--sessions", type=int, default=16)
+parser.add_argument("--items", type=int, default=10)
+parser.add_argument("--untuned", action="store_true", help="SQLite with default settings (no PRAGMAs)")
+args = parser.parse_args()
+
+db = settings.DATABASES["default"]
+if connection.vendor == "sqlite":
+    # Threads need a shared on-disk database, not per-connection :memory:.
+    db.setdefault("TEST", {})["NAME"] = os.path.join(tempfile.mkdtemp(), "bench.sqlite3")
+    if args.untuned:
+        settings.SQLITE_PRAGMAS = []
+        db["OPTIONS"] = {}
+django_env.create_test_database()
+
+from api.models import (  # noqa: E402
+    Bill, BillItem, Customer, MenuCategory, MenuItem, MenuItemSize, MenuSubCategory,
+)
+
+
+def seed():
+    category = MenuCategory.objects.create(name="Bench")
+    sub = MenuSubCategory.objects.create(name="Bench", category=category)
+    size = MenuItemSize.objects.create(name="Regular", price=Decimal("450.00"), subcategory=sub)
+    items = [MenuItem.objects.create(name=f"Item {n}", subcategory=sub) for n in range(args.items)]
+    return size, items
+
+
+def session(n, size, items, results):
+    done = errors = 0
+    try:
+        customer = Customer.objects.create(
+            first_name="Bench", last_name=str(n), phone=f"0300{n:07d}", address="-"
+        )
+        bill = Bill.objects.create(customer=customer, payment_method="cash")
+        for item in items:
+            try:
+                BillItem.objects.create(bill=bill, item=item, size=size, quantity=1)
+                done += 1
+            except OperationalError:
+                errors += 1
+    except OperationalError:
+        errors += 1
+    finally:
+        connections.close_all()
+    results[n] = (done, errors)
+
+
+def run():
+    size, items = seed()
+    results = {}
+    threads = [
+        threading.Thread(target=session, args=(n, size, items, results))
+        for n in range(args.sessions)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    done = sum(r[0] for r in results.values())
+    errors = sum(r[1] for r in results.values())
+    profile = settings.DB_PROFILE + (" (untuned)" if args.untuned else "")
+    print(f"profile={profile} sessions={args.sessions} items/session={args.items}")
+    print(f"{done} item writes in {elapsed:.2f}s -> {done / elapsed:.0f} writes/s, {errors} lock errors")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,144 @@
+"""How many concurrent conversations one server process sustains.
+
+Each conversation replays the API calls the MCP server makes for one WhatsApp
+order: fetch the menu, look the customer up by phone, open a bill, add items
+one at a time and list a category. Concurrency doubles each step; a level is
+sustained while every call succeeds and the p95 call latency stays under
+--slo-ms.
+
+Compare the two deployments against the same (scratch) database:
+
+    # ASGI, async hot endpoints
+    DJANGO_ASYNC_VIEWS=1 uvicorn restaurant.asgi:application --port 8000 --workers 1
+    # WSGI, sync DRF views with a thread per request
+    gunicorn restaurant.wsgi --bind 127.0.0.1:8001 --workers 1 --threads 32
+    # (no gunicorn: python manage.py runserver 8001 --noreload)
+
+    python benchmarks/conversations.py --base-url http://127.0.0.1:8000/api
+    python benchmarks/conversations.py --base-url http://127.0.0.1:8001/api
+
+It creates customers (phones 0399...) and bills in whatever database the
+server uses, so don't point it at production data.
+"""
+import argparse
+import asyncio
+import itertools
+import random
+import time
+
+import httpx
+
+
+class Stats:
+    def __init__(self):
+        self.samples = []
+        self.errors = 0
+
+    def summary(self, elapsed):
+        samples = sorted(self.samples) or [0.0]
+        p50 = samples[len(samples) // 2]
+        p95 = samples[max(int(len(samples) * 0.95) - 1, 0)]
+        return {"calls": len(self.samples), "rps": len(self.samples) / elapsed,
+                "p50": p50, "p95": p95, "errors": self.errors}
+
+
+async def call(client, stats, method, path, **kwargs):
+    start = time.perf_counter()
+    try:
+        response = await client.request(method, path, **kwargs)
+        response.raise_for_status()
+    except httpx.HTTPError:
+        stats.errors += 1
+        return None
+    stats.samples.append((time.perf_counter() - start) * 1000)
+    return response.json()
+
+
+async def conversation(client, stats, phone, menu_lines, args):
+    """One order, start to finish; returns False if a call failed."""
+    think = args.think_ms / 1000
+    if await call(client, stats, "GET", "/menu/") is None:
+        return False
+    found = await call(client, stats, "GET", "/customers/by-phone/", params={"phone": phone})
+    if found is None:
+        return False
+    if found["exists"]:
+        customer_id = found["customer"]["id"]
+    else:
+        created = await call(client, stats, "POST", "/customers/", json={
+            "first_name": "Load", "last_name": "Test", "phone": phone, "address": "-",
+        })
+        if created is None:
+            return False
+        customer_id = created["id"]
+    await asyncio.sleep(think)
+
+    bill = await call(client, stats, "POST", "/bills/", json={"customer_id": customer_id})
+    if bill is None:
+        return False
+    for category_id, item_id, size_id in random.sample(menu_lines, min(args.items, len(menu_lines))):
+        await asyncio.sleep(think)
+        if await call(client, stats, "GET", "/items/", params={"category": category_id}) is None:
+            return False
+        added = await call(client, stats, "POST", "/bill-items/", json={
+            "bill_id": bill["id"], "item_id": item_id, "size_id": size_id, "quantity": 1,
+        })
+        if added is None:
+            return False
+    return True
+
+
+async def run_level(base_url, concurrency, menu_lines, phones, args):
+    stats = Stats()
+    deadline = time.perf_counter() + args.duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        async def worker():
+            while time.perf_counter() < deadline:
+                await conversation(client, stats, next(phones), menu_lines, args)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return stats.summary(time.perf_counter() - start)
+
+
+async def main(args):
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout) as client:
+        menu = (await client.get("/menu/")).json()
+    menu_lines = [
+        (category["id"], item["id"], size["id"])
+        for category in menu
+        for sub in category["subcategories"]
+        for item in sub["items"] if item["is_available"]
+        for size in item["sizes"]
+    ]
+    if not menu_lines:
+        raise SystemExit("The menu has no orderable items; seed it first.")
+
+    # A fixed pool of phones, so later levels mostly reuse existing customers.
+    phones = itertools.cycle(f"0399{n:07d}" for n in range(args.customers))
+    print(f"{args.base_url}: {args.duration}s per level, think {args.think_ms}ms, SLO p95 {args.slo_ms}ms")
+    print(f"{'conversations':>13} {'calls':>7} {'calls/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>6}")
+    sustained = 0
+    for concurrency in (2 ** n for n in range(args.max_exponent + 1)):
+        result = await run_level(args.base_url, concurrency, menu_lines, phones, args)
+        print(f"{concurrency:>13} {result['calls']:>7} {result['rps']:>8.1f} "
+              f"{result['p50']:>8.1f} {result['p95']:>8.1f} {result['errors']:>6}")
+        if result["errors"] or result["p95"] > args.slo_ms:
+            break
+        sustained = concurrency
+    print(f"sustained: {sustained} concurrent conversations")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000/api")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per concurrency level")
+    parser.add_argument("--max-exponent", type=int, default=9, help="stop after 2**N conversations")
+    parser.add_argument("--items", type=int, default=3, help="items added per conversation")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="pause between turns")
+    parser.add_argument("--slo-ms", type=float, default=250.0)
+    parser.add_argument("--customers", type=int, default=1000)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    asyncio.run(main(parser.parse_args()))
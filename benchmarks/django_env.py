@@ -0,0 +1,19 @@
+"""Boot Django for a benchmark script, against a throwaway test database."""
+import os
+import sys
+from pathlib import Path
+
+import django
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "restaurant.settings")
+# One process on a throwaway database: keep its menu out of the shared cache.
+os.environ.setdefault("DJANGO_CACHE_BACKEND", "locmem")
+django.setup()
+
+
+def create_test_database():
+    """Create and migrate the test database (in-memory for SQLite)."""
+    from django.db import connection
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
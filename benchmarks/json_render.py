@@ -0,0 +1,102 @@
+"""DRF's stdlib JSON vs the orjson renderer/parser, on the full menu and 1,000 bills.
+
+Also times the bill serializer with DRF's DecimalField against MoneyField,
+which skips re-quantizing prices that come out of the database ready.
+
+    python benchmarks/json_render.py --bills 1000 --categories 10
+"""
+import argparse
+import io
+import statistics
+import time
+from decimal import Decimal
+
+import django_env
+
+django_env.create_test_database()
+
+from rest_framework import parsers, renderers  # noqa: E402
+from rest_framework.serializers import ModelSerializer  # noqa: E402
+
+from api.menu import build_full_menu  # noqa: E402
+from api.models import (  # noqa: E402
+    Bill, BillItem, Customer, MenuCategory, MenuItem, MenuItemSize, MenuSubCategory,
+)
+from api.renderers import FastJSONParser, FastJSONRenderer, orjson  # noqa: E402
+from api.serializers import APIModelSerializer, BillSerializer  # noqa: E402
+
+
+def seed(categories, bills):
+    items = []
+    for c in range(categories):
+        category = MenuCategory.objects.create(name=f"Category {c}")
+        for s in range(4):
+            sub = MenuSubCategory.objects.create(name=f"Subcategory {c}-{s}", category=category)
+            for z, name in enumerate(("Small", "Regular", "Large")):
+                MenuItemSize.objects.create(name=name, price=Decimal(300 + 150 * z), subcategory=sub)
+            for i in range(8):
+                items.append(MenuItem.objects.create(
+                    name=f"Item {c}-{s}-{i}", subcategory=sub,
+                    description="Grilled, with house sauce and fresh vegetables.",
+                ))
+    customers = Customer.objects.bulk_create(
+        Customer(first_name="Bench", last_name=str(n), phone=f"0300{n:07d}",
+                 phone_canonical=f"+92300{n:07d}", address="12 Main Boulevard, Lahore")
+        for n in range(bills)
+    )
+    created = Bill.objects.bulk_create(Bill(customer=c, payment_method="cash") for c in customers)
+    BillItem.objects.bulk_create(
+        BillItem(bill=bill, item=item, size=size, quantity=2, unit_price=size.price)
+        for n, bill in enumerate(created)
+        for item in items[n % len(items):n % len(items) + 3]
+        for size in [item.subcategory.item_sizes.first()]
+    )
+    for bill in created:
+        bill.update_totals()
+
+
+def timed(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), result
+
+
+def run(args):
+    seed(args.categories, args.bills)
+    menu = build_full_menu()
+    bills = list(Bill.objects.with_details())
+
+    print(f"orjson {'available' if orjson else 'NOT installed (fast classes fall back to stdlib)'}")
+    print(f"{'payload':<24} {'step':<12} {'stdlib ms':>10} {'fast ms':>9} {'speedup':>8}")
+
+    def row(payload, step, slow, fast):
+        print(f"{payload:<24} {step:<12} {slow:>10.2f} {fast:>9.2f} {slow / fast:>7.1f}x")
+
+    drf_mapping = ModelSerializer.serializer_field_mapping
+    fast_mapping = APIModelSerializer.serializer_field_mapping
+    APIModelSerializer.serializer_field_mapping = drf_mapping
+    slow_ms, _ = timed(lambda: BillSerializer(bills, many=True).data, args.repeat)
+    APIModelSerializer.serializer_field_mapping = fast_mapping
+    fast_ms, data = timed(lambda: BillSerializer(bills, many=True).data, args.repeat)
+    row(f"{len(bills)} bills", "serialize", slow_ms, fast_ms)
+
+    for label, payload in (("full menu", menu), (f"{len(bills)} bills", data)):
+        slow_ms, body = timed(lambda: renderers.JSONRenderer().render(payload), args.repeat)
+        fast_ms, fast_body = timed(lambda: FastJSONRenderer().render(payload), args.repeat)
+        assert body == fast_body, f"{label}: renderers disagree"
+        row(label, "render", slow_ms, fast_ms)
+
+        slow_ms, _ = timed(lambda: parsers.JSONParser().parse(io.BytesIO(body)), args.repeat)
+        fast_ms, _ = timed(lambda: FastJSONParser().parse(io.BytesIO(body)), args.repeat)
+        row(f"{label} ({len(body) // 1024} KiB)", "parse", slow_ms, fast_ms)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bills", type=int, default=1000)
+    parser.add_argument("--categories", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=10)
+    run(parser.parse_args())
@@ -0,0 +1,60 @@
+"""Per-call latency of a fresh httpx client vs the shared pooled client.
+
+Start the API first (``python manage.py runserver``), then run from the repo root:
+
+    python benchmarks/mcp_http_client.py --calls 200 --path /categories/
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "mcp"))
+import main  # noqa: E402
+
+
+def summarize(label, samples):
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f"{label:<14} mean={statistics.mean(samples):7.2f}ms  "
+          f"p50={statistics.median(samples):7.2f}ms  p95={p95:7.2f}ms")
+
+
+async def per_call_client(path, calls):
+    samples = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        async with httpx.AsyncClient() as client:
+            resp = await client.get(f"{main.API_BASE}{path}")
+            resp.raise_for_status()
+            resp.json()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+async def shared_client(path, calls):
+    samples = []
+    async with main.lifespan(main.mcp):
+        for _ in range(calls):
+            start = time.perf_counter()
+            await main.api_get(path)
+            samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+async def run(path, calls):
+    print(f"{calls} sequential GET {main.API_BASE}{path}")
+    summarize("per-call", await per_call_client(path, calls))
+    summarize("shared pool", await shared_client(path, calls))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--path", default="/categories/")
+    args = parser.parse_args()
+    asyncio.run(run(args.path, args.calls))
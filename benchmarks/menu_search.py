@@ -0,0 +1,87 @@
+"""Query latency of the in-memory menu search index on a large synthetic menu.
+
+    python benchmarks/menu_search.py --items 10000
+"""
+import argparse
+import random
+import statistics
+import time
+
+import django_env  # noqa: F401
+
+from api.menu import get_menu_version  # noqa: E402
+from api.search import MenuIndex  # noqa: E402
+
+WORDS = (
+    "zinger chicken beef fajita pepperoni tikka malai crispy spicy cheese double "
+    "grilled smoky bbq classic supreme veggie garlic mushroom jalapeno peri "
+    "tandoori kabab shawarma club crunch hot mighty royal special family"
+).split()
+INGREDIENTS = (
+    "lettuce mayo onion tomato pickle jalapeno olive capsicum corn sweetcorn "
+    "mozzarella cheddar parmesan feta paneer egg mint chutney raita garlic ginger "
+    "chilli pepper lemon lime honey mustard ketchup sriracha teriyaki pesto "
+    "basil oregano thyme rosemary coriander cumin paprika saffron cardamom "
+    "cinnamon vanilla chocolate caramel strawberry mango banana pineapple apple "
+    "orange peach cherry blueberry coconut almond pistachio walnut cashew peanut "
+    "sesame oat wheat rye brioche naan paratha pita tortilla bun croissant bagel "
+    "fillet thigh wing drumstick breast mince patty sausage bacon salami ham "
+    "turkey lamb mutton prawn fish salmon tuna squid crab lobster tofu bean "
+    "lentil chickpea potato wedge coleslaw salad soup gravy sauce dip butter "
+    "cream yogurt milk shake smoothie soda lemonade tea coffee latte mocha"
+).split()
+CATEGORIES = ["Burger", "Pizza", "Wraps", "Sandwich", "Fries", "Drinks", "Desserts", "Deals"]
+SIZES = [("Small", 1), ("Regular", 1.4), ("Large", 1.9), ("Family", 2.6)]
+QUERIES = [
+    "large zinger burger", "zingr", "2 fajita pizza", "cokes", "chicken tikka wrap",
+    "family deal", "spicy crispy", "regular peri fries", "malai boti", "cheese",
+]
+
+
+def build(count, seed=7):
+    rng = random.Random(seed)
+    index = MenuIndex()
+    item_id = size_id = sub_id = 0
+    per_sub = 50
+    while item_id < count:
+        sub_id += 1
+        category_id = sub_id % len(CATEGORIES)
+        category = CATEGORIES[category_id]
+        sub_name = f"{rng.choice(WORDS).title()} {category}"
+        sizes = []
+        for name, factor in SIZES[: rng.randint(1, len(SIZES))]:
+            size_id += 1
+            sizes.append((size_id, name, round(350 * factor, 2)))
+        index.set_sizes(sub_id, sizes)
+        for _ in range(per_sub):
+            item_id += 1
+            name = " ".join(rng.sample(WORDS, 2)).title() + f" {category}"
+            description = " ".join(rng.sample(INGREDIENTS, 5))
+            index.add_item(item_id, name, description, True, sub_id, sub_name, category_id, category)
+    index.version = get_menu_version()
+    return index
+
+
+def run(count, rounds):
+    start = time.perf_counter()
+    index = build(count)
+    print(f"built index over {len(index.items)} items in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    for query in QUERIES:
+        index.search(query, limit=5)  # warm the per-token match cache
+        samples = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            index.search(query, limit=5)
+            samples.append((time.perf_counter() - start) * 1000)
+        samples.sort()
+        print(f"{query!r:<24} p50={statistics.median(samples):.3f}ms "
+              f"p95={samples[int(len(samples) * 0.95) - 1]:.3f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+    run(args.items, args.rounds)
@@ -0,0 +1,96 @@
+"""Response bytes and serialization time per endpoint, full vs compact.
+
+Everything an MCP tool returns ends up in the model's context, so bytes are
+a proxy for tokens (roughly 4 bytes each). Rows are fetched once up front;
+the timings cover serializer + JSON rendering only.
+
+    python benchmarks/response_size.py --categories 8 --bills 50
+"""
+import argparse
+import statistics
+import time
+from decimal import Decimal
+
+import django_env
+
+django_env.create_test_database()
+
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from api.models import (  # noqa: E402
+    Bill, BillItem, Customer, MenuCategory, MenuItem, MenuItemSize, MenuSubCategory,
+)
+from api.serializers import (  # noqa: E402
+    BillSerializer, CustomerSerializer, MenuCategorySerializer, MenuItemSerializer,
+    MenuItemSizeSerializer, field_options,
+)
+from api.views import (  # noqa: E402
+    BillViewSet, MenuCategoryViewSet, MenuItemSizeViewSet, MenuItemViewSet,
+)
+
+MODES = {
+    "full": {},
+    "compact": {"compact": "1"},
+    "compact+fields": {"compact": "1", "fields": "id,name,price,total_amount,status,items,customer_id"},
+}
+
+
+def seed(categories, bills):
+    items = []
+    for c in range(categories):
+        category = MenuCategory.objects.create(name=f"Category {c}")
+        for s in range(4):
+            sub = MenuSubCategory.objects.create(name=f"Subcategory {c}-{s}", category=category)
+            for z, name in enumerate(("Small", "Regular", "Large")):
+                MenuItemSize.objects.create(name=name, price=Decimal(300 + 150 * z), subcategory=sub)
+            for i in range(6):
+                items.append(MenuItem.objects.create(
+                    name=f"Item {c}-{s}-{i}", subcategory=sub,
+                    description="Grilled, with house sauce and fresh vegetables.",
+                ))
+    for n in range(bills):
+        customer = Customer.objects.create(
+            first_name="Bench", last_name=str(n), phone=f"0300{n:07d}", address="12 Main Boulevard, Lahore"
+        )
+        bill = Bill.objects.create(customer=customer, payment_method="cash")
+        for line in range(4):
+            item = items[(n * 4 + line) % len(items)]
+            BillItem.objects.create(bill=bill, item=item, size=item.subcategory.item_sizes.first(), quantity=1)
+
+
+def measure(serializer_class, rows, params, repeat):
+    renderer = JSONRenderer()
+    context = {"field_options": field_options(params)}
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = renderer.render(serializer_class(rows, many=True, context=context).data)
+        samples.append((time.perf_counter() - start) * 1000)
+    return len(body), statistics.median(samples)
+
+
+def run(args):
+    seed(args.categories, args.bills)
+    endpoints = {
+        "/categories/": (MenuCategorySerializer, list(MenuCategoryViewSet.queryset.all())),
+        "/items/": (MenuItemSerializer, list(MenuItemViewSet.queryset.all())),
+        "/sizes/": (MenuItemSizeSerializer, list(MenuItemSizeViewSet.queryset.all())),
+        "/customers/": (CustomerSerializer, list(Customer.objects.all())),
+        "/bills/ (page)": (BillSerializer, list(BillViewSet.queryset.all()[:20])),
+    }
+    print(f"{'endpoint':<16} {'mode':<15} {'rows':>5} {'bytes':>8} {'~tokens':>8} {'ms':>7} {'saved':>6}")
+    for path, (serializer_class, rows) in endpoints.items():
+        full_bytes = None
+        for mode, params in MODES.items():
+            size, ms = measure(serializer_class, rows, params, args.repeat)
+            full_bytes = full_bytes or size
+            print(f"{path:<16} {mode:<15} {len(rows):>5} {size:>8} {size // 4:>8} {ms:>7.2f} "
+                  f"{1 - size / full_bytes:>6.0%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--categories", type=int, default=8)
+    parser.add_argument("--bills", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    run(parser.parse_args())
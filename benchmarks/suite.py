@@ -0,0 +1,445 @@
+"""Latency, queries and throughput for every API route and every MCP tool.
+
+Seeds a throwaway database with ``manage.py generate_load_data`` (same seed,
+same rows), then calls each route in ``api/urls.py`` through Django's test
+client and each tool in ``mcp/main.py`` through a fastmcp ``Client`` on the
+in-process ORM backend. Every case records p50/p95/p99 latency, queries per
+call and sequential throughput; the run is written as JSON and compared with
+a stored baseline:
+
+    python benchmarks/suite.py                          # writes benchmarks/results/latest.json
+    python benchmarks/suite.py --save-baseline          # refreshes benchmarks/baseline.json
+
+A case regresses when it runs more queries than the baseline, or when its p50
+is more than --tolerance (and at least --min-delta-ms) slower than the rest
+of the run moved; the script then exits with status 1. Query counts are exact
+on any machine. Latencies only compare against a baseline taken on the same
+machine, so refresh it there before relying on them.
+
+The suite fails up front if a route or tool has no case, so new endpoints
+have to be added here.
+"""
+import argparse
+import asyncio
+import gc
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+# Measure the hot routes through their async views too, as an ASGI server
+# started with DJANGO_ASYNC_VIEWS=1 serves them (restaurant/asgi.py).
+os.environ.setdefault("DJANGO_ASYNC_VIEWS", "1")
+
+import django_env
+
+django_env.create_test_database()
+os.environ["MCP_BACKEND"] = "orm"
+sys.path.insert(0, str(django_env.BASE_DIR / "mcp"))
+
+from django.conf import settings  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.db.backends.signals import connection_created  # noqa: E402
+from django.test import AsyncClient, Client, override_settings  # noqa: E402
+from django.urls import URLPattern, get_resolver, reverse  # noqa: E402
+from fastmcp import Client as MCPClient  # noqa: E402
+
+import main  # noqa: E402
+from api.carts import carts  # noqa: E402
+from api.events import bill_events  # noqa: E402
+from api.models import Bill, BillItem, Customer, MenuItem  # noqa: E402
+from api.phone import normalize_phone  # noqa: E402
+
+HERE = Path(__file__).resolve().parent
+DEFAULT_OUTPUT = HERE / "results" / "latest.json"
+DEFAULT_BASELINE = HERE / "baseline.json"
+
+# Open streams held while timing the kitchen event fan-out.
+EVENT_STREAMS = 50
+
+
+class QueryCounter:
+    """Counts queries on every connection, including sync_to_async threads."""
+
+    def __init__(self):
+        self.count = 0
+        connection.execute_wrappers.append(self)
+        connection_created.connect(self.attach)
+
+    def attach(self, sender, connection, **kwargs):
+        connection.execute_wrappers.append(self)
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+queries = QueryCounter()
+
+
+def summarize(samples, query_counts):
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {
+        "calls": len(samples),
+        "p50_ms": round(cuts[49], 3),
+        "p95_ms": round(cuts[94], 3),
+        "p99_ms": round(cuts[98], 3),
+        "mean_ms": round(statistics.mean(samples), 3),
+        "throughput_rps": round(len(samples) / (sum(samples) / 1000), 1),
+        "queries": max(query_counts),
+    }
+
+
+# ---------- Fixtures ----------
+
+class Fixtures:
+    """Ids the cases need, plus a supply of fresh open bills for writes."""
+
+    def __init__(self):
+        item = MenuItem.objects.filter(is_available=True).select_related("subcategory").first()
+        self.item_id = item.pk
+        self.size_id = item.subcategory.item_sizes.first().pk
+        self.category_id = item.subcategory.category_id
+        self.subcategory_id = item.subcategory_id
+        customer = Customer.objects.order_by("pk").first()
+        self.customer_id = customer.pk
+        self.phone = customer.phone
+        self.bill_id = Bill.objects.order_by("-pk").values_list("pk", flat=True)[0]
+        self.bill_item_id = BillItem.objects.values_list("pk", flat=True)[0]
+        self.phones = (f"0311{n:07d}" for n in itertools.count())
+
+    def fresh_bill(self):
+        return Bill.objects.create(customer_id=self.customer_id, payment_method="cash").pk
+
+    def fresh_bill_item(self):
+        return BillItem.objects.create(
+            bill_id=self.fresh_bill(), item_id=self.item_id, size_id=self.size_id
+        ).pk
+
+    def fresh_cart(self):
+        """A new phone with one line in its cart, ready to check out."""
+        phone = next(self.phones)
+        carts.add(normalize_phone(phone), [(self.item_id, self.size_id, 2)])
+        return phone
+
+    def line(self, quantity=1):
+        return {"item_id": self.item_id, "size_id": self.size_id, "quantity": quantity}
+
+    def new_customer(self):
+        return {"first_name": "Bench", "last_name": "Mark", "phone": next(self.phones),
+                "address": "12 Main Boulevard, Lahore"}
+
+
+def api_cases(f):
+    """``(url name, method, kwargs, query/body)``; callables are re-evaluated per call."""
+    order = lambda: {"phone": next(f.phones), "first_name": "Bench", "last_name": "Mark",  # noqa: E731
+                     "address": "12 Main Boulevard, Lahore", "order_type": "delivery",
+                     "payment_method": "cash", "items": [f.line(2)]}
+    details = {"first_name": "Bench", "last_name": "Mark", "address": "12 Main Boulevard, Lahore",
+               "order_type": "delivery", "payment_method": "cash"}
+    return [
+        ("api-root", "get", {}, None),
+        ("category-list", "get", {}, None),
+        ("category-detail", "get", {"pk": f.category_id}, None),
+        ("item-list", "get", {}, None),
+        ("item-list", "get", {}, {"category": f.category_id, "compact": "1"}),
+        ("item-detail", "get", {"pk": f.item_id}, None),
+        ("size-list", "get", {}, {"subcategory": f.subcategory_id, "compact": "1"}),
+        ("size-detail", "get", {"pk": f.size_id}, None),
+        ("customer-list", "get", {}, None),
+        ("customer-list", "post", {}, f.new_customer),
+        ("customer-by-phone", "get", {}, {"phone": f.phone}),
+        ("customer-detail", "get", {"pk": f.customer_id}, None),
+        ("customer-detail", "patch", {"pk": f.customer_id}, {"address": "14 Main Boulevard, Lahore"}),
+        ("bill-list", "get", {}, None),
+        ("bill-list", "get", {}, {"today": "true", "open": "true", "compact": "1"}),
+        ("bill-list", "post", {}, {"customer": f.customer_id, "order_type": "takeaway",
+                                   "payment_method": "cash"}),
+        ("bill-detail", "get", {"pk": f.bill_id}, None),
+        ("bill-detail", "patch", {"pk": f.bill_id}, {"notes": "Extra napkins"}),
+        ("bill-add-items", "post", {"pk": f.bill_id}, {"items": [f.line()]}),
+        ("bill-cancel", "post", lambda: {"pk": f.fresh_bill()}, None),
+        ("billitem-list", "get", {}, None),
+        ("billitem-list", "post", {}, lambda: {"bill_id": f.fresh_bill(), **f.line()}),
+        ("billitem-detail", "get", {"pk": f.bill_item_id}, None),
+        ("billitem-detail", "delete", lambda: {"pk": f.fresh_bill_item()}, None),
+        ("menu", "get", {}, None),
+        ("menu-version", "get", {}, None),
+        ("menu-search", "get", {}, {"q": "large zinger"}),
+        ("place-order", "post", {}, order),
+        ("cart-detail", "get", {"phone": f.phone}, None),
+        ("cart-items", "post", {"phone": f.phone}, {"items": [f.line()]}),
+        ("cart-quantities", "post", {"phone": f.phone}, {"items": [f.line(3)]}),
+        ("cart-checkout", "post", lambda: {"phone": f.fresh_cart()}, details),
+    ]
+
+
+def mcp_cases(f):
+    """``(tool, arguments)``; callables are re-evaluated per call."""
+    return [
+        ("get_full_menu", {}),
+        ("get_categories", {}),
+        ("get_menu_items", {"category_id": f.category_id}),
+        ("get_sizes", {"subcategory_id": f.subcategory_id}),
+        ("search_menu", {"query": "large zinger"}),
+        ("get_customers", {}),
+        ("check_customer_by_phone", {"phone": f.phone}),
+        ("create_customer", f.new_customer),
+        ("get_bills", {}),
+        ("create_bill", {"customer_id": f.customer_id, "order_type": "delivery",
+                         "payment_method": "cash"}),
+        ("cancel_bill", lambda: {"bill_id": f.fresh_bill()}),
+        ("add_bill_item", lambda: {"bill_id": f.fresh_bill(), **f.line()}),
+        ("add_bill_items", {"bill_id": f.bill_id, "items": [f.line()]}),
+        ("place_order", lambda: {"phone": next(f.phones), "first_name": "Bench",
+                                 "last_name": "Mark", "address": "12 Main Boulevard, Lahore",
+                                 "payment_method": "cash", "items": [f.line(2)]}),
+        ("get_cart", {"phone": f.phone, "payment_method": "cash"}),
+        ("add_to_cart", {"phone": f.phone, "items": [f.line()]}),
+        ("set_cart_quantities", {"phone": f.phone, "items": [f.line(3)]}),
+        ("checkout_cart", lambda: {"phone": f.fresh_cart(), "first_name": "Bench",
+                                   "last_name": "Mark", "address": "12 Main Boulevard, Lahore",
+                                   "payment_method": "cash"}),
+    ]
+
+
+def resolve_value(value):
+    return value() if callable(value) else value
+
+
+def api_route_names(patterns=None):
+    """Names of every route in api/urls.py (the async overrides share their URLs)."""
+    names = set()
+    for pattern in get_resolver("api.urls").url_patterns if patterns is None else patterns:
+        if isinstance(pattern, URLPattern):
+            names.add(pattern.name)
+        else:
+            names |= api_route_names(pattern.url_patterns)
+    return names - {None}
+
+
+# ---------- Runners ----------
+
+def measure_call(call, args):
+    """Run ``call(args)`` once. Returns (ms, queries); fresh fixtures are made untimed."""
+    args = [resolve_value(a) for a in args]
+    before = queries.count
+    start = time.perf_counter()
+    call(*args)
+    elapsed = (time.perf_counter() - start) * 1000
+    return elapsed, queries.count - before
+
+
+def run_api(fixtures, warmup, iterations):
+    cases = api_cases(fixtures)
+    # The event stream never ends; run_events covers it.
+    missing = api_route_names() - {name for name, *_ in cases} - {"kitchen-events"}
+    if missing:
+        sys.exit(f"api routes without a benchmark case: {', '.join(sorted(missing))}")
+
+    client = Client(SERVER_NAME="localhost")
+    results = {}
+    for name, method, kwargs, data in cases:
+        def call(kwargs, data, method=method, name=name):
+            path = reverse(name, kwargs=kwargs)
+            if method == "get":
+                response = client.get(path, data)
+            else:
+                response = getattr(client, method)(path, data, content_type="application/json")
+            if response.status_code >= 400:
+                raise RuntimeError(f"{method.upper()} {path}: {response.status_code} {response.content[:200]!r}")
+
+        gc.collect()
+        samples, counts = [], []
+        for n in range(warmup + iterations):
+            ms, count = measure_call(call, (kwargs, data))
+            if n >= warmup:
+                samples.append(ms)
+                counts.append(count)
+        label = f"api {method.upper()} {name}" + (f" ?{','.join(data)}" if method == "get" and data else "")
+        results[label] = summarize(samples, counts)
+        report(label, results[label])
+    return results
+
+
+async def run_mcp(fixtures, warmup, iterations):
+    cases = mcp_cases(fixtures)
+    results = {}
+    async with MCPClient(main.mcp) as client:
+        tools = {tool.name for tool in await client.list_tools()}
+        missing = tools - {name for name, _ in cases}
+        if missing:
+            sys.exit(f"mcp tools without a benchmark case: {', '.join(sorted(missing))}")
+
+        for name, arguments in cases:
+            gc.collect()
+            samples, counts = [], []
+            for n in range(warmup + iterations):
+                arguments_now = await asyncio.to_thread(resolve_value, arguments)
+                before = queries.count
+                start = time.perf_counter()
+                await client.call_tool(name, arguments_now)
+                elapsed = (time.perf_counter() - start) * 1000
+                if n >= warmup:
+                    samples.append(elapsed)
+                    counts.append(queries.count - before)
+            label = f"mcp {name}"
+            results[label] = summarize(samples, counts)
+            report(label, results[label])
+    return results
+
+
+# AsyncClient always sends "Host: testserver".
+@override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"])
+async def run_events(warmup, iterations, streams=EVENT_STREAMS):
+    """Time one bill event from publish() to every open kitchen stream."""
+    client = AsyncClient()
+    bodies = []
+    for _ in range(streams):
+        response = await client.get(reverse("kitchen-events"))
+        bodies.append(response.streaming_content)
+        await anext(bodies[-1])  # the retry line
+    samples, counts = [], []
+    gc.collect()
+    for n in range(warmup + iterations):
+        before = queries.count
+        start = time.perf_counter()
+        bill_events.publish("bill.status", {"id": n, "status": "preparing", "previous": "confirmed"})
+        await asyncio.gather(*(anext(body) for body in bodies))
+        elapsed = (time.perf_counter() - start) * 1000
+        if n >= warmup:
+            samples.append(elapsed)
+            counts.append(queries.count - before)
+    for body in bodies:
+        await body.aclose()
+    label = f"api GET kitchen-events x{streams}"
+    results = {label: summarize(samples, counts)}
+    report(label, results[label])
+    return results
+
+
+# ---------- Reporting ----------
+
+def report(label, r, base=None, flags=""):
+    line = (f"{label:<44} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} "
+            f"{r['throughput_rps']:>8.1f} {r['queries']:>4}")
+    if base:
+        line += f"  {r['p50_ms'] / base['p50_ms'] - 1:>+6.0%} {r['queries'] - base['queries']:>+4} {flags}"
+    print(line)
+
+
+def header():
+    print(f"{'case':<44} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>8} {'qry':>4}")
+
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    """Print every case against the baseline; return the labels that regressed.
+
+    Latencies are judged relative to the run as a whole: if every case is 40%
+    slower the machine is busier, not the code. That drift is printed so a
+    change that slows every request still shows up.
+    """
+    shared = [label for label in results if label in baseline["results"]]
+    drift = statistics.median(
+        results[label]["p50_ms"] / baseline["results"][label]["p50_ms"] for label in shared
+    ) if shared else 1.0
+    print(f"\nagainst baseline ({baseline['meta'].get('commit', '?')}, "
+          f"{baseline['meta'].get('created', '?')}); p50 tolerance {tolerance:.0%}")
+    print(f"whole run is {drift - 1:+.0%} vs baseline (machine load, or a change hitting every request)")
+    header()
+    regressed = []
+    for label, r in results.items():
+        base = baseline["results"].get(label)
+        if base is None:
+            report(label, r)
+            continue
+        flags = []
+        if r["queries"] > base["queries"]:
+            flags.append("MORE QUERIES")
+        expected = base["p50_ms"] * drift
+        slower = r["p50_ms"] - expected
+        if slower > expected * tolerance and slower >= min_delta_ms:
+            flags.append("SLOWER")
+        if flags:
+            regressed.append(label)
+        report(label, r, base, " ".join(flags))
+    for label in baseline["results"].keys() - results.keys():
+        print(f"{label:<44} (in baseline only)")
+    return regressed
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    call_command(
+        "generate_load_data", categories=args.categories, subcategories=4, items=args.items,
+        customers=args.customers, bills=args.bills, seed=args.seed, verbosity=0,
+    )
+    fixtures = Fixtures()
+    header()
+    results = run_api(fixtures, args.warmup, args.iterations)
+    results.update(asyncio.run(run_events(args.warmup, args.iterations)))
+    results.update(asyncio.run(run_mcp(fixtures, args.warmup, args.iterations)))
+
+    output = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "database": settings.DATABASES["default"]["ENGINE"].rsplit(".", 1)[-1],
+            "async_views": settings.ASYNC_VIEWS,
+            "iterations": args.iterations,
+            "data": {"categories": args.categories, "items": args.items,
+                     "customers": args.customers, "bills": args.bills, "seed": args.seed},
+        },
+        "results": results,
+    }
+    path = args.baseline if args.save_baseline else args.output
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(output, indent=2) + "\n")
+    print(f"\nwrote {path}")
+
+    if args.save_baseline or not args.baseline.exists():
+        return 0
+    baseline = json.loads(args.baseline.read_text())
+    if baseline["meta"].get("data") != output["meta"]["data"]:
+        print("baseline was taken with different data sizes; latencies are not comparable")
+    regressed = compare(results, baseline, args.tolerance, args.min_delta_ms)
+    if regressed:
+        print(f"\n{len(regressed)} regression(s): {', '.join(regressed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--categories", type=int, default=8)
+    parser.add_argument("--items", type=int, default=400)
+    parser.add_argument("--customers", type=int, default=2000)
+    parser.add_argument("--bills", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="write this run as the new baseline instead of comparing")
+    parser.add_argument("--tolerance", type=float, default=0.75,
+                        help="allowed p50 slowdown (fraction) before a case counts as a regression")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0,
+                        help="ignore p50 slowdowns smaller than this")
+    sys.exit(run(parser.parse_args()))
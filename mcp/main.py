@@ -1,53 +1,258 @@
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from urllib.parse import parse_qs, quote, urlparse
+
 from fastmcp import FastMCP
+from fastmcp.exceptions import ResourceError
+from fastmcp.server.dependencies import get_context
 import httpx
+from pydantic import BaseModel
+from starlette.responses import PlainTextResponse
+
+import tracing
+from menu_resources import (
+    CATEGORIES_URI, FULL_MENU_URI, SUBCATEGORY_URI, MenuSnapshot,
+)
+from tool_cache import TTLCache
+
+API_BASE = os.environ.get("RESTAURANT_API_BASE", "http://localhost:8000/api")
+
+# "http" talks to the Django API over API_BASE; "orm" boots Django in this
+# process and serves the same routes from the models (single-box deployments).
+MCP_BACKEND = os.environ.get("MCP_BACKEND", "http")
+
+if MCP_BACKEND == "orm":
+    import orm_backend
+
+# HTTP client tuning. One pooled client is shared by every tool call so a
+# conversation reuses keep-alive connections instead of reconnecting per call.
+HTTP_TIMEOUT = float(os.environ.get("MCP_HTTP_TIMEOUT", "10"))
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("MCP_HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_MAX_CONNECTIONS = int(os.environ.get("MCP_HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE = int(os.environ.get("MCP_HTTP_MAX_KEEPALIVE", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.environ.get("MCP_HTTP_KEEPALIVE_EXPIRY", "30"))
+
+# Menu read tools are cached in-process. Entries expire after MCP_CACHE_TTL
+# seconds and are dropped as soon as the API reports a new menu version,
+# which is checked at most once every MCP_MENU_VERSION_CHECK_INTERVAL seconds.
+MENU_CACHE_TTL = float(os.environ.get("MCP_CACHE_TTL", "300"))
+MENU_CACHE_MAXSIZE = int(os.environ.get("MCP_CACHE_MAXSIZE", "256"))
+MENU_VERSION_CHECK_INTERVAL = float(os.environ.get("MCP_MENU_VERSION_CHECK_INTERVAL", "5"))
+
+# Ask the API for compact responses (flat parent ids instead of nested
+# category/subcategory/customer objects) to keep tool results, and so the
+# model's context, small. MCP_COMPACT_RESPONSES=0 restores the full shape.
+COMPACT_RESPONSES = os.environ.get("MCP_COMPACT_RESPONSES", "1") == "1"
+RESPONSE_PARAMS = {"compact": "1"} if COMPACT_RESPONSES else {}
+
+menu_cache = TTLCache(maxsize=MENU_CACHE_MAXSIZE, ttl=MENU_CACHE_TTL)
+menu_snapshot = MenuSnapshot()
+_menu_version_checked_at = 0.0
+_menu_watch_task: asyncio.Task | None = None
+
+_client: httpx.AsyncClient | None = None
+_client_users = 0
+
+
+def build_client() -> httpx.AsyncClient:
+    """Create the pooled client used to talk to the Django API."""
+    return httpx.AsyncClient(
+        base_url=API_BASE,
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+    )
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the shared client, creating it lazily if the lifespan hasn't run."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = build_client()
+    return _client
+
+
+@asynccontextmanager
+async def lifespan(server):
+    # Some transports enter the lifespan once per session, so keep a user
+    # count and only close the client when the last one leaves.
+    global _client, _client_users, _menu_watch_task
+    _client_users += 1
+    get_client()
+    if _menu_watch_task is None:
+        _menu_watch_task = asyncio.create_task(watch_menu_version())
+    try:
+        yield
+    finally:
+        _client_users -= 1
+        if _client_users == 0:
+            _menu_watch_task.cancel()
+            _menu_watch_task = None
+            if _client is not None:
+                await _client.aclose()
+                _client = None
+
+
+async def api_get(path: str, params: dict = None):
+    with tracing.upstream() as request:
+        if MCP_BACKEND == "orm":
+            return await orm_backend.get(path, params)
+        resp = await get_client().get(path, params=params, headers=tracing.trace_headers())
+        request.status = resp.status_code
+    resp.raise_for_status()
+    return resp.json()
+
+
+async def refresh_menu_version():
+    """Clear the menu cache and snapshot if the API reports a new menu version.
+
+    Sessions reading the menu resources are notified of the change.
+    """
+    global _menu_version_checked_at
+    now = time.monotonic()
+    if now - _menu_version_checked_at < MENU_VERSION_CHECK_INTERVAL:
+        return
+    _menu_version_checked_at = now
+    try:
+        version = (await api_get("/menu/version/"))["version"]
+    except Exception:
+        # Can't tell (an HTTP error, or a database one with MCP_BACKEND=orm);
+        # keep serving until entries hit their TTL.
+        return
+    if version != menu_cache.version:
+        changed = menu_cache.version is not None
+        menu_cache.clear()
+        menu_cache.version = version
+        menu_snapshot.clear()
+        if changed:
+            await menu_snapshot.notify_changed(current_context())
+
+
+def current_context():
+    """The fastmcp Context of the request being served, or None (background poll)."""
+    try:
+        return get_context()
+    except RuntimeError:
+        return None
+
+
+async def watch_menu_version():
+    """Poll the menu version while sessions hold menu resources, so they hear
+    about a change even when no tool call happens to check."""
+    while True:
+        await asyncio.sleep(MENU_VERSION_CHECK_INTERVAL)
+        if menu_snapshot.watchers:
+            try:
+                await refresh_menu_version()
+            except Exception:
+                # Keep polling; the next tool call or read will surface the error.
+                pass
+
+
+async def cached_menu_get(tool: str, path: str, params: dict = None):
+    """api_get for menu reads, served from menu_cache when fresh."""
+    await refresh_menu_version()
+    key = TTLCache.make_key(tool, params)
+    hit, value = menu_cache.get(key)
+    if hit:
+        return value
+    version = menu_cache.version
+    value = await api_get(path, params=params)
+    # Not if the version moved during the fetch: the value may be the old menu.
+    if menu_cache.version == version:
+        menu_cache.set(key, value)
+    return value
+
+
+async def api_post(path: str, json: dict = None, params: dict = None, idempotency_key: str = ""):
+    """POST to the API, under the caller's Idempotency-Key if it gave one.
+
+    Write tools take the key from the agent, which picks a new one per
+    action and repeats it only to retry that call. Two identical calls are
+    two actions unless they carry the same key.
+    """
+    key = idempotency_key or None
+    with tracing.upstream() as request:
+        if MCP_BACKEND == "orm":
+            return await orm_backend.post(path, json, params, key)
+        headers = tracing.trace_headers()
+        if key:
+            headers["Idempotency-Key"] = key
+        resp = await get_client().post(path, json=json, params=params, headers=headers)
+        request.status = resp.status_code
+    resp.raise_for_status()
+    return resp.json()
 
-API_BASE = "http://localhost:8000/api"
 
 # Initialize MCP
 mcp = FastMCP(
     name="RestaurantMCPServer",
     instructions="""
     This server provides tools for managing a restaurant's operations including menu management, customer management, and billing.
+    Items, sizes and bills refer to their category, subcategory and customer by id (category_id, subcategory_id, customer_id).
 
     MENU OPERATIONS:
     - Use get_categories() when the user asks "what do you serve" or wants to know about the types of food and drinks available (like Starters, Burgers, Pizza, Beverages).
     - Use get_menu_items() to show the dishes or drinks in a particular group, including their names, descriptions, and whether they’re available.
     - Use get_sizes() to provide portion and price options for a specific dish or drink (for example, regular or large).
+    - Use search_menu(query) to turn what the customer asked for ("large zinger", "2 fajita pizza") into item_id/size_id/price in one call.
     - Use get_full_menu() ONLY if the user asks to see everything on the menu, with all groups, dishes, and prices together.
+    - The menu is also published as resources (menu://full, menu://categories, menu://subcategories/{id}). Clients can
+    read them once per session and re-read only after a resources list_changed notification.
     
     CUSTOMER MANAGEMENT:
     - Use get_customers() to list all registered customers
     - Use create_customer(first_name, last_name, phone, address) to register new customers
 
+    PLACING AN ORDER (preferred):
+    - Once the customer confirms their order, call place_order(phone, items, order_type, payment_method, ...)
+    - It finds or creates the customer, creates the bill and adds every item in one step
+    - order_type options: "dine_in", "takeaway", "delivery"
+    - payment_method options: "cash", "card", "digital_wallet", "bank_transfer", "pending"
+
+    DRAFT CART (while the customer is still choosing):
+    - Use add_to_cart(phone, items) as the customer names dishes; it returns the cart priced with tax and total
+    - Use set_cart_quantities(phone, items) to change quantities; a quantity of 0 removes the line
+    - Use get_cart(phone) to read the order back to the customer
+    - Once they confirm, call checkout_cart(phone, order_type, payment_method, ...) to place it like place_order
+    - Nothing is billed until checkout; a cart left alone for a couple of hours is dropped
+
     BILLING WORKFLOW:
     1. First, create a bill using create_bill(customer_id, order_type, payment_method)
     - order_type options: typically "dine-in", "takeout", "delivery"
     - payment_method options: typically "cash", "card", "digital"
-    2. Add items to the bill using add_bill_item(bill_id, item_id, size_id, quantity)
+    2. Add items to the bill using add_bill_items(bill_id, items) with one {item_id, size_id, quantity} entry per line,
+    or add_bill_item(bill_id, item_id, size_id, quantity) for a single item
     - quantity defaults to 1 if not specified
     - You must specify both item_id and size_id for each item
-    3. Use get_bills() to view all bills and their current status
+    3. Use get_bills() to view bills and their current status (today's open bills by default; filter by phone, status or dates)
     4. Use cancel_bill(bill_id) if a bill needs to be cancelled
-    """
+
+    RETRYING WRITES:
+    - create_bill, add_bill_item, add_bill_items, place_order and the cart writes take an optional idempotency_key
+    - Use a new random key for every action, and send the same key again only when retrying that call after a timeout
+    or error; it is then applied once. Calls with different (or no) keys are applied every time.
+    """,
+    lifespan=lifespan,
 )
+mcp.add_middleware(tracing.ToolTracingMiddleware())
 
 # ----------- Menu Tools -----------
 
 @mcp.tool
 async def get_full_menu():
     """Get the complete menu structure with categories, subcategories, items, and sizes"""
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(f"{API_BASE}/menu/")
-        resp.raise_for_status()
-        return resp.json()
+    return await cached_menu_get("get_full_menu", "/menu/")
 
 @mcp.tool
 async def get_categories():
     """Get all types of food and drinks offered"""
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(f"{API_BASE}/categories/")
-        resp.raise_for_status()
-        return resp.json()
+    return await cached_menu_get("get_categories", "/categories/")
 
 @mcp.tool
 async def get_menu_items(category_id: int = 0 , subcategory_id: int = 0):
@@ -55,7 +260,7 @@ async def get_menu_items(category_id: int = 0 , subcategory_id: int = 0):
     Get all menu items, optionally filter by category id or subcategory id.
     Shows name, description, availability
     """
-    params = {}
+    params = dict(RESPONSE_PARAMS)
     # tolerate None, empty strings, and 0 from callers
     if category_id != 0:
         try:
@@ -67,10 +272,7 @@ async def get_menu_items(category_id: int = 0 , subcategory_id: int = 0):
             params['subcategory'] = int(subcategory_id)
         except Exception:
             params['subcategory'] = subcategory_id
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(f"{API_BASE}/items/", params=params)
-        resp.raise_for_status()
-        return resp.json()
+    return await cached_menu_get("get_menu_items", "/items/", params)
 
 @mcp.tool
 async def get_sizes(category_id: int = 0, subcategory_id: int = 0):
@@ -78,7 +280,7 @@ async def get_sizes(category_id: int = 0, subcategory_id: int = 0):
     Get all sizes, optionally filter by category id or subcategory id.
     Shows type, group, size names, and prices.
     """
-    params = {}
+    params = dict(RESPONSE_PARAMS)
     if category_id != 0:
         try:
             params['subcategory__category'] = int(category_id)
@@ -89,85 +291,281 @@ async def get_sizes(category_id: int = 0, subcategory_id: int = 0):
             params['subcategory'] = int(subcategory_id)
         except Exception:
             params['subcategory'] = subcategory_id
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(f"{API_BASE}/sizes/", params=params)
-        resp.raise_for_status()
-        return resp.json()
+    return await cached_menu_get("get_sizes", "/sizes/", params)
+
+@mcp.tool
+async def search_menu(query: str, limit: int = 5):
+    """
+    Find menu items matching free text like "large zinger burger" or "3 cokes".
+    Returns ranked candidates with item_id, size_id, price and names, ready
+    for add_bill_items / place_order. Tolerates typos and partial words.
+    """
+    params = {"q": " ".join(query.split()).lower(), "limit": limit}
+    return await cached_menu_get("search_menu", "/menu/search/", params)
+
+# ----------- Menu Resources -----------
+
+async def read_menu_resource(uri: str) -> str:
+    """Serve a menu resource from the snapshot, fetching /menu/ once per version."""
+    await refresh_menu_version()
+    menu_snapshot.watch(get_context())
+    if menu_snapshot:
+        text = menu_snapshot.get(uri)
+    else:
+        version = menu_cache.version
+        menu = await api_get("/menu/")
+        # A version change during the fetch cleared the snapshot under it, and
+        # the payload may be the old menu: answer with it, but don't keep it.
+        text = menu_snapshot.build(menu, keep=menu_cache.version == version).get(uri)
+    if text is None:
+        raise ResourceError(f"No menu resource {uri}")
+    return text
+
+@mcp.resource(FULL_MENU_URI, mime_type="application/json")
+async def full_menu_resource() -> str:
+    """The whole menu: categories, subcategories, items and their sizes"""
+    return await read_menu_resource(FULL_MENU_URI)
+
+@mcp.resource(CATEGORIES_URI, mime_type="application/json")
+async def categories_resource() -> str:
+    """Categories with their subcategories and each subcategory's resource URI"""
+    return await read_menu_resource(CATEGORIES_URI)
+
+@mcp.resource(SUBCATEGORY_URI, mime_type="application/json")
+async def subcategory_resource(subcategory_id: int) -> str:
+    """One subcategory's items and the sizes (with prices) they come in"""
+    return await read_menu_resource(SUBCATEGORY_URI.format(subcategory_id=subcategory_id))
+
+@mcp.resource("stats://menu-cache", mime_type="application/json")
+def menu_cache_stats() -> dict:
+    """Hit/miss counters for the in-process menu cache"""
+    return menu_cache.stats()
+
+@mcp.resource("stats://tool-calls", mime_type="application/json")
+def tool_call_stats() -> dict:
+    """Per-tool call counts, errors, latency, upstream API time and result size"""
+    return tracing.stats()
+
+@mcp.custom_route("/metrics", methods=["GET"])
+async def metrics(request):
+    """Tool-call histograms in Prometheus text format."""
+    return PlainTextResponse(tracing.render(), media_type=tracing.CONTENT_TYPE)
 
 # ----------- Customer Tools (unchanged) -----------
 
 @mcp.tool
 async def get_customers():
     """List all customers"""
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(f"{API_BASE}/customers/")
-        resp.raise_for_status()
-        return resp.json()
+    return await api_get("/customers/")
 
 
 @mcp.tool
 async def check_customer_by_phone(phone: str):
     """Check if a customer exists by phone. Returns {'exists': bool, 'customer': {...}} when found."""
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(f"{API_BASE}/customers/by-phone/", params={'phone': phone})
-        resp.raise_for_status()
-        return resp.json()
+    return await api_get("/customers/by-phone/", params={'phone': phone})
 
 @mcp.tool
 async def create_customer(first_name: str, last_name: str, phone: str, address: str):
     """Create a new customer"""
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(f"{API_BASE}/customers/", json={
-            "first_name": first_name,
-            "last_name": last_name,
-            "phone": phone,
-            "address": address
-        })
-        resp.raise_for_status()
-        return resp.json()
+    return await api_post("/customers/", json={
+        "first_name": first_name,
+        "last_name": last_name,
+        "phone": phone,
+        "address": address
+    })
 
 # ----------- Bill Tools (unchanged) -----------
 
+def _cursor(url):
+    """Pull the cursor token out of a paginated next/previous link."""
+    if not url:
+        return None
+    return parse_qs(urlparse(url).query).get("cursor", [None])[0]
+
 @mcp.tool
-async def get_bills():
-    """Get all bills"""
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(f"{API_BASE}/bills/")
-        resp.raise_for_status()
-        return resp.json()
+async def get_bills(
+    status: str = "",
+    order_type: str = "",
+    is_paid: bool | None = None,
+    phone: str = "",
+    customer_id: int = 0,
+    date_from: str = "",
+    date_to: str = "",
+    open_only: bool = True,
+    today_only: bool = True,
+    cursor: str = "",
+    page_size: int = 20,
+):
+    """
+    List bills, newest first. By default only today's open bills
+    (not delivered or cancelled) are returned.
+    - status: one or more statuses, comma separated (overrides open_only)
+    - date_from / date_to: YYYY-MM-DD, inclusive (override today_only)
+    - cursor: pass next_cursor from a previous call to get the next page
+    """
+    params = {"page_size": page_size, **RESPONSE_PARAMS}
+    if status:
+        params["status"] = status
+    elif open_only:
+        params["open"] = "true"
+    if date_from or date_to:
+        if date_from:
+            params["date_from"] = date_from
+        if date_to:
+            params["date_to"] = date_to
+    elif today_only:
+        params["today"] = "true"
+    if order_type:
+        params["order_type"] = order_type
+    if is_paid is not None:
+        params["is_paid"] = "true" if is_paid else "false"
+    if phone:
+        params["phone"] = phone
+    if customer_id:
+        params["customer"] = customer_id
+    if cursor:
+        params["cursor"] = cursor
+    page = await api_get("/bills/", params=params)
+    return {
+        "results": page["results"],
+        "next_cursor": _cursor(page.get("next")),
+        "previous_cursor": _cursor(page.get("previous")),
+    }
 
 @mcp.tool
-async def create_bill(customer_id: int, order_type: str, payment_method: str):
+async def create_bill(customer_id: int, order_type: str, payment_method: str, idempotency_key: str = ""):
     """Create a new bill"""
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(f"{API_BASE}/bills/", json={
-            "customer": customer_id,
-            "order_type": order_type,
-            "payment_method": payment_method
-        })
-        resp.raise_for_status()
-        return resp.json()
+    return await api_post("/bills/", json={
+        "customer": customer_id,
+        "order_type": order_type,
+        "payment_method": payment_method
+    }, params=RESPONSE_PARAMS, idempotency_key=idempotency_key)
 
 @mcp.tool
 async def cancel_bill(bill_id: int):
     """Cancel an existing bill"""
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(f"{API_BASE}/bills/{bill_id}/cancel/")
-        resp.raise_for_status()
-        return resp.json()
+    return await api_post(f"/bills/{bill_id}/cancel/")
 
 @mcp.tool
-async def add_bill_item(bill_id: int, item_id: int, size_id: int, quantity: int = 1):
+async def add_bill_item(bill_id: int, item_id: int, size_id: int, quantity: int = 1,
+                        idempotency_key: str = ""):
     """Add item to bill"""
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(f"{API_BASE}/bill-items/", json={
-            "bill": bill_id,
-            "item": item_id,
-            "size": size_id,
-            "quantity": quantity
-        })
-        resp.raise_for_status()
-        return resp.json()
+    return await api_post("/bill-items/", json={
+        "bill_id": bill_id,
+        "item_id": item_id,
+        "size_id": size_id,
+        "quantity": quantity
+    }, idempotency_key=idempotency_key)
+
+class OrderLine(BaseModel):
+    item_id: int
+    size_id: int
+    quantity: int = 1
+
+@mcp.tool
+async def add_bill_items(bill_id: int, items: list[OrderLine], idempotency_key: str = ""):
+    """
+    Add several items to a bill in one call and return the updated bill.
+    Prefer this over repeated add_bill_item calls when the customer orders
+    more than one thing. Adding an item/size already on the bill increases
+    its quantity.
+    """
+    return await api_post(f"/bills/{bill_id}/items/", json={
+        "items": [line.model_dump() for line in items]
+    }, params=RESPONSE_PARAMS, idempotency_key=idempotency_key)
+
+# ----------- Order Tools -----------
+
+@mcp.tool
+async def place_order(
+    phone: str,
+    items: list[OrderLine],
+    order_type: str = "delivery",
+    payment_method: str = "pending",
+    first_name: str = "",
+    last_name: str = "",
+    address: str = "",
+    notes: str = "",
+    idempotency_key: str = "",
+):
+    """
+    Place a whole order in one call once the customer has confirmed it.
+    Looks the customer up by phone (creating them if new, which needs
+    first_name, last_name and address; updating any details given if they
+    exist), creates the bill and adds every item line. Returns the bill
+    with its items and totals.
+    """
+    payload = {
+        "phone": phone,
+        "order_type": order_type,
+        "payment_method": payment_method,
+        "items": [line.model_dump() for line in items],
+    }
+    for field, value in (("first_name", first_name), ("last_name", last_name),
+                         ("address", address), ("notes", notes)):
+        if value:
+            payload[field] = value
+    return await api_post("/orders/", json=payload, params=RESPONSE_PARAMS, idempotency_key=idempotency_key)
+
+# ----------- Cart Tools -----------
+
+def cart_path(phone: str, action: str = "") -> str:
+    return f"/carts/{quote(phone, safe='+')}/{action}"
+
+@mcp.tool
+async def get_cart(phone: str, payment_method: str = ""):
+    """
+    Show the customer's draft cart: every line with its price, plus subtotal,
+    tax and total (tax depends on payment_method, if known).
+    """
+    params = {"payment_method": payment_method} if payment_method else None
+    return await api_get(cart_path(phone), params=params)
+
+@mcp.tool
+async def add_to_cart(phone: str, items: list[OrderLine], idempotency_key: str = ""):
+    """
+    Add item lines to the customer's draft cart and return the priced cart.
+    Adding an item/size already in the cart increases its quantity. Nothing
+    is billed until checkout_cart.
+    """
+    return await api_post(cart_path(phone, "items/"), json={
+        "items": [line.model_dump() for line in items]
+    }, idempotency_key=idempotency_key)
+
+@mcp.tool
+async def set_cart_quantities(phone: str, items: list[OrderLine], idempotency_key: str = ""):
+    """
+    Set the quantity of lines in the customer's draft cart; a quantity of 0
+    removes the line. Returns the priced cart.
+    """
+    return await api_post(cart_path(phone, "quantities/"), json={
+        "items": [line.model_dump() for line in items]
+    }, idempotency_key=idempotency_key)
+
+@mcp.tool
+async def checkout_cart(
+    phone: str,
+    order_type: str = "delivery",
+    payment_method: str = "pending",
+    first_name: str = "",
+    last_name: str = "",
+    address: str = "",
+    notes: str = "",
+    idempotency_key: str = "",
+):
+    """
+    Place the customer's draft cart as an order once they confirm it, in one
+    step like place_order (a new customer needs first_name, last_name and
+    address). The cart is emptied only if the order is placed. Returns the
+    bill with its items and totals.
+    """
+    payload = {"order_type": order_type, "payment_method": payment_method}
+    for field, value in (("first_name", first_name), ("last_name", last_name),
+                         ("address", address), ("notes", notes)):
+        if value:
+            payload[field] = value
+    return await api_post(cart_path(phone, "checkout/"), json=payload,
+                          params=RESPONSE_PARAMS, idempotency_key=idempotency_key)
 
 if __name__ == "__main__":
     #mcp.run()
@@ -0,0 +1,102 @@
+"""The menu as MCP resources, rendered from one snapshot per menu version.
+
+    menu://full                          the /menu/ payload
+    menu://categories                    categories with their subcategories' ids and URIs
+    menu://subcategories/{id}            one subcategory's items, and its sizes once
+
+All of them are cut from a single /menu/ fetch and kept as JSON text until
+the menu version moves, so a read costs nothing upstream.
+
+When the version moves, clients that read them get a
+``notifications/resources/list_changed`` telling them to re-read:
+
+- Session-based connections (the handshake protocol: stdio, streamable HTTP
+  with a session id) are remembered on read and notified out of band.
+- On the sessionless 2026-07-28 protocol there is no standing channel (and
+  fastmcp does not serve ``subscriptions/listen`` yet), so such a client is
+  told in band, on the request that noticed the change.
+"""
+import json
+from collections import OrderedDict
+
+from mcp_types import ResourceListChangedNotification
+from mcp_types.version import MODERN_PROTOCOL_VERSIONS
+
+FULL_MENU_URI = "menu://full"
+CATEGORIES_URI = "menu://categories"
+SUBCATEGORY_URI = "menu://subcategories/{subcategory_id}"
+
+MAX_WATCHERS = 1024
+
+
+def _dump(data):
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+
+class MenuSnapshot:
+    def __init__(self):
+        self._texts = {}
+        # session id -> the latest ServerSession seen for it (a per-request
+        # proxy that can still reach the connection's standalone channel).
+        self.watchers = OrderedDict()
+
+    def __bool__(self):
+        return bool(self._texts)
+
+    def build(self, menu, keep=True):
+        """Render every menu resource from the nested /menu/ payload.
+
+        Returns the texts; they replace the snapshot's only if ``keep``.
+        """
+        texts = {FULL_MENU_URI: _dump(menu)}
+        categories = []
+        for category in menu:
+            subcategories = []
+            for sub in category["subcategories"]:
+                uri = SUBCATEGORY_URI.format(subcategory_id=sub["id"])
+                subcategories.append({"id": sub["id"], "name": sub["name"], "uri": uri})
+                # Every item of a subcategory shares its sizes; list them once.
+                sizes = sub["items"][0]["sizes"] if sub["items"] else []
+                texts[uri] = _dump({
+                    "id": sub["id"],
+                    "name": sub["name"],
+                    "category_id": category["id"],
+                    "sizes": sizes,
+                    "items": [
+                        {key: item[key] for key in ("id", "name", "description", "is_available")}
+                        for item in sub["items"]
+                    ],
+                })
+            categories.append({"id": category["id"], "name": category["name"],
+                               "subcategories": subcategories})
+        texts[CATEGORIES_URI] = _dump(categories)
+        if keep:
+            self._texts = texts
+        return texts
+
+    def get(self, uri):
+        return self._texts.get(uri)
+
+    def clear(self):
+        self._texts = {}
+
+    def watch(self, ctx):
+        """Remember the reading session so it hears about the next change."""
+        session = ctx.session
+        if session.protocol_version in MODERN_PROTOCOL_VERSIONS:
+            return
+        self.watchers[ctx.session_id] = session
+        self.watchers.move_to_end(ctx.session_id)
+        while len(self.watchers) > MAX_WATCHERS:
+            self.watchers.popitem(last=False)
+
+    async def notify_changed(self, ctx=None):
+        """Send list_changed to every watcher, and in band to ``ctx``'s client."""
+        for session_id, session in list(self.watchers.items()):
+            try:
+                await session.send_resource_list_changed()
+            except Exception:
+                # Closed or broken session: stop notifying it.
+                self.watchers.pop(session_id, None)
+        if ctx is not None and ctx.session.protocol_version in MODERN_PROTOCOL_VERSIONS:
+            await ctx.send_notification(ResourceListChangedNotification())
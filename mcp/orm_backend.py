@@ -0,0 +1,276 @@
+"""In-process backend that answers MCP tool calls straight from the Django ORM.
+
+Enabled with ``MCP_BACKEND=orm``. Django is booted inside the MCP process and
+every route below mirrors the matching endpoint in ``api/urls.py``, so tools
+get exactly the payloads the REST API would return without the HTTP hop.
+"""
+import os
+import re
+import sys
+from decimal import Decimal
+from pathlib import Path
+from urllib.parse import unquote
+
+import django
+from asgiref.sync import sync_to_async
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    # Appended so the installed `mcp` package still wins over the mcp/ folder.
+    sys.path.append(str(BASE_DIR))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "restaurant.settings")
+django.setup()
+
+from django.http import Http404  # noqa: E402
+from django.shortcuts import get_object_or_404  # noqa: E402
+from rest_framework.exceptions import ValidationError  # noqa: E402
+from rest_framework.request import Request  # noqa: E402
+from rest_framework.test import APIRequestFactory  # noqa: E402
+
+from api import idempotency  # noqa: E402
+from api.carts import carts  # noqa: E402
+from api.filters import BillFilter  # noqa: E402
+from api.menu import get_menu_snapshot, get_menu_version  # noqa: E402
+from api.phone import normalize_phone  # noqa: E402
+from api.models import Bill, Customer  # noqa: E402
+from api.renderers import dumps, loads  # noqa: E402
+from api.search import menu_index  # noqa: E402
+from api.serializers import (  # noqa: E402
+    BillItemBulkSerializer,
+    BillItemSerializer,
+    BillSerializer,
+    CartLinesSerializer,
+    CartQuantitiesSerializer,
+    CustomerSerializer,
+    MenuCategorySerializer,
+    MenuItemSerializer,
+    MenuItemSizeSerializer,
+    PlaceOrderSerializer,
+    field_options,
+)
+from api.views import (  # noqa: E402
+    BillViewSet,
+    MenuCategoryViewSet,
+    MenuItemSizeViewSet,
+    MenuItemViewSet,
+    filter_by_menu_params,
+)
+
+
+def _plain(data):
+    """Convert serializer output to what the JSON API would have sent."""
+    if isinstance(data, dict):
+        return {k: _plain(v) for k, v in data.items()}
+    if isinstance(data, list):
+        return [_plain(v) for v in data]
+    if isinstance(data, Decimal):
+        return str(data)
+    return data
+
+
+def _context(params):
+    # What a request with these query params would give the serializers.
+    return {"field_options": field_options(params or {})}
+
+
+_request_factory = APIRequestFactory()
+
+
+def _paginate(viewset_class, qs, path, params):
+    """Page ``qs`` with the viewset's paginator, returning the API envelope."""
+    # The paginator builds next/previous links from the request, so give it
+    # one that looks like the equivalent API call.
+    request = Request(_request_factory.get(path, params, SERVER_NAME="localhost"))
+    paginator = viewset_class.pagination_class()
+    page = paginator.paginate_queryset(qs, request)
+    data = viewset_class.serializer_class(page, many=True, context=_context(params)).data
+    return paginator.get_paginated_response(data).data
+
+
+def _create(serializer_class, payload, params):
+    serializer = serializer_class(data=payload or {}, context=_context(params))
+    serializer.is_valid(raise_exception=True)
+    serializer.save()
+    return serializer.data
+
+
+# ----------- Handlers (sync, run via sync_to_async) -----------
+
+def full_menu(params):
+    return loads(get_menu_snapshot()[1])
+
+
+def menu_version(params):
+    return {"version": get_menu_version()}
+
+
+def menu_search(params):
+    query = str(params.get("q", "")).strip()
+    if not query:
+        raise ValueError("q query parameter is required")
+    limit = min(max(int(params.get("limit", 10)), 1), 50)
+    available_only = str(params.get("available_only", "true")).lower() != "false"
+    return menu_index.search(query, limit=limit, available_only=available_only)
+
+
+def list_categories(params):
+    return MenuCategorySerializer(
+        MenuCategoryViewSet.queryset.all(), many=True, context=_context(params)
+    ).data
+
+
+def list_items(params):
+    qs = filter_by_menu_params(MenuItemViewSet.queryset.all(), params)
+    return MenuItemSerializer(qs, many=True, context=_context(params)).data
+
+
+def list_sizes(params):
+    qs = filter_by_menu_params(MenuItemSizeViewSet.queryset.all(), params)
+    return MenuItemSizeSerializer(qs, many=True, context=_context(params)).data
+
+
+def list_customers(params):
+    return CustomerSerializer(Customer.objects.all(), many=True, context=_context(params)).data
+
+
+def customer_by_phone(params):
+    phone = params.get('phone')
+    if not phone:
+        raise ValueError('phone query parameter is required')
+    customer = Customer.objects.by_phone(phone)
+    if customer is None:
+        return {'exists': False}
+    return {'exists': True, 'customer': CustomerSerializer(customer, context=_context(params)).data}
+
+
+def create_customer(payload, params):
+    return _create(CustomerSerializer, payload, params)
+
+
+def list_bills(params):
+    filterset = BillFilter(params, queryset=BillViewSet.queryset.all())
+    if not filterset.is_valid():
+        raise ValidationError(filterset.errors)
+    return _paginate(BillViewSet, filterset.qs, "/api/bills/", params)
+
+
+def create_bill(payload, params):
+    return _create(BillSerializer, payload, params)
+
+
+def cancel_bill(payload, params, pk):
+    bill = get_object_or_404(Bill, pk=pk)
+    bill.status = "cancelled"
+    bill.save()
+    return {"status": "Bill cancelled"}
+
+
+def create_bill_item(payload, params):
+    return _create(BillItemSerializer, payload, params)
+
+
+def add_bill_items(payload, params, pk):
+    bill = get_object_or_404(Bill, pk=pk)
+    serializer = BillItemBulkSerializer(data=payload)
+    serializer.is_valid(raise_exception=True)
+    bill.add_items(serializer.validated_data["items"])
+    return BillSerializer(Bill.objects.with_details().get(pk=pk), context=_context(params)).data
+
+
+def place_order(payload, params):
+    return _create(PlaceOrderSerializer, payload, params)
+
+
+def _cart_phone(phone):
+    phone = normalize_phone(unquote(phone))
+    if not phone:
+        raise ValidationError({"phone": "Enter a phone number."})
+    return phone
+
+
+def _cart_preview(cart, params):
+    payment_method = params.get("payment_method")
+    if payment_method and payment_method not in dict(Bill.PAYMENT_METHOD_CHOICES):
+        raise ValidationError({"payment_method": f'"{payment_method}" is not a valid choice.'})
+    return carts.preview(cart, payment_method)
+
+
+def get_cart(params, phone):
+    return _cart_preview(carts.get(_cart_phone(phone)), params)
+
+
+def add_cart_items(payload, params, phone):
+    serializer = CartLinesSerializer(data=payload)
+    serializer.is_valid(raise_exception=True)
+    return _cart_preview(carts.add(_cart_phone(phone), serializer.validated_data["items"]), params)
+
+
+def set_cart_quantities(payload, params, phone):
+    serializer = CartQuantitiesSerializer(data=payload)
+    serializer.is_valid(raise_exception=True)
+    return _cart_preview(
+        carts.set_quantities(_cart_phone(phone), serializer.validated_data["items"]), params
+    )
+
+
+def checkout_cart(payload, params, phone):
+    phone = _cart_phone(phone)
+    with carts.checkout(phone) as cart:
+        if not cart:
+            raise ValidationError({"detail": "The cart is empty."})
+        return _create(PlaceOrderSerializer, {**payload, "phone": phone, "items": cart.items()}, params)
+
+
+GET_ROUTES = [
+    (r"/menu/", full_menu),
+    (r"/menu/version/", menu_version),
+    (r"/menu/search/", menu_search),
+    (r"/categories/", list_categories),
+    (r"/items/", list_items),
+    (r"/sizes/", list_sizes),
+    (r"/customers/", list_customers),
+    (r"/customers/by-phone/", customer_by_phone),
+    (r"/bills/", list_bills),
+    (r"/carts/(?P<phone>[^/]+)/", get_cart),
+]
+
+POST_ROUTES = [
+    (r"/customers/", create_customer),
+    (r"/bills/", create_bill),
+    (r"/bills/(?P<pk>\d+)/cancel/", cancel_bill),
+    (r"/bills/(?P<pk>\d+)/items/", add_bill_items),
+    (r"/bill-items/", create_bill_item),
+    (r"/orders/", place_order),
+    (r"/carts/(?P<phone>[^/]+)/items/", add_cart_items),
+    (r"/carts/(?P<phone>[^/]+)/quantities/", set_cart_quantities),
+    (r"/carts/(?P<phone>[^/]+)/checkout/", checkout_cart),
+]
+
+
+def _dispatch(routes, path, *args):
+    for pattern, handler in routes:
+        match = re.fullmatch(pattern, path)
+        if match:
+            return _plain(handler(*(arg or {} for arg in args), **match.groupdict()))
+    raise Http404(f"No in-process route for {path}")
+
+
+async def get(path: str, params: dict = None):
+    return await sync_to_async(_dispatch)(GET_ROUTES, path, params)
+
+
+async def post(path: str, json: dict = None, params: dict = None, idempotency_key: str = None):
+    if not idempotency_key:
+        return await sync_to_async(_dispatch)(POST_ROUTES, path, json, params)
+    # Same store and scope as the HTTP endpoint (api/idempotency.py).
+    scope, body = f"POST /api{path}", dumps(json or {})
+    stored = await idempotency.aclaim(scope, idempotency_key, body)
+    if stored is not None:
+        return loads(stored[2])
+    try:
+        data = await sync_to_async(_dispatch)(POST_ROUTES, path, json, params)
+    except BaseException:
+        await idempotency.arelease(scope, idempotency_key)
+        raise
+    await idempotency.astore(scope, idempotency_key, body, 201, "application/json", dumps(data))
+    return data
@@ -0,0 +1,220 @@
+"""Per-tool-call tracing and latency histograms for the MCP server.
+
+``ToolTracingMiddleware`` wraps every tool call. For each call it records the
+total time, the time spent waiting on the Django API (``upstream()``, used
+by api_get/api_post), the size of the result handed back to the model, and
+whether it failed. Numbers are aggregated per tool into histograms, exposed
+both as the ``stats://tool-calls`` resource and in Prometheus text format at
+``/metrics`` next to the ``/mcp`` transport.
+
+Each call carries a trace id: the caller's ``X-Trace-Id`` header when the
+MCP request has one (so all tool calls of one WhatsApp turn share it),
+otherwise a fresh one. It is sent to the Django API in the same header,
+returned in the tool result's ``meta`` and included in the slow-call log,
+so one slow turn can be followed from the agent to the SQL.
+
+This mirrors ``api/metrics.py`` but stays free of Django: the MCP server
+may run on its own box with only httpx. Everything runs on the event loop,
+so there are no locks.
+"""
+import logging
+import os
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from fastmcp.server.dependencies import get_http_headers
+from fastmcp.server.middleware import Middleware
+
+TRACE_HEADER = "X-Trace-Id"
+
+# Tool calls at least this slow (ms) are logged to "mcp.tools"; 0 is off.
+SLOW_TOOL_MS = float(os.environ.get("MCP_SLOW_TOOL_MS", "0"))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+logger = logging.getLogger("mcp.tools")
+
+_current = ContextVar("tool_call", default=None)
+
+
+class ToolCall:
+    __slots__ = ("tool", "trace_id", "upstream_seconds", "upstream_calls")
+
+    def __init__(self, tool, trace_id):
+        self.tool = tool
+        self.trace_id = trace_id
+        self.upstream_seconds = 0.0
+        self.upstream_calls = 0
+
+
+class UpstreamRequest:
+    __slots__ = ("status",)
+
+    def __init__(self):
+        self.status = None
+
+
+class Histogram:
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.buckets = name, help, tuple(buckets)
+        self._series = {}
+
+    def observe(self, tool, value):
+        series = self._series.get(tool)
+        if series is None:
+            series = self._series[tool] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def summary(self, tool):
+        """``(count, mean, p50, p95)``; percentiles are bucket upper bounds."""
+        counts, total = self._series.get(tool, ([0], 0.0))
+        count = sum(counts)
+        if not count:
+            return 0, 0.0, 0.0, 0.0
+
+        def quantile(q):
+            seen = 0
+            for bound, n in zip(self.buckets, counts):
+                seen += n
+                if seen >= q * count:
+                    return bound
+            return self.buckets[-1]
+
+        return count, total / count, quantile(0.5), quantile(0.95)
+
+    def collect(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for tool, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                yield f'{self.name}_bucket{{tool="{tool}",le="{le}"}} {cumulative}'
+            yield f'{self.name}_sum{{tool="{tool}"}} {total!r}'
+            yield f'{self.name}_count{{tool="{tool}"}} {cumulative}'
+
+
+class Counter:
+    def __init__(self, name, help, label):
+        self.name, self.help, self.label = name, help, label
+        self._values = {}
+
+    def inc(self, tool, value):
+        key = (tool, str(value))
+        self._values[key] = self._values.get(key, 0) + 1
+
+    def total(self, tool, value=None):
+        return sum(n for (t, v), n in self._values.items() if t == tool and value in (None, v))
+
+    def collect(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for (tool, value), count in sorted(self._values.items()):
+            yield f'{self.name}{{tool="{tool}",{self.label}="{value}"}} {count}'
+
+
+call_duration = Histogram("mcp_tool_call_duration_seconds", "Total time per tool call.")
+upstream_duration = Histogram(
+    "mcp_tool_upstream_duration_seconds", "Time per tool call spent waiting on the Django API."
+)
+response_bytes = Histogram(
+    "mcp_tool_response_bytes", "Size of the result returned to the model.", SIZE_BUCKETS
+)
+calls = Counter("mcp_tool_calls_total", "Tool calls by outcome.", "status")
+errors = Counter("mcp_tool_errors_total", "Failed tool calls by exception type.", "error")
+upstream_responses = Counter(
+    "mcp_tool_upstream_responses_total", "Django API responses by status code.", "code"
+)
+METRICS = (call_duration, upstream_duration, response_bytes, calls, errors, upstream_responses)
+
+
+def render():
+    return "\n".join(line for metric in METRICS for line in metric.collect()) + "\n"
+
+
+def stats():
+    """Per-tool summary for the ``stats://tool-calls`` resource."""
+    report = {}
+    for tool in sorted(call_duration._series):
+        count, mean, p50, p95 = call_duration.summary(tool)
+        _, upstream_mean, _, _ = upstream_duration.summary(tool)
+        _, size_mean, _, _ = response_bytes.summary(tool)
+        report[tool] = {
+            "calls": count,
+            "errors": calls.total(tool, "error"),
+            "mean_ms": round(mean * 1000, 2),
+            "p50_ms_le": p50 * 1000,
+            "p95_ms_le": p95 * 1000,
+            "upstream_mean_ms": round(upstream_mean * 1000, 2),
+            "mean_response_bytes": round(size_mean),
+        }
+    return report
+
+
+def trace_headers():
+    """Headers for an upstream request made inside the current tool call."""
+    call = _current.get()
+    return {TRACE_HEADER: call.trace_id} if call else {}
+
+
+@contextmanager
+def upstream():
+    """Time an upstream API request and charge it to the current tool call.
+
+    Set ``status`` on the yielded request to count the response code.
+    """
+    call = _current.get()
+    request = UpstreamRequest()
+    start = time.perf_counter()
+    try:
+        yield request
+    finally:
+        if call is not None:
+            call.upstream_seconds += time.perf_counter() - start
+            call.upstream_calls += 1
+            if request.status is not None:
+                upstream_responses.inc(call.tool, request.status)
+
+
+def _result_size(result):
+    return sum(len(getattr(block, "text", "").encode()) for block in result.content)
+
+
+class ToolTracingMiddleware(Middleware):
+    async def on_call_tool(self, context, call_next):
+        tool = context.message.name
+        trace_id = get_http_headers().get(TRACE_HEADER.lower(), "")[:64] or uuid.uuid4().hex[:16]
+        call = ToolCall(tool, trace_id)
+        token = _current.set(call)
+        start = time.perf_counter()
+        status, size = "error", 0
+        try:
+            result = await call_next(context)
+            status = "error" if result.is_error else "ok"
+            size = _result_size(result)
+            result.meta = {**(result.meta or {}), "trace_id": trace_id}
+            return result
+        except Exception as exc:
+            # fastmcp wraps tool exceptions in ToolError; count the real one.
+            errors.inc(tool, type(exc.__cause__ or exc).__name__)
+            raise
+        finally:
+            _current.reset(token)
+            seconds = time.perf_counter() - start
+            call_duration.observe(tool, seconds)
+            upstream_duration.observe(tool, call.upstream_seconds)
+            response_bytes.observe(tool, size)
+            calls.inc(tool, status)
+            if SLOW_TOOL_MS and seconds * 1000 >= SLOW_TOOL_MS:
+                logger.warning(
+                    "slow tool call %s: %.1f ms (upstream %.1f ms in %d requests, %d bytes) trace=%s",
+                    tool, seconds * 1000, call.upstream_seconds * 1000,
+                    call.upstream_calls, size, trace_id,
+                )
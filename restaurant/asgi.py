@@ -5,6 +5,37 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
+
+Worker model
+------------
+For the SQLite deployment, serve the project with WSGI and threads instead
+(see restaurant/wsgi.py). ``benchmarks/conversations.py`` against SQLite, with
+500 ms of think time between calls, sustained 16 concurrent conversations on
+gunicorn with 32 threads and 8 on one uvicorn worker with the async views.
+Django 5.0 still runs each sync middleware on a thread and opens a connection
+per request, and SQLite takes one writer at a time, so the event loop has
+nothing to win there.
+
+The async hot endpoints (api/async_views.py) are therefore off unless
+``DJANGO_ASYNC_VIEWS=1``. They are meant for a remote database, which has not
+been measured yet; keep them only if conversations.py shows they help::
+
+    DJANGO_ASYNC_VIEWS=1 uvicorn restaurant.asgi:application --host 0.0.0.0 --port 8000 --workers 4
+
+Under ASGI every sync view runs in a thread of its own for the length of
+the request. Those per-request threads are why persistent connections are
+off here: Django's connections are per thread, and a thread that finishes a
+request is never reused, so ``CONN_MAX_AGE`` would only leave connections
+behind. Opening a SQLite connection is cheap; on PostgreSQL put PgBouncer in
+front instead, sized for ``workers x concurrent requests``. SQLite still
+takes one writer at a time across all workers, so write-heavy deployments
+belong on PostgreSQL.
+
+State a conversation relies on must not stay in one worker: the default
+cache is shared (see settings.CACHES), and draft carts need
+``DJANGO_CART_SQLITE_PATH`` once there is more than one worker. Set
+``DJANGO_WORKERS`` (or ``WEB_CONCURRENCY``) to the worker count so startup
+can warn when that state isn't shared.
 """
 
 import os
@@ -12,5 +43,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "restaurant.settings")
+os.environ.setdefault("DJANGO_CONN_MAX_AGE", "0")
 
-application = get_asgi_application()
\ No newline at end of file
+application = get_asgi_application()
@@ -10,6 +10,9 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
+import hashlib
+import os
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -42,6 +45,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its timings cover the rest of the stack.
+    "api.middleware.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -51,6 +56,10 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# api/middleware.py logs every query at least this slow (ms) with its view
+# to the "api.slow_queries" logger. 0 turns the slow-query log off.
+SLOW_QUERY_MS = float(os.environ.get("DJANGO_SLOW_QUERY_MS", "0"))
+
 ROOT_URLCONF = "restaurant.urls"
 
 TEMPLATES = [
@@ -70,16 +79,141 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "restaurant.wsgi.application"
+ASGI_APPLICATION = "restaurant.asgi.application"
+
+# Serve the hot API endpoints with the async views in api/async_views.py.
+# ASGI only: a WSGI server (runserver included) would run each one in its own
+# event loop. Off by default, since on SQLite they sustained fewer
+# conversations than WSGI with threads (see restaurant/asgi.py).
+ASYNC_VIEWS = os.environ.get("DJANGO_ASYNC_VIEWS", "0") == "1"
+
+# Bill event stream (api/events.py): how many recent events are kept for
+# clients resuming with Last-Event-ID, and how often (seconds) an idle
+# stream gets a keepalive comment.
+BILL_EVENTS_BUFFER = int(os.environ.get("DJANGO_BILL_EVENTS_BUFFER", "2000"))
+BILL_EVENTS_KEEPALIVE = float(os.environ.get("DJANGO_BILL_EVENTS_KEEPALIVE", "15"))
+
+# How long (seconds) bill writes sent with an Idempotency-Key are remembered
+# and replayed instead of run again (api/idempotency.py).
+IDEMPOTENCY_KEY_TTL = int(os.environ.get("DJANGO_IDEMPOTENCY_KEY_TTL", "3600"))
+
+# Draft carts (api/carts.py): dropped this many seconds after their last
+# change. Kept in process memory unless DJANGO_CART_SQLITE_PATH names a
+# SQLite file to hold them, shared by every worker on the host; required
+# with more than one worker.
+CART_TTL = int(os.environ.get("DJANGO_CART_TTL", "7200"))
+CART_SQLITE_PATH = os.environ.get("DJANGO_CART_SQLITE_PATH") or None
 
 
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+# Pick a profile with DJANGO_DB_PROFILE: "sqlite" (default, single box) or
+# "postgres" (concurrent writers).
+
+DB_PROFILE = os.environ.get("DJANGO_DB_PROFILE", "sqlite")
+CONN_MAX_AGE = int(os.environ.get("DJANGO_CONN_MAX_AGE", "600"))
+SQLITE_BUSY_TIMEOUT = int(os.environ.get("DJANGO_SQLITE_BUSY_TIMEOUT", "20"))  # seconds
+
+if DB_PROFILE == "postgres":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.environ.get("POSTGRES_DB", "restaurant"),
+            "USER": os.environ.get("POSTGRES_USER", "restaurant"),
+            "PASSWORD": os.environ.get("POSTGRES_PASSWORD", ""),
+            "HOST": os.environ.get("POSTGRES_HOST", "localhost"),
+            "PORT": os.environ.get("POSTGRES_PORT", "5432"),
+            # Persistent connections, checked before reuse.
+            "CONN_MAX_AGE": CONN_MAX_AGE,
+            "CONN_HEALTH_CHECKS": True,
+            "OPTIONS": {},
+        }
+    }
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.environ.get("DJANGO_SQLITE_PATH", BASE_DIR / "db.sqlite3"),
+            "CONN_MAX_AGE": CONN_MAX_AGE,
+            "CONN_HEALTH_CHECKS": True,
+            "OPTIONS": {"timeout": SQLITE_BUSY_TIMEOUT},
+        }
     }
+
+# Applied to every new SQLite connection (see api/signals.py). WAL lets
+# readers run alongside the writer, and synchronous=NORMAL is safe under WAL.
+SQLITE_PRAGMAS = [
+    "journal_mode=WAL",
+    "synchronous=NORMAL",
+    f"busy_timeout={SQLITE_BUSY_TIMEOUT * 1000}",
+    "temp_store=MEMORY",
+    "cache_size=-20000",
+]
+
+
+def _worker_count():
+    """Server processes this one is part of: DJANGO_WORKERS, else WEB_CONCURRENCY.
+
+    Used only to warn about per-process state; the server's own --workers
+    flag isn't seen here, so set one of these to match it (gunicorn and
+    uvicorn read WEB_CONCURRENCY too). Anything but a whole number counts as 1.
+    """
+    value = os.environ.get("DJANGO_WORKERS") or os.environ.get("WEB_CONCURRENCY") or "1"
+    try:
+        return max(int(value), 1)
+    except ValueError:
+        return 1
+
+
+WORKERS = _worker_count()
+TESTING = sys.argv[1:2] == ["test"]
+
+# Caches
+# The menu version and snapshot (api/menu.py) must be the same in every
+# process serving the menu: the workers and an ORM-mode MCP server. The
+# default cache is therefore shared: Redis when DJANGO_REDIS_URL is set
+# (needed across hosts; `pip install redis`), otherwise files under
+# DJANGO_CACHE_DIR, shared by the processes on this host. "locmem" is only
+# right for a single process, and is what the test runner uses.
+CACHE_BACKEND = os.environ.get(
+    "DJANGO_CACHE_BACKEND",
+    "locmem" if TESTING else "redis" if os.environ.get("DJANGO_REDIS_URL") else "file",
+)
+CACHES = {
+    "default": {
+        "redis": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ.get("DJANGO_REDIS_URL"),
+        },
+        "file": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.environ.get("DJANGO_CACHE_DIR", BASE_DIR / ".cache"),
+        },
+        "locmem": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        },
+    }[CACHE_BACKEND],
+}
+# Servers on different databases sharing a cache directory or Redis keep
+# their menus apart.
+_db = DATABASES["default"]
+CACHES["default"]["KEY_PREFIX"] = hashlib.blake2b(
+    f'{_db["NAME"]}@{_db.get("HOST", "")}:{_db.get("PORT", "")}'.encode(), digest_size=4
+).hexdigest()
+
+
+REST_FRAMEWORK = {
+    # orjson-backed JSON in and out (api/renderers.py); same output as DRF's.
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "api.renderers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
 }
 
 
@@ -128,4 +262,8 @@ DJANGO_MCP_GLOBAL_SERVER_CONFIG = {
     "name":"RestaurantMCP",
     "instructions": "This server is used to retreive menu items and generate bill",
     "stateless": False
-}
\ No newline at end of file
+}
+# Phone numbers without a country code are treated as local to this country
+# and stored in E.164 form (see api/phone.py).
+PHONE_DEFAULT_COUNTRY_CODE = os.environ.get("PHONE_DEFAULT_COUNTRY_CODE", "92")
+PHONE_NATIONAL_NUMBER_LENGTH = 10
@@ -5,6 +5,19 @@ It exposes the WSGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/wsgi/
+
+Worker model
+------------
+This is the recommended server for the SQLite deployment: one process, with a
+thread for each request in flight::
+
+    gunicorn restaurant.wsgi --bind 0.0.0.0:8000 --workers 1 --threads 32
+
+``benchmarks/conversations.py`` measured 16 concurrent conversations on this
+setup and 8 on one uvicorn worker with the async views (see
+restaurant/asgi.py). More processes don't add write throughput on SQLite,
+which takes one writer at a time. They also need the shared state described
+in asgi.py.
 """
 
 import os